@@ -310,6 +310,7 @@ class AdminAgent:
     def suspend_user(self, db, user_id: int, reason: str) -> Dict[str, Any]:
         """Suspend un utilisateur."""
         from backend.models.user import User
+        from backend.core.dependencies import user_status_cache
         
         try:
             user = db.query(User).filter(User.id == user_id).first()
@@ -322,6 +323,7 @@ class AdminAgent:
             
             user.is_active = False
             db.commit()
+            user_status_cache.invalidate(user.id)
             
             logger.info(f"User {user.username} suspended. Reason: {reason}")
             
@@ -339,6 +341,7 @@ class AdminAgent:
     def activate_user(self, db, user_id: int) -> Dict[str, Any]:
         """Réactive un utilisateur."""
         from backend.models.user import User
+        from backend.core.dependencies import user_status_cache
         
         try:
             user = db.query(User).filter(User.id == user_id).first()
@@ -348,6 +351,7 @@ class AdminAgent:
             
             user.is_active = True
             db.commit()
+            user_status_cache.invalidate(user.id)
             
             logger.info(f"User {user.username} activated")
             
@@ -1,6 +1,8 @@
 import logging
 from typing import Dict, Any, List, Optional
 
+from backend.core.llm_scheduler import Priority
+
 logger = logging.getLogger("cleo.content_agent")
 
 
@@ -86,7 +88,7 @@ Generate educational content in JSON format:
 Make it engaging, clear, and pedagogically sound."""
 
         try:
-            response = self.groq_client.chat(prompt, max_tokens=1200)
+            response = self.groq_client.chat(prompt, max_tokens=1200, priority=Priority.GENERATION, agent="content")
             import json
             
             # Parse JSON
@@ -148,7 +150,7 @@ Generate a JSON response:
 Make it actionable and student-friendly."""
 
         try:
-            response = self.groq_client.chat(prompt, max_tokens=1000)
+            response = self.groq_client.chat(prompt, max_tokens=1000, priority=Priority.GENERATION, agent="content")
             import json
             
             if "```json" in response:
@@ -216,7 +218,7 @@ Generate a JSON study guide:
 Make it practical and time-efficient."""
 
         try:
-            response = self.groq_client.chat(prompt, max_tokens=1200)
+            response = self.groq_client.chat(prompt, max_tokens=1200, priority=Priority.GENERATION, agent="content")
             import json
             
             if "```json" in response:
@@ -272,7 +274,7 @@ Generate 3 realistic scenarios in JSON:
 Make scenarios relevant to real-world applications."""
 
         try:
-            response = self.groq_client.chat(prompt, max_tokens=1000)
+            response = self.groq_client.chat(prompt, max_tokens=1000, priority=Priority.GENERATION, agent="content")
             import json
             
             if "```json" in response:
@@ -1,10 +1,18 @@
 import logging
+import contextvars
 import json
-from typing import Dict, Any, Optional
-from difflib import SequenceMatcher
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from backend.core.answer_scorer import answer_scorer, PASS_THRESHOLD
+from backend.core.llm_scheduler import Priority
 
 logger = logging.getLogger("cleo.evaluation_agent")
 
+# Appels IA simultanés maximum lors de la correction d'un lot de réponses ouvertes
+EVAL_MAX_WORKERS = int(os.getenv("CLEO_EVAL_MAX_WORKERS", "4"))
+
 
 class EvaluationAgent:
     """
@@ -16,6 +24,78 @@ class EvaluationAgent:
         self.groq_client = groq_client
         logger.info("EvaluationAgent initialized")
     
+    def evaluate(self, question: Dict[str, Any], user_answer: Any, use_ai: bool = True) -> Dict[str, Any]:
+        """Évalue une réponse selon le type de la question."""
+        question_type = question.get("question_type")
+        
+        if question_type == "mcq":
+            return self.evaluate_mcq(question, user_answer)
+        elif question_type == "open_ended":
+            return self.evaluate_open_ended(question, user_answer, use_ai=use_ai)
+        elif question_type == "true_false":
+            # ⭐ S'assurer que c'est un boolean
+            if isinstance(user_answer, str):
+                user_answer = user_answer.lower() == 'true'
+            return self.evaluate_true_false(question, user_answer)
+        elif question_type == "matching":
+            return self.evaluate_matching(question, user_answer)
+        
+        # Fallback pour autres types
+        return {
+            "is_correct": False,
+            "points_earned": 0,
+            "points_possible": question.get("points", 10),
+            "feedback": "Evaluation not yet implemented for this question type"
+        }
+    
+    def evaluate_batch(
+        self,
+        items: List[Tuple[Dict[str, Any], Any]],
+        use_ai: bool = True,
+        max_workers: int = EVAL_MAX_WORKERS
+    ) -> List[Dict[str, Any]]:
+        """
+        Évalue un lot de (question, réponse) ; résultats dans le même ordre.
+        
+        Les types déterministes (mcq, true_false, matching) sont corrigés
+        directement ; les réponses ouvertes passent par le score local et seules
+        les incertaines sont corrigées par l'IA, en appels concurrents (au plus
+        `max_workers`), chacune avec son repli local.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        open_ended = []
+        local_scores: Dict[int, Dict[str, Any]] = {}
+        
+        for index, (question, user_answer) in enumerate(items):
+            if question.get("question_type") == "open_ended":
+                local = answer_scorer.score(question, user_answer)
+                escalate = self._should_escalate(local, use_ai)
+                answer_scorer.record(escalated=escalate)
+                if escalate:
+                    local_scores[index] = local
+                    open_ended.append(index)
+                else:
+                    results[index] = self._evaluate_open_simple(question, user_answer, local)
+            else:
+                results[index] = self.evaluate(question, user_answer, use_ai=use_ai)
+        
+        def grade(i):
+            return self._evaluate_open_with_ai(items[i][0], items[i][1], local_scores[i])
+        
+        if len(open_ended) == 1:
+            results[open_ended[0]] = grade(open_ended[0])
+        elif open_ended:
+            workers = max(1, min(max_workers, len(open_ended)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cleo-eval") as pool:
+                # Un contexte copié par tâche : les étiquettes de la requête (llm_usage) suivent l'appel
+                contexts = [contextvars.copy_context() for _ in open_ended]
+                evaluations = pool.map(lambda context, i: context.run(grade, i), contexts, open_ended)
+                for index, evaluation in zip(open_ended, evaluations):
+                    results[index] = evaluation
+            logger.info("Batch evaluation: %s open-ended answers graded with %s workers", len(open_ended), workers)
+        
+        return results
+    
     def evaluate_mcq(self, question: Dict[str, Any], user_answer: str) -> Dict[str, Any]:
         """Évalue une question MCQ."""
         correct_answer = question.get("correct_answer", "")
@@ -39,13 +119,26 @@ class EvaluationAgent:
         user_answer: str,
         use_ai: bool = True
     ) -> Dict[str, Any]:
-        """Évalue une question ouverte."""
-        if use_ai and self.groq_client:
-            return self._evaluate_open_with_ai(question, user_answer)
-        else:
-            return self._evaluate_open_simple(question, user_answer)
+        """
+        Évalue une question ouverte en cascade : score local d'abord, et
+        correcteur IA seulement si le score local est dans la bande incertaine.
+        """
+        local = answer_scorer.score(question, user_answer)
+        if self._should_escalate(local, use_ai):
+            answer_scorer.record(escalated=True)
+            return self._evaluate_open_with_ai(question, user_answer, local)
+        answer_scorer.record(escalated=False)
+        return self._evaluate_open_simple(question, user_answer, local)
+    
+    def _should_escalate(self, local: Dict[str, Any], use_ai: bool) -> bool:
+        return bool(use_ai and self.groq_client and local["uncertain"])
     
-    def _evaluate_open_with_ai(self, question: Dict[str, Any], user_answer: str) -> Dict[str, Any]:
+    def _evaluate_open_with_ai(
+        self,
+        question: Dict[str, Any],
+        user_answer: str,
+        local: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """Évaluation IA pour questions ouvertes."""
         sample_answer = question.get("sample_answer", "")
         keywords = question.get("keywords", [])
@@ -76,7 +169,7 @@ Evaluate the answer and provide a JSON response:
 Be fair, constructive, and educational. Score from 0-100."""
 
         try:
-            response = self.groq_client.chat(prompt, max_tokens=600)
+            response = self.groq_client.chat(prompt, max_tokens=600, priority=Priority.INTERACTIVE, agent="evaluation")
             
             if "```json" in response:
                 json_str = response.split("```json")[1].split("```")[0].strip()
@@ -108,39 +201,28 @@ Be fair, constructive, and educational. Score from 0-100."""
         
         except Exception as e:
             logger.exception("AI evaluation failed, falling back to simple: %s", e)
-            return self._evaluate_open_simple(question, user_answer)
+            return self._evaluate_open_simple(question, user_answer, local)
     
-    def _evaluate_open_simple(self, question: Dict[str, Any], user_answer: str) -> Dict[str, Any]:
-        """Évaluation simple basée sur mots-clés."""
-        keywords = question.get("keywords", [])
-        sample_answer = question.get("sample_answer", "")
+    def _evaluate_open_simple(
+        self,
+        question: Dict[str, Any],
+        user_answer: str,
+        local: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Évaluation locale : mots-clés, longueur et similarité (voir core/answer_scorer)."""
+        local = local or answer_scorer.score(question, user_answer)
         min_words = question.get("min_words", 20)
-        
-        user_lower = user_answer.lower()
-        word_count = len(user_answer.split())
-        
-        # Vérifier présence de mots-clés
-        keywords_found = sum(1 for kw in keywords if kw.lower() in user_lower)
-        keyword_score = keywords_found / max(len(keywords), 1)
-        
-        # Vérifier longueur
-        length_score = min(word_count / max(min_words, 1), 1.0)
-        
-        # Similarité avec réponse modèle
-        similarity = SequenceMatcher(None, user_lower, sample_answer.lower()).ratio()
-        
-        # Score final
-        final_score = (keyword_score * 0.5 + length_score * 0.2 + similarity * 0.3)
+        word_count = local["word_count"]
+        final_score = local["final_score"]
         
         points_possible = question.get("points", 15)
         points_earned = round(final_score * points_possible, 1)
         
-        is_correct = final_score >= 0.6
+        is_correct = final_score >= PASS_THRESHOLD
         
         feedback_parts = []
-        if keyword_score < 0.5:
-            missing_kw = [kw for kw in keywords if kw.lower() not in user_lower]
-            feedback_parts.append(f"Missing key concepts: {', '.join(missing_kw)}")
+        if local["keyword_score"] < 0.5:
+            feedback_parts.append(f"Missing key concepts: {', '.join(local['missing_keywords'])}")
         if word_count < min_words:
             feedback_parts.append(f"Answer too brief ({word_count} words, expected {min_words}+)")
         if is_correct:
@@ -152,11 +234,12 @@ Be fair, constructive, and educational. Score from 0-100."""
             "points_possible": points_possible,
             "score_percentage": round(final_score * 100, 1),
             "feedback": " ".join(feedback_parts) if feedback_parts else "Answer needs improvement",
-            "keywords_found": keywords_found,
-            "keywords_total": len(keywords),
+            "keywords_found": local["keywords_found"],
+            "keywords_total": local["keywords_total"],
             "word_count": word_count,
-            "confidence": 0.6,
-            "evaluation_method": "keyword_matching"
+            "similarity": round(local["similarity"], 3),
+            "confidence": local["confidence"],
+            "evaluation_method": "local_" + (local["shortcut"] or local["similarity_method"])
         }
     
     def evaluate_true_false(self, question: Dict[str, Any], user_answer: bool) -> Dict[str, Any]:
@@ -2,6 +2,10 @@ import logging
 import json
 from typing import Dict, Any, List, Optional
 
+from backend.core.question_index import content_id
+from backend.core.llm_scheduler import Priority
+from backend.core.prompt_builder import prompt_builder
+
 logger = logging.getLogger("cleo.quiz_agent")
 
 
@@ -38,15 +42,6 @@ class QuizAgent:
         """Génère des questions adaptatives."""
         bloom_label = self.BLOOM_LEVELS.get(bloom_level, "Understand")
         
-        type_instructions = {
-            "mcq": self._get_mcq_instructions(),
-            "open_ended": self._get_open_instructions(),
-            "matching": self._get_matching_instructions(),
-            "true_false": self._get_true_false_instructions()
-        }
-        
-        instruction = type_instructions.get(question_type, type_instructions["mcq"])
-        
         # ⭐ Adapter max_tokens selon le type
         max_tokens_map = {
             "matching": 2500,      # Plus long à cause de la structure
@@ -56,41 +51,27 @@ class QuizAgent:
         }
         max_tokens = max_tokens_map.get(question_type, 1500)
         
-        prompt = f"""You are an expert educational assessment creator. Generate {num_questions} high-quality {question_type} questions.
-
-    Subject: {subject}
-    Topic: {topic}
-    Bloom Taxonomy Level: {bloom_level} - {bloom_label}
-    Difficulty: {difficulty}/5
-
-    {instruction}
-
-    Generate a JSON array of {num_questions} questions following this exact structure:
-    {self._get_question_template(question_type)}
-
-    CRITICAL RULES:
-    - Output ONLY valid JSON, no markdown, no explanations, no comments
-    - Start with [ and end with ]
-    - Use double quotes for all strings
-    - NO trailing commas after last item in arrays or objects
-    - Questions must target Bloom level {bloom_level} ({bloom_label})
-
-    Generate the JSON array now:"""
+        # ⭐ Consignes fixes en message système, gabarit précompilé par type (variante A/B)
+        prompt = prompt_builder.quiz_prompt(
+            subject, topic, bloom_level, bloom_label, question_type, num_questions, difficulty
+        )
 
         try:
-            response = self.groq_client.chat(prompt, max_tokens=max_tokens)
+            response = self.groq_client.chat(
+                prompt.user, max_tokens=max_tokens, priority=Priority.GENERATION,
+                agent=f"quiz:{prompt.variant}", system=prompt.system
+            )
             
-            # ⭐ Logger la réponse complète pour matching
-            if question_type == "matching":
-                logger.info("Full Groq response for matching:\n%s", response)
-            else:
-                logger.info("Raw Groq response (first 500 chars): %s", response[:500])
+            # ⭐ Réponse brute en DEBUG uniquement (peut faire plusieurs Ko)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw Groq response for %s: %s", question_type, response)
             
             # Parsing JSON
             questions = self._extract_json_from_response(response)
             
             if not questions:
                 logger.warning("Failed to parse JSON, using fallback")
+                prompt_builder.record_outcome(question_type, prompt.variant, ok=False)
                 return self._get_fallback_questions(subject, topic, question_type, num_questions)
         
             # ⭐ Valider les questions matching
@@ -104,19 +85,23 @@ class QuizAgent:
                 
                 if not valid_questions:
                     logger.warning("No valid matching questions, using fallback")
+                    prompt_builder.record_outcome(question_type, prompt.variant, ok=False)
                     return self._get_fallback_questions(subject, topic, question_type, num_questions)
                 
                 questions = valid_questions
 
+            prompt_builder.record_outcome(question_type, prompt.variant, ok=True)
+
             # Enrichir avec métadonnées
-            for idx, q in enumerate(questions):
-                q["question_id"] = f"{subject.lower().replace(' ', '_')}_{topic.lower().replace(' ', '_')}_{idx+1}"
+            for q in questions:
                 q["bloom_level"] = bloom_level
                 q["bloom_label"] = bloom_label
                 q["difficulty"] = difficulty
                 q["subject"] = subject
                 q["topic"] = topic
                 q["question_type"] = question_type
+                # ⭐ Identifiant dérivé du contenu : une question régénérée garde le même id
+                q["question_id"] = content_id(subject, q)
             
             logger.info("✓ Generated %d %s questions for %s (Bloom=%d)", 
                     len(questions), question_type, topic, bloom_level)
@@ -233,131 +218,6 @@ class QuizAgent:
         
         return True
 
-    def _get_mcq_instructions(self) -> str:
-        return """For Multiple Choice Questions (MCQ):
-- Provide 4 options (A, B, C, D)
-- Only ONE correct answer
-- Distractors should be plausible but clearly incorrect
-- Avoid "all of the above" or "none of the above"
-- Include brief explanation for the correct answer"""
-    
-    def _get_open_instructions(self) -> str:
-        return """For Open-Ended Questions:
-- Questions should require 2-3 sentence answers
-- Clear evaluation criteria
-- Sample answer provided
-- Keywords that must be present in correct answers"""
-    
-    def _get_matching_instructions(self) -> str:
-        return """For Matching Questions - STRICT FORMAT REQUIRED:
-
-    STRUCTURE:
-    - Provide EXACTLY 5 items to match (L1-L5 and R1-R5)
-    - Left items: concepts, terms, or key words
-    - Right items: definitions, descriptions, or explanations
-    - Shuffle right items (different order than left)
-    - One correct match per left item
-
-    CRITICAL JSON REQUIREMENTS:
-    - Use IDs: "L1", "L2", "L3", "L4", "L5" for left
-    - Use IDs: "R1", "R2", "R3", "R4", "R5" for right
-    - Text must be clear and distinct
-    - correct_matches must have ALL 5 pairs
-    - NO trailing commas
-    - NO comments in JSON
-
-    Example (you must follow this EXACT structure):
-    [
-    {
-        "question_text": "Match the Big Data concepts:",
-        "left_items": [
-        {"id": "L1", "text": "HDFS"},
-        {"id": "L2", "text": "MapReduce"}
-        ],
-        "right_items": [
-        {"id": "R1", "text": "Processing framework"},
-        {"id": "R2", "text": "Distributed storage"}
-        ],
-        "correct_matches": [
-        {"left": "L1", "right": "R2"},
-        {"left": "L2", "right": "R1"}
-        ],
-        "points": 20
-    }
-    ]"""
-        
-        
-    def _get_true_false_instructions(self) -> str:
-        return """For True/False Questions:
-- Statement should be clearly true or false
-- Avoid ambiguous statements
-- Provide explanation for the correct answer"""
-    
-    def _get_question_template(self, question_type: str) -> str:
-        if question_type == "mcq":
-            return """[
-  {
-    "question_text": "What is...?",
-    "options": [
-      {"key": "A", "text": "Option A"},
-      {"key": "B", "text": "Option B"},
-      {"key": "C", "text": "Option C"},
-      {"key": "D", "text": "Option D"}
-    ],
-    "correct_answer": "B",
-    "explanation": "Explanation of why B is correct",
-    "points": 10
-  }
-]"""
-        elif question_type == "open_ended":
-            return """[
-  {
-    "question_text": "Explain...",
-    "sample_answer": "A model answer (2-3 sentences)",
-    "keywords": ["keyword1", "keyword2", "keyword3"],
-    "min_words": 30,
-    "points": 15
-  }
-]"""
-        elif question_type == "matching":
-            return """[
-    {
-        "question_text": "Match concepts with definitions:",
-        "left_items": [
-        {"id": "L1", "text": "First concept"},
-        {"id": "L2", "text": "Second concept"},
-        {"id": "L3", "text": "Third concept"},
-        {"id": "L4", "text": "Fourth concept"},
-        {"id": "L5", "text": "Fifth concept"}
-        ],
-        "right_items": [
-        {"id": "R1", "text": "Definition for first"},
-        {"id": "R2", "text": "Definition for second"},
-        {"id": "R3", "text": "Definition for third"},
-        {"id": "R4", "text": "Definition for fourth"},
-        {"id": "R5", "text": "Definition for fifth"}
-        ],
-        "correct_matches": [
-        {"left": "L1", "right": "R1"},
-        {"left": "L2", "right": "R2"},
-        {"left": "L3", "right": "R3"},
-        {"left": "L4", "right": "R4"},
-        {"left": "L5", "right": "R5"}
-        ],
-        "points": 20
-    }
-    ]"""
-        
-        else:  # true_false
-            return """[
-  {
-    "question_text": "Statement to evaluate",
-    "correct_answer": true,
-    "explanation": "Why this is true/false",
-    "points": 5
-  }
-]"""
-    
     def _save_failed_response(self, response: str, error: str):
         """Sauvegarde les réponses qui échouent pour debug."""
         import datetime
@@ -378,12 +238,16 @@ class QuizAgent:
         logger.info("Saved failed response to %s", filename)
 
     def _get_fallback_questions(self, subject: str, topic: str, question_type: str, num: int) -> List[Dict[str, Any]]:
-        """Questions de secours si génération IA échoue."""
+        """
+        Questions de secours si génération IA échoue.
+        Marquées "fallback" : elles ne sont pas enregistrées dans la banque.
+        """
         
         if question_type == "matching":
             # Fallback plus intelligent pour matching
             return [{
                 "question_id": f"fallback_matching_{i}",
+                "fallback": True,
                 "question_text": f"Match these {topic} concepts (Question {i+1}):",
                 "left_items": [
                     {"id": "L1", "text": f"{topic} Component A"},
@@ -414,6 +278,7 @@ class QuizAgent:
         elif question_type == "mcq":
             return [{
                 "question_id": f"fallback_mcq_{i}",
+                "fallback": True,
                 "question_text": f"What is a key concept in {topic}?",
                 "options": [
                     {"key": "A", "text": f"Concept A about {topic}"},
@@ -431,6 +296,7 @@ class QuizAgent:
         else:  # open_ended
             return [{
                 "question_id": f"fallback_open_{i}",
+                "fallback": True,
                 "question_text": f"Explain the key aspects of {topic} (Question {i+1})",
                 "sample_answer": f"A comprehensive explanation of {topic} covering main concepts and applications.",
                 "keywords": [topic.lower(), "definition", "application"],
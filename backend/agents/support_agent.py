@@ -1,9 +1,134 @@
+import json
 import logging
-from typing import Dict, Any, List, Optional
+import os
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from backend.core.llm_scheduler import Priority
+
 logger = logging.getLogger("cleo.support_agent")
 
+SUPPORT_POOL_SIZE = int(os.getenv("CLEO_SUPPORT_POOL_SIZE", "3"))
+SUPPORT_POOL_TTL_SECONDS = float(os.getenv("CLEO_SUPPORT_POOL_TTL_SECONDS", "86400"))
+SUPPORT_POOL_RETRY_SECONDS = 60.0  # délai avant nouvel essai après un échec (total ou partiel) de génération
+# Préchauffage au démarrage : opt-in, chaque clé coûte CLEO_SUPPORT_POOL_SIZE appels Groq par worker
+SUPPORT_POOL_WARM = os.getenv("CLEO_SUPPORT_POOL_WARM", "0") == "1"
+SUPPORT_POOL_WARM_SEVERITIES = ("medium",)
+SUPPORT_POOL_WARM_CATEGORIES = ("General",)
+
+# Marqueurs laissés dans les variantes générées, remplacés à chaque envoi
+NAME_PLACEHOLDER = "{learner_name}"
+SUBJECT_PLACEHOLDER = "{subject}"
+
+
+def personalize_message(message: Dict[str, Any], learner_name: str, subject: Optional[str]) -> Dict[str, Any]:
+    """Copie du message avec le prénom et le sujet substitués (simple str.replace)."""
+    subject = subject or "this topic"
+
+    def fill(text):
+        if not isinstance(text, str):
+            return text
+        return text.replace(NAME_PLACEHOLDER, learner_name).replace(SUBJECT_PLACEHOLDER, subject)
+
+    personalized = {key: fill(value) for key, value in message.items()}
+    if isinstance(message.get("suggestions"), list):
+        personalized["suggestions"] = [fill(s) for s in message["suggestions"]]
+    return personalized
+
+
+class SupportMessagePool:
+    """
+    Variantes de messages de soutien pré-générées par l'IA, par
+    (intervention_type, severity, catégorie de sujet).
+
+    - get() ne bloque jamais : variante suivante en rotation, ou None si le
+      pool de cette clé est vide / expiré (la génération est alors planifiée)
+    - un thread daemon unique génère les variantes manquantes en arrière-plan
+    - chaque pool est régénéré après CLEO_SUPPORT_POOL_TTL_SECONDS
+    - un pool incomplet (génération interrompue) est servi tel quel et n'est
+      recomplété qu'après SUPPORT_POOL_RETRY_SECONDS, pas à chaque get()
+    """
+
+    def __init__(self, generate, size: int = SUPPORT_POOL_SIZE,
+                 ttl_seconds: float = SUPPORT_POOL_TTL_SECONDS):
+        self._generate = generate  # (intervention_type, severity, category) -> dict | None
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self._pools: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._pending = set()
+        self._retry_after: Dict[Tuple[str, str, str], float] = {}
+        self._queue: "queue.Queue[Tuple[str, str, str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.stats = {"hits": 0, "misses": 0, "generated": 0, "failures": 0}
+
+    def get(self, intervention_type: str, severity: str, category: str) -> Optional[Dict[str, Any]]:
+        key = (intervention_type, severity, category)
+        with self._lock:
+            pool = self._pools.get(key)
+            fresh = pool is not None and time.monotonic() - pool["loaded_at"] < self.ttl_seconds
+            if not fresh or len(pool["variants"]) < self.size:
+                self._schedule(key)
+            if not pool or not pool["variants"]:
+                self.stats["misses"] += 1
+                return None
+            variants = pool["variants"]
+            message = variants[pool["cursor"] % len(variants)]
+            pool["cursor"] += 1
+            self.stats["hits"] += 1
+            return message
+
+    def _schedule(self, key):
+        """Planifie la (re)génération d'une clé ; appelé sous self._lock."""
+        if key in self._pending or time.monotonic() < self._retry_after.get(key, 0.0):
+            return
+        self._pending.add(key)
+        self._queue.put(key)
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="support-pool-refresh", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            try:
+                self._refresh(key)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def _refresh(self, key):
+        variants = []
+        for _ in range(self.size):
+            try:
+                variant = self._generate(*key)
+            except Exception as e:
+                logger.warning("Support message generation failed for %s: %s", key, e)
+                variant = None
+            if variant is None:
+                self.stats["failures"] += 1
+                break
+            variants.append(variant)
+        with self._lock:
+            if len(variants) < self.size:
+                self._retry_after[key] = time.monotonic() + SUPPORT_POOL_RETRY_SECONDS
+            else:
+                self._retry_after.pop(key, None)
+            if not variants:
+                return
+            self._pools[key] = {"variants": variants, "cursor": 0, "loaded_at": time.monotonic()}
+            self.stats["generated"] += len(variants)
+        logger.info("Support message pool refreshed for %s (%s variants)", key, len(variants))
+
+    def warm(self, keys):
+        """Planifie la génération de plusieurs clés (ex. au démarrage)."""
+        with self._lock:
+            for key in keys:
+                self._schedule(tuple(key))
+
 
 class SupportAgent:
     """
@@ -17,10 +142,39 @@ class SupportAgent:
     LOW_CONFIDENCE_THRESHOLD = 0.4
     FRUSTRATION_THRESHOLD = 0.5
     
+    SEVERITIES = ("low", "medium", "high")
+    
+    TYPE_INSTRUCTIONS = {
+        "stress_management": "The learner is showing signs of stress. Provide calming, supportive advice and suggest taking a break.",
+        "encouragement_learning": "The learner is struggling with questions. Provide encouragement and remind them that mistakes are part of learning.",
+        "motivational": "The learner is frustrated. Provide motivation and perspective on their progress.",
+        "emotional_support": "The learner seems down. Provide empathetic, uplifting support.",
+        "general_support": "Provide general encouragement and check-in."
+    }
+    
     def __init__(self, groq_client=None):
         self.groq_client = groq_client
+        self.message_pool = SupportMessagePool(self._generate_pool_variant) if groq_client else None
         logger.info("SupportAgent initialized")
     
+    def warm_message_pool(self):
+        """
+        Planifie en arrière-plan (si CLEO_SUPPORT_POOL_WARM=1) la génération des
+        variantes d'un petit jeu de clés : chaque type d'intervention, sévérité
+        « medium », catégorie « General ». Les autres clés se remplissent au
+        premier échec de get().
+        """
+        if self.message_pool is None or not SUPPORT_POOL_WARM:
+            return
+        keys = [
+            (intervention_type, severity, category)
+            for intervention_type in self.TYPE_INSTRUCTIONS
+            for severity in SUPPORT_POOL_WARM_SEVERITIES
+            for category in SUPPORT_POOL_WARM_CATEGORIES
+        ]
+        self.message_pool.warm(keys)
+        logger.info("Support message pool warm-up scheduled (%d keys)", len(keys))
+    
     def should_intervene(
         self,
         recent_emotions: List[Dict[str, Any]],
@@ -28,19 +182,67 @@ class SupportAgent:
         learner_context: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
-        Détermine si une intervention est nécessaire.
+        Détermine si une intervention est nécessaire à partir de listes
+        d'émotions et de réponses (les plus récentes en premier).
         
         Returns:
             dict avec should_intervene (bool), reason (str), severity (str)
         """
+        emotions = None
+        if recent_emotions:
+            count = len(recent_emotions)
+            emotions = {
+                "stress": sum(e.get('stress_level', e.get('stress', 0)) or 0 for e in recent_emotions) / count,
+                "frustration": sum((e.get('angry', 0) or 0) + (e.get('disgust', 0) or 0) for e in recent_emotions) / count / 2,
+                "sadness": sum(e.get('sad', 0) or 0 for e in recent_emotions) / count,
+            }
+        
+        answers = None
+        if recent_answers:
+            consecutive_errors = 0
+            for answer in recent_answers:
+                if not answer.get('is_correct'):
+                    consecutive_errors += 1
+                else:
+                    break
+            answers = {
+                "consecutive_errors": consecutive_errors,
+                "slow_answers": sum(1 for a in recent_answers if (a.get('time_taken_seconds') or 0) > 120),
+            }
+        
+        return self._decide(emotions, answers, learner_context)
+    
+    def should_intervene_from_state(
+        self,
+        state,
+        quiz_session_id: Optional[int] = None,
+        learner_context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Même décision que should_intervene, lue en O(1) dans l'état incrémental
+        de l'apprenant (backend/core/intervention_state.py).
+        """
+        return self._decide(
+            state.emotion_averages(),
+            state.answer_signals(quiz_session_id),
+            learner_context
+        )
+    
+    def _decide(
+        self,
+        emotions: Optional[Dict[str, float]],
+        answers: Optional[Dict[str, int]],
+        learner_context: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Applique les seuils aux moyennes d'émotions et compteurs de réponses."""
         reasons = []
         severity = "low"
         
         # 1. Analyser émotions récentes
-        if recent_emotions:
-            avg_stress = sum(e.get('stress', 0) for e in recent_emotions) / len(recent_emotions)
-            avg_frustration = sum(e.get('angry', 0) + e.get('disgust', 0) for e in recent_emotions) / len(recent_emotions) / 2
-            avg_sadness = sum(e.get('sad', 0) for e in recent_emotions) / len(recent_emotions)
+        if emotions:
+            avg_stress = emotions["stress"]
+            avg_frustration = emotions["frustration"]
+            avg_sadness = emotions["sadness"]
             
             if avg_stress > self.STRESS_THRESHOLD:
                 reasons.append(f"High stress detected ({avg_stress:.0%})")
@@ -55,22 +257,15 @@ class SupportAgent:
                 severity = "medium" if severity == "low" else severity
         
         # 2. Analyser performance récente
-        if recent_answers:
+        if answers:
             # Erreurs consécutives
-            consecutive_errors = 0
-            for answer in reversed(recent_answers):
-                if not answer.get('is_correct'):
-                    consecutive_errors += 1
-                else:
-                    break
-            
+            consecutive_errors = answers["consecutive_errors"]
             if consecutive_errors >= self.CONSECUTIVE_ERRORS_THRESHOLD:
                 reasons.append(f"{consecutive_errors} consecutive errors")
                 severity = "high"
             
             # Temps excessif sur questions
-            long_answers = [a for a in recent_answers if a.get('time_taken_seconds', 0) > 120]
-            if len(long_answers) >= 2:
+            if answers["slow_answers"] >= 2:
                 reasons.append("Taking unusually long on questions")
                 severity = "medium" if severity == "low" else severity
         
@@ -109,41 +304,38 @@ class SupportAgent:
         self,
         intervention_type: str,
         learner_name: str = "there",
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        severity: str = "medium"
     ) -> Dict[str, Any]:
         """
         Génère un message de soutien personnalisé.
+        
+        ⭐ Ne bloque jamais sur l'IA : le message vient du pool de variantes
+        pré-générées (rotation) ; si le pool de cette situation est encore
+        vide, on répond avec le template et la génération part en arrière-plan.
         """
-        if self.groq_client:
-            return self._generate_ai_support_message(intervention_type, learner_name, context)
-        else:
-            return self._get_template_support_message(intervention_type, learner_name)
+        subject = (context or {}).get("current_subject")
+        if self.message_pool is not None:
+            from backend.core.subject_catalog import subject_catalog
+            category = subject_catalog.category_of(subject)
+            variant = self.message_pool.get(intervention_type, severity, category)
+            if variant is not None:
+                message = personalize_message(variant, learner_name, subject)
+                message["intervention_type"] = intervention_type
+                return message
+        return self._get_template_support_message(intervention_type, learner_name)
     
-    def _generate_ai_support_message(
-        self,
-        intervention_type: str,
-        learner_name: str,
-        context: Optional[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """Génère message via IA."""
-        
-        type_instructions = {
-            "stress_management": "The learner is showing signs of stress. Provide calming, supportive advice and suggest taking a break.",
-            "encouragement_learning": "The learner is struggling with questions. Provide encouragement and remind them that mistakes are part of learning.",
-            "motivational": "The learner is frustrated. Provide motivation and perspective on their progress.",
-            "emotional_support": "The learner seems down. Provide empathetic, uplifting support.",
-            "general_support": "Provide general encouragement and check-in."
-        }
-        
-        instruction = type_instructions.get(intervention_type, type_instructions["general_support"])
-        
-        context_str = ""
-        if context:
-            context_str = f"\nContext: {context.get('current_subject', 'N/A')} - Bloom Level {context.get('bloom_level', 'N/A')}"
+    def _generate_pool_variant(self, intervention_type: str, severity: str, category: str) -> Optional[Dict[str, Any]]:
+        """Génère via IA une variante réutilisable (prénom et sujet en marqueurs)."""
+        instruction = self.TYPE_INSTRUCTIONS.get(intervention_type, self.TYPE_INSTRUCTIONS["general_support"])
         
-        prompt = f"""You are CLEO, an empathetic AI learning companion. A learner named {learner_name} needs emotional support.
+        prompt = f"""You are CLEO, an empathetic AI learning companion. A learner needs emotional support.
 
-Situation: {instruction}{context_str}
+Situation: {instruction}
+Severity: {severity}
+Subject category: {category}
+
+Write the learner's first name exactly as {NAME_PLACEHOLDER} and the subject exactly as {SUBJECT_PLACEHOLDER}: they are filled in later.
 
 Generate a supportive response in JSON format:
 {{
@@ -153,28 +345,25 @@ Generate a supportive response in JSON format:
   "recommended_action": "break" or "continue" or "review"
 }}
 
-Be genuine, supportive, and actionable. Use a warm, friendly tone."""
+Be genuine, supportive, and actionable. Use a warm, friendly tone. Vary your wording."""
 
-        try:
-            response = self.groq_client.chat(prompt, max_tokens=400)
-            
-            import json
-            if "```json" in response:
-                json_str = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                json_str = response.split("```")[1].split("```")[0].strip()
-            else:
-                json_str = response.strip()
-            
-            data = json.loads(json_str)
-            data["intervention_type"] = intervention_type
-            
-            logger.info("AI support message generated for type: %s", intervention_type)
-            return data
-        
-        except Exception as e:
-            logger.exception("Failed to generate AI support message: %s", e)
-            return self._get_template_support_message(intervention_type, learner_name)
+        response = self.groq_client.chat(prompt, max_tokens=400, priority=Priority.BACKGROUND, agent="support")
+        data = self._parse_json_response(response)
+        if not isinstance(data, dict) or not data.get("message"):
+            return None
+        data.pop("intervention_type", None)
+        return data
+    
+    @staticmethod
+    def _parse_json_response(response: str) -> Any:
+        """Extrait le JSON d'une réponse IA (bloc ```json, ``` ou brut)."""
+        if "```json" in response:
+            json_str = response.split("```json")[1].split("```")[0].strip()
+        elif "```" in response:
+            json_str = response.split("```")[1].split("```")[0].strip()
+        else:
+            json_str = response.strip()
+        return json.loads(json_str)
     
     def _get_template_support_message(self, intervention_type: str, learner_name: str) -> Dict[str, Any]:
         """Messages template si IA indisponible."""
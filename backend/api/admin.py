@@ -7,13 +7,14 @@ from backend.models.database import get_db
 from backend.models.user import User, UserRole
 from backend.agents.admin_agent import AdminAgent
 from backend.api.auth import get_current_active_user
+from backend.core.dependencies import user_status_cache
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
 def get_admin_agent():
-    from backend.app import _state
-    agent = _state.get("admin_agent")
+    from backend.app import get_agent
+    agent = get_agent("admin_agent")
     if not agent:
         raise HTTPException(status_code=500, detail="AdminAgent not initialized")
     return agent
@@ -64,6 +65,93 @@ def get_platform_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/grading-stats")
+def get_grading_stats(current_user: User = Depends(require_admin)):
+    """Correction des réponses ouvertes : part corrigée localement vs escaladée à l'IA."""
+    from backend.core.answer_scorer import answer_scorer
+    return {
+        "success": True,
+        "stats": answer_scorer.snapshot()
+    }
+
+
+@router.get("/llm-scheduler")
+def get_llm_scheduler_stats(current_user: User = Depends(require_admin)):
+    """Ordonnanceur LLM : profondeur des files, temps d'attente et rejets par classe de priorité."""
+    from backend.core.llm_scheduler import llm_scheduler
+    return {
+        "success": True,
+        "stats": llm_scheduler.snapshot()
+    }
+
+
+@router.get("/llm-usage")
+def get_llm_usage(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """Consommation LLM du mois (tokens, appels, latence) par agent, route et tier."""
+    from sqlalchemy import func
+    from backend.core.llm_usage import llm_usage
+    from backend.models.llm_usage import LLMUsage
+    from backend.models.subscription import usage_period_start
+
+    llm_usage.flush()
+    period_start = usage_period_start()
+    totals = [
+        func.sum(LLMUsage.calls), func.sum(LLMUsage.errors), func.sum(LLMUsage.prompt_tokens),
+        func.sum(LLMUsage.completion_tokens), func.sum(LLMUsage.latency_ms_total),
+    ]
+
+    def breakdown(column):
+        rows = (db.query(column, *totals)
+                .filter(LLMUsage.period_start >= period_start)
+                .group_by(column)
+                .all())
+        result = [
+            {
+                "key": key,
+                "calls": calls or 0,
+                "errors": errors or 0,
+                "prompt_tokens": prompt_tokens or 0,
+                "completion_tokens": completion_tokens or 0,
+                "total_tokens": (prompt_tokens or 0) + (completion_tokens or 0),
+                "avg_latency_ms": round(latency / calls, 1) if calls else 0.0,
+            }
+            for key, calls, errors, prompt_tokens, completion_tokens, latency in rows
+        ]
+        return sorted(result, key=lambda r: r["total_tokens"], reverse=True)
+
+    return {
+        "success": True,
+        "period_start": period_start.isoformat(),
+        "by_agent": breakdown(LLMUsage.agent),
+        "by_route": breakdown(LLMUsage.route),
+        "by_tier": breakdown(LLMUsage.tier),
+        "process": llm_usage.snapshot()
+    }
+
+
+@router.get("/llm-usage/top-prompts")
+def get_llm_top_prompts(
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(require_admin)
+):
+    """Prompts les plus coûteux en tokens depuis le démarrage du processus."""
+    from backend.core.llm_usage import llm_usage
+    return {
+        "success": True,
+        "prompts": llm_usage.top_prompts(limit)
+    }
+
+
+@router.get("/prompt-stats")
+def get_prompt_stats(current_user: User = Depends(require_admin)):
+    """Gabarits de quiz : variante servie, taille estimée des prompts et taux de réponses exploitables (A/B)."""
+    from backend.core.prompt_builder import prompt_builder
+    return {
+        "success": True,
+        "stats": prompt_builder.snapshot()
+    }
+
+
 # ============================================================================
 # USER MANAGEMENT
 # ============================================================================
@@ -242,6 +330,7 @@ def delete_user(
         
         db.delete(user)
         db.commit()
+        user_status_cache.invalidate(user_id)
         
         logger.info(f"✅ User deleted by admin: {username}")
         
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
@@ -9,6 +9,7 @@ from backend.models.database import get_db
 from backend.models.user import User, UserRole
 from backend.core.security import verify_password, get_password_hash, create_access_token
 from backend.core.config import settings
+from backend.core.dependencies import authenticate_token
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
@@ -48,76 +49,18 @@ class TokenData(BaseModel):
 # ============================================================================
 
 def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
     """
     Récupère l'utilisateur actuel à partir du token JWT.
+
+    ⭐ Délègue à authenticate_token : le token est décodé et l'utilisateur chargé
+    une seule fois par requête, quel que soit le nombre de dépendances qui
+    en ont besoin.
     """
-    import jwt
-    from jwt.exceptions import InvalidTokenError
-    import logging
-    logger = logging.getLogger("backend.app")
-    
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        logger.info(f"🔐 Validating token (length: {len(token) if token else 0})")
-        
-        # ⭐ Vérifier que le token n'est pas vide
-        if not token or token == "undefined" or token == "null":
-            logger.warning("❌ Token is empty or invalid string")
-            raise credentials_exception
-        
-        # Décoder le token
-        from backend.core.config import settings
-        
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        
-        user_id: str = payload.get("sub")
-        
-        logger.info(f"✅ Token decoded: user_id={user_id}")
-        
-        if user_id is None:
-            logger.warning("❌ No 'sub' in token payload")
-            raise credentials_exception
-        
-        token_data = TokenData(user_id=int(user_id))
-        
-    except jwt.ExpiredSignatureError:
-        logger.warning("❌ Token expired")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has expired",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except jwt.InvalidTokenError as e:
-        logger.warning(f"❌ Invalid token: {e}")
-        raise credentials_exception
-    except Exception as e:
-        logger.exception(f"❌ Error validating token: {e}")
-        raise credentials_exception
-    
-    # Récupérer l'utilisateur de la DB
-    user = db.query(User).filter(User.id == token_data.user_id).first()
-    
-    if user is None:
-        logger.warning(f"❌ User not found in DB: id={token_data.user_id}")
-        raise credentials_exception
-    
-    logger.info(f"✅ User authenticated: {user.username} (ID: {user.id})")
-    
-    return user
-    
-    
+    return authenticate_token(request, token, db, require_active=False)
 
 
 def get_current_active_user(
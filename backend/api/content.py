@@ -6,8 +6,8 @@ router = APIRouter(prefix="/api/content", tags=["content"])
 
 
 def get_content_agent():
-    from backend.app import _state
-    agent = _state.get("content_agent")
+    from backend.app import get_agent
+    agent = get_agent("content_agent")
     if not agent:
         raise HTTPException(status_code=503, detail="ContentAgent not initialized")
     return agent
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session, defer
 from typing import Optional
 import logging 
 
 from backend.api.auth import get_current_active_user
 from backend.models.database import get_db
 from backend.agents.analytics_agent import AnalyticsAgent
+from backend.core.dependencies import get_request_subscription
+from backend.core.pagination import keyset_page
+from backend.core.http_cache import make_etag, is_not_modified, not_modified_response, set_etag
+from backend.core.response_cache import learner_versions, response_cache
 from datetime import datetime, timedelta
 
 from backend.models.quiz_session import QuizSession
-from backend.models.subscription import Subscription
 from backend.models.user import User
 
 logger = logging.getLogger("backend.app")
@@ -17,24 +20,111 @@ router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 
 def get_analytics_agent():
-    from backend.app import _state
-    agent = _state.get("analytics_agent")
+    from backend.app import get_agent
+    agent = get_agent("analytics_agent")
     if not agent:
         raise HTTPException(status_code=503, detail="AnalyticsAgent not initialized")
     return agent
 
 
+@router.get("/history")
+def get_quiz_history(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    view: str = Query("summary", pattern="^(summary|full)$"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Récupère l'historique des quiz selon le plan.
+
+    ⭐ Pagination keyset sur (completed_at, id) : passer `next_cursor` comme
+    `cursor` pour la page suivante. view=summary (défaut) n'envoie pas
+    questions_data, qui n'est alors même pas lu en base.
+    
+    Déclarée avant /{learner_id} pour ne pas être capturée par cette route.
+    """
+    try:
+        subscription = get_request_subscription(request, current_user, db, create_if_missing=False)
+        
+        limits = subscription.get_limits() if subscription else {"analytics_history_days": 7}
+        history_days = limits["analytics_history_days"]
+        
+        # ⭐ Calculer la date limite
+        cutoff_date = datetime.utcnow() - timedelta(days=history_days)
+        
+        learner_id = f"user_{current_user.id}"
+        query = db.query(QuizSession).filter(
+            QuizSession.learner_id == learner_id,
+            QuizSession.completed_at >= cutoff_date  # ⭐ Filtrer par date
+        )
+        
+        if view == "summary":
+            query = query.options(defer(QuizSession.questions_data))
+            serialize = QuizSession.to_summary_dict
+        else:
+            serialize = QuizSession.to_dict
+        
+        try:
+            page = keyset_page(
+                query, QuizSession.completed_at, QuizSession.id,
+                limit=limit, cursor=cursor, descending=True, serialize=serialize
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        result = {
+            "sessions": page["items"],
+            "history_days": history_days,
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
+        }
+        if cursor is None:
+            # Le total n'est calculé qu'à la première page (index couvrant)
+            result["total_sessions"] = query.order_by(None).count()
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"❌ Error fetching history: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching history: {str(e)}"
+        )
+
+
+def _learner_analytics(learner_id: str, db: Session, analytics_agent: AnalyticsAgent, version: str):
+    """
+    Analytics complètes d'un apprenant, calculées une seule fois par version de
+    ses données et partagées par le dashboard, bloom-stats et recommendations.
+    """
+    return response_cache.get_or_compute(
+        ("learner_analytics", learner_id, version),
+        lambda: analytics_agent.generate_learner_analytics(learner_id, db)
+    )
+
+
 @router.get("/{learner_id}")
 def get_learner_dashboard(
     learner_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     analytics_agent: AnalyticsAgent = Depends(get_analytics_agent)
 ):
     """
     Récupère le dashboard complet d'un apprenant avec toutes les analytics.
     """
+    version = learner_versions.token(learner_id, "quiz")
+    etag = make_etag("dashboard", learner_id, version, weak=False)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
     try:
-        analytics = analytics_agent.generate_learner_analytics(learner_id, db)
+        analytics = _learner_analytics(learner_id, db, analytics_agent, version)
+        set_etag(response, etag)
         return {
             "success": True,
             "analytics": analytics
@@ -46,12 +136,20 @@ def get_learner_dashboard(
 @router.get("/{learner_id}/bloom-stats")
 def get_bloom_stats(
     learner_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     analytics_agent: AnalyticsAgent = Depends(get_analytics_agent)
 ):
     """Récupère uniquement les stats Bloom."""
+    version = learner_versions.token(learner_id, "quiz")
+    etag = make_etag("bloom-stats", learner_id, version, weak=False)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
     try:
-        analytics = analytics_agent.generate_learner_analytics(learner_id, db)
+        analytics = _learner_analytics(learner_id, db, analytics_agent, version)
+        set_etag(response, etag)
         return analytics["bloom_stats"]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -60,12 +158,20 @@ def get_bloom_stats(
 @router.get("/{learner_id}/recommendations")
 def get_recommendations(
     learner_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     analytics_agent: AnalyticsAgent = Depends(get_analytics_agent)
 ):
     """Récupère uniquement les recommandations."""
+    version = learner_versions.token(learner_id, "quiz")
+    etag = make_etag("recommendations", learner_id, version, weak=False)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
     try:
-        analytics = analytics_agent.generate_learner_analytics(learner_id, db)
+        analytics = _learner_analytics(learner_id, db, analytics_agent, version)
+        set_etag(response, etag)
         return {
             "recommendations": analytics["recommendations"],
             "strengths": analytics["strengths"],
@@ -73,40 +179,3 @@ def get_recommendations(
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/history")
-def get_quiz_history(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Récupère l'historique des quiz selon le plan."""
-    try:
-        subscription = db.query(Subscription).filter(
-            Subscription.user_id == current_user.id
-        ).first()
-        
-        limits = subscription.get_limits() if subscription else {"analytics_history_days": 7}
-        history_days = limits["analytics_history_days"]
-        
-        # ⭐ Calculer la date limite
-        cutoff_date = datetime.utcnow() - timedelta(days=history_days)
-        
-        # Récupérer sessions
-        learner_id = f"user_{current_user.id}"
-        sessions = db.query(QuizSession).filter(
-            QuizSession.learner_id == learner_id,
-            QuizSession.completed_at >= cutoff_date  # ⭐ Filtrer par date
-        ).order_by(QuizSession.completed_at.desc()).all()
-        
-        return {
-            "sessions": [s.to_dict() for s in sessions],
-            "history_days": history_days,
-            "total_sessions": len(sessions)
-        }
-        
-    except Exception as e:
-        logger.exception(f"❌ Error fetching history: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error fetching history: {str(e)}"
-        )
\ No newline at end of file
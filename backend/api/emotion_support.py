@@ -1,22 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session, defer
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime, timedelta
 
 from backend.models.database import get_db
 from backend.models.emotion_log import EmotionLog
 from backend.models.support_intervention import SupportIntervention
-from backend.models.answer import Answer
-from backend.models.quiz_session import QuizSession
 from backend.agents.support_agent import SupportAgent
+from backend.core.emotion_buffer import emotion_buffer, reading_from_payload
+from backend.core.intervention_state import intervention_states
+from backend.core.pagination import keyset_page
+from backend.core.http_cache import make_etag, is_not_modified, not_modified_response, set_etag
+from backend.core.response_cache import learner_versions, response_cache
 
 router = APIRouter(prefix="/api/emotion-support", tags=["emotion_support"])
 
 
 def get_support_agent():
-    from backend.app import _state
-    agent = _state.get("support_agent")
+    from backend.app import get_agent
+    agent = get_agent("support_agent")
     if not agent:
         raise HTTPException(status_code=503, detail="SupportAgent not initialized")
     return agent
@@ -37,6 +40,14 @@ class EmotionData(BaseModel):
     detection_method: str = "webcam"
 
 
+class EmotionReading(EmotionData):
+    detected_at: Optional[datetime] = None  # horodatage client (sinon réception)
+
+
+class EmotionBatch(BaseModel):
+    readings: List[EmotionReading] = Field(..., min_length=1, max_length=1000)
+
+
 class InterventionFeedback(BaseModel):
     intervention_id: int
     was_helpful: bool
@@ -72,6 +83,8 @@ def log_emotion(
         db.add(emotion_log)
         db.commit()
         db.refresh(emotion_log)
+        learner_versions.bump(payload.learner_id, "emotion")
+        intervention_states.record_emotion(payload.learner_id, emotion_log.to_dict())
         
         return {
             "success": True,
@@ -83,6 +96,28 @@ def log_emotion(
         raise HTTPException(status_code=500, detail=f"Error logging emotion: {str(e)}")
 
 
+@router.post("/log-emotions/batch", status_code=202)
+def log_emotions_batch(payload: EmotionBatch):
+    """
+    Enregistre un lot de lectures d'émotions (webcam).
+
+    ⭐ Pas d'écriture synchrone : les lectures sont agrégées par fenêtre puis
+    écrites en lot par le buffer (voir backend/core/emotion_buffer.py).
+    """
+    received_at = datetime.utcnow()
+    readings = [reading_from_payload(r.model_dump(), received_at) for r in payload.readings]
+    rows = emotion_buffer.add(readings)
+    for row in rows:
+        intervention_states.record_emotion(row["learner_id"], row)
+    
+    return {
+        "success": True,
+        "accepted": len(readings),
+        "stored_rows": len(rows),
+        "pending_rows": emotion_buffer.pending()
+    }
+
+
 @router.post("/check-intervention/{learner_id}")
 def check_intervention(
     learner_id: str,
@@ -92,42 +127,27 @@ def check_intervention(
 ):
     """
     Vérifie si une intervention est nécessaire pour cet apprenant.
+
+    ⭐ Lecture O(1) de l'état incrémental (moyennes glissantes, compteurs)
+    alimenté par log-emotion, le lot d'émotions et submit-answer. La base
+    n'est lue qu'au premier appel pour un apprenant (réhydratation) et
+    écrite seulement si une intervention est déclenchée.
     """
     try:
-        # Récupérer émotions récentes (dernières 5 minutes)
-        five_min_ago = datetime.utcnow() - timedelta(minutes=5)
-        recent_emotions = db.query(EmotionLog).filter(
-            EmotionLog.learner_id == learner_id,
-            EmotionLog.detected_at >= five_min_ago
-        ).order_by(EmotionLog.detected_at.desc()).limit(10).all()
-        
-        emotions_data = [e.to_dict() for e in recent_emotions]
-        
-        # Récupérer réponses récentes
-        recent_answers = []
-        if quiz_session_id:
-            answers = db.query(Answer).filter(
-                Answer.learner_id == learner_id,
-                Answer.quiz_session_id == quiz_session_id
-            ).order_by(Answer.answered_at.desc()).limit(5).all()
-            recent_answers = [a.to_dict() for a in answers]
+        state = intervention_states.get(learner_id)
+        if state.needs_hydration(quiz_session_id):
+            # Les lectures en buffer doivent être en base avant la réhydratation
+            if emotion_buffer.pending():
+                emotion_buffer.flush()
+            state = intervention_states.hydrate(learner_id, quiz_session_id, db)
         
         # Contexte session
-        learner_context = {}
-        if quiz_session_id:
-            session = db.query(QuizSession).filter(QuizSession.id == quiz_session_id).first()
-            if session and session.started_at:
-                duration = (datetime.utcnow() - session.started_at).total_seconds() / 60
-                learner_context = {
-                    "session_duration_minutes": duration,
-                    "current_subject": session.subject_name,
-                    "bloom_level": session.bloom_level
-                }
+        learner_context = state.session_context(quiz_session_id) or {}
         
         # Vérifier besoin d'intervention
-        decision = support_agent.should_intervene(
-            recent_emotions=emotions_data,
-            recent_answers=recent_answers,
+        decision = support_agent.should_intervene_from_state(
+            state,
+            quiz_session_id=quiz_session_id,
             learner_context=learner_context
         )
         
@@ -136,7 +156,8 @@ def check_intervention(
             support_message = support_agent.generate_support_message(
                 intervention_type=decision["intervention_type"],
                 learner_name=learner_id.split('_')[0].title(),
-                context=learner_context
+                context=learner_context,
+                severity=decision["severity"]
             )
             
             # Enregistrer intervention
@@ -230,26 +251,53 @@ def get_motivational_quotes(
 @router.get("/emotion-history/{learner_id}")
 def get_emotion_history(
     learner_id: str,
+    request: Request,
+    response: Response,
     hours: int = 24,
+    limit: int = Query(500, ge=1, le=2000),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Récupère l'historique émotionnel d'un apprenant.
+
+    ⭐ Pagination keyset sur (detected_at, id), ordre chronologique : passer
+    `next_cursor` comme `cursor` pour la page suivante. raw_data n'est pas lu.
     """
-    try:
+    version = learner_versions.token(learner_id, "emotion")
+    etag = make_etag("emotion-history", learner_id, hours, limit, cursor, version, weak=False)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    def build():
         time_ago = datetime.utcnow() - timedelta(hours=hours)
         
-        emotions = db.query(EmotionLog).filter(
+        query = db.query(EmotionLog).options(defer(EmotionLog.raw_data)).filter(
             EmotionLog.learner_id == learner_id,
             EmotionLog.detected_at >= time_ago
-        ).order_by(EmotionLog.detected_at.asc()).all()
+        )
+        page = keyset_page(
+            query, EmotionLog.detected_at, EmotionLog.id,
+            limit=limit, cursor=cursor, descending=False
+        )
         
         return {
             "learner_id": learner_id,
             "period_hours": hours,
-            "emotions": [e.to_dict() for e in emotions]
+            "emotions": page["items"],
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
     
+    try:
+        payload = response_cache.get_or_compute(
+            ("emotion_history", learner_id, hours, limit, cursor, version), build
+        )
+        set_etag(response, etag)
+        return payload
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching emotion history: {str(e)}")
 
@@ -1,16 +1,29 @@
 from asyncio.log import logger
 import traceback
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+import os
+import time
 import uuid
 from datetime import datetime
 from backend.api.auth import get_current_active_user
+from backend.core.dependencies import get_request_subscription
+from backend.core.http_cache import make_etag, is_not_modified, not_modified_response, set_etag
+from backend.core.response_cache import learner_versions, response_cache
+from backend.core.intervention_state import intervention_states
+from backend.core.answer_scorer import answer_scorer
+from backend.core.question_index import question_index, upsert_questions
+from backend.core import irt
+from backend.core.llm_scheduler import Priority, llm_scheduler
+from backend.core.llm_usage import llm_usage
+from backend.core.agents import MemoryAgent
 from backend.schemas.quiz_schemas import HintRequest
 from backend.models.subscription import Subscription
 #from backend.middleware.quota_checker import check_quiz_quota, increment_quiz_usage
-from backend.middleware.quota_checker import  check_quiz_quota, increment_ai_hint_usage, increment_quiz_usage  # ⭐ AJOUTER
+from backend.middleware.quota_checker import  check_quiz_quota, consume_ai_hint_quota, consume_quiz_quota  # ⭐ AJOUTER
 
 from backend.models.database import get_db
 from backend.models.question import Question
@@ -18,37 +31,43 @@ from backend.models.quiz_session import QuizSession
 from backend.models.answer import Answer
 from backend.models.subject import Subject
 from backend.models.learner_progress import LearnerProgress
+from backend.models.review_item import ReviewItem, ReviewQueue
 from backend.agents.quiz_agent import QuizAgent
 from backend.agents.evaluation_agent import EvaluationAgent
 from backend.agents.bloom_agent import BloomAgent
 from backend.models.user import User
-from backend.middleware.quota_checker import increment_ai_hint_usage
 import logging 
 
 logger = logging.getLogger("backend.app")
 router = APIRouter(prefix="/api/quiz", tags=["quiz"])
 
+# Assembler le quiz depuis la banque de questions (sélection IRT) avant d'appeler le LLM
+IRT_BANK_FIRST = os.getenv("CLEO_IRT_BANK_FIRST", "1") not in ("0", "false", "False")
+
+# Répétition espacée (SM-2) des questions répondues
+memory_agent = MemoryAgent()
+
 
 # Dépendances pour récupérer les agents
 def get_quiz_agent():
-    from backend.app import _state
-    agent = _state.get("quiz_agent")
+    from backend.app import get_agent
+    agent = get_agent("quiz_agent")
     if not agent:
         raise HTTPException(status_code=503, detail="QuizAgent not initialized")
     return agent
 
 
 def get_evaluation_agent():
-    from backend.app import _state
-    agent = _state.get("evaluation_agent")
+    from backend.app import get_agent
+    agent = get_agent("evaluation_agent")
     if not agent:
         raise HTTPException(status_code=503, detail="EvaluationAgent not initialized")
     return agent
 
 
 def get_bloom_agent():
-    from backend.app import _state
-    agent = _state.get("bloom_agent")
+    from backend.app import get_agent
+    agent = get_agent("bloom_agent")
     if not agent:
         raise HTTPException(status_code=503, detail="BloomAgent not initialized")
     return agent
@@ -72,6 +91,23 @@ class AnswerSubmitRequest(BaseModel):
     time_taken_seconds: int
 
 
+class BatchAnswerItem(BaseModel):
+    question_id: str
+    user_answer: Any
+    time_taken_seconds: int
+
+
+class BatchAnswerSubmitRequest(BaseModel):
+    session_id: str
+    answers: List[BatchAnswerItem] = Field(min_length=1, max_length=100)
+
+
+class ReviewQuizRequest(BaseModel):
+    learner_id: str
+    subject_id: int
+    num_questions: int = Field(default=10, ge=1, le=50)
+
+
 class QuizCompleteRequest(BaseModel):
     session_id: str
 
@@ -91,7 +127,8 @@ def generate_quiz(
 ):
     """
     Génère un nouveau quiz adaptatif.
-    Vérifie automatiquement les quotas avant génération.
+    Vérifie les quotas avant génération ; le quiz est compté (UPDATE gardé par
+    la limite du tier) dans la transaction qui crée la session.
     """
     try:
         logger.info(f"📝 Generating quiz for learner: {payload.learner_id}")
@@ -120,24 +157,49 @@ def generate_quiz(
         if bloom_level is None:
             bloom_level = progress.current_bloom_level if progress else 2
         
+        if not progress:
+            # θ et niveau Bloom sont suivis par (apprenant, sujet)
+            progress = LearnerProgress(
+                learner_id=payload.learner_id,
+                subject_id=payload.subject_id,
+                current_bloom_level=bloom_level
+            )
+            db.add(progress)
+        
         # Déterminer difficulté
         difficulty = payload.difficulty
         if difficulty is None:
             difficulty_range = bloom_agent.get_difficulty_range(bloom_level)
             difficulty = difficulty_range[0]
         
-        # Générer questions
-        logger.info(f"🤖 Generating {payload.num_questions} questions...")
-        questions = quiz_agent.generate_questions(
-            subject=subject.name,
-            topic=payload.topic,
-            bloom_level=bloom_level,
-            question_type=payload.question_type,
-            num_questions=payload.num_questions,
-            difficulty=difficulty
-        )
+        # ⭐ Questions de la banque les plus informatives au θ de l'apprenant ;
+        # le LLM n'est appelé que si la banque n'en a pas assez
+        questions = _select_from_bank(db, payload, bloom_level, progress) if IRT_BANK_FIRST else None
+        signatures = {}
         
-        logger.info(f"✅ Generated {len(questions)} questions")
+        if questions:
+            logger.info(f"🎯 Assembled {len(questions)} questions from the bank")
+        else:
+            logger.info(f"🤖 Generating {payload.num_questions} questions...")
+            questions = quiz_agent.generate_questions(
+                subject=subject.name,
+                topic=payload.topic,
+                bloom_level=bloom_level,
+                question_type=payload.question_type,
+                num_questions=payload.num_questions,
+                difficulty=difficulty
+            )
+            
+            # ⭐ Questions déjà en banque (identiques ou quasi identiques) remplacées
+            # par leur version canonique, doublons internes retirés
+            questions, signatures = question_index.canonicalize(db, payload.subject_id, subject.name, questions)
+            logger.info(f"✅ Generated {len(questions)} questions")
+        
+        # Embeddings des réponses modèles précalculés pour la correction locale
+        answer_scorer.precompute(questions)
+        
+        # ⭐ Consommer le quota (atomique, même transaction que la session)
+        consume_quiz_quota(subscription, db)
         
         # Créer session
         session_id = f"quiz_{uuid.uuid4().hex[:12]}"
@@ -158,34 +220,34 @@ def generate_quiz(
         )
         
         db.add(quiz_session)
-        db.commit()
-        db.refresh(quiz_session)
-        
-        logger.info(f"✅ Quiz session created: {session_id}")
         
-        # Sauvegarder questions
-        for q_data in questions:
-            existing_q = db.query(Question).filter(
-                Question.question_id == q_data.get("question_id")
-            ).first()
-            
-            if not existing_q:
-                new_question = Question(
-                    question_id=q_data.get("question_id"),
-                    subject_id=payload.subject_id,
-                    subject_name=subject.name,
-                    topic=payload.topic,
-                    bloom_level=q_data.get("bloom_level"),
-                    bloom_label=q_data.get("bloom_label"),
-                    question_type=q_data.get("question_type"),
-                    difficulty=q_data.get("difficulty"),
-                    points=q_data.get("points", 10),
-                    question_text=q_data.get("question_text"),
-                    question_data=q_data
-                )
-                db.add(new_question)
+        # ⭐ Nouvelles questions en bloc (questions de secours hors banque), même transaction que la session
+        question_ids = upsert_questions(db, [
+            {
+                "question_id": q_data.get("question_id"),
+                "subject_id": payload.subject_id,
+                "subject_name": subject.name,
+                "topic": payload.topic,
+                "bloom_level": q_data.get("bloom_level"),
+                "bloom_label": q_data.get("bloom_label"),
+                "question_type": q_data.get("question_type"),
+                "difficulty": q_data.get("difficulty"),
+                "points": q_data.get("points", 10),
+                "question_text": q_data.get("question_text"),
+                "question_data": q_data,
+                "minhash": signatures.get(q_data.get("question_id"))
+            }
+            for q_data in questions if not q_data.get("fallback")
+        ])
         
         db.commit()
+        db.refresh(quiz_session)
+        learner_versions.bump(payload.learner_id, "quiz")
+        intervention_states.get(payload.learner_id).start_session(
+            quiz_session.id, quiz_session.started_at, subject.name, bloom_level
+        )
+        
+        logger.info(f"✅ Quiz session created: {session_id} ({len(question_ids)} bank questions)")
         
         return {
             "session": quiz_session.to_dict(),
@@ -209,6 +271,224 @@ def generate_quiz(
         )
 
 
+def _answer_score(evaluation: Dict[str, Any]) -> float:
+    """Score 0-1 d'une réponse évaluée (fraction des points, sinon correct/incorrect)."""
+    possible = evaluation.get("points_possible") or 0
+    if possible:
+        return (evaluation.get("points_earned") or 0) / possible
+    return 1.0 if evaluation.get("is_correct") else 0.0
+
+
+def _learner_theta(progress: Optional[LearnerProgress]) -> float:
+    if progress is not None and progress.ability is not None:
+        return progress.ability
+    return irt.theta_for_level(progress.current_bloom_level if progress else None)
+
+
+def _select_from_bank(db: Session, payload: QuizGenerateRequest, bloom_level: int,
+                      progress: Optional[LearnerProgress]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Sélectionne dans la banque les `num_questions` questions (sujet, thème, type,
+    niveau Bloom) jamais répondues par l'apprenant et les plus informatives en θ.
+    Retourne None si la banque n'en contient pas assez.
+    """
+    answered = db.query(Answer.question_id).filter(
+        Answer.learner_id == payload.learner_id,
+        Answer.question_id.isnot(None)
+    )
+    candidates = db.query(Question).filter(
+        Question.subject_id == payload.subject_id,
+        Question.topic == payload.topic,
+        Question.question_type == payload.question_type,
+        Question.bloom_level == bloom_level,
+        Question.question_data.isnot(None),
+        ~Question.id.in_(answered)
+    ).all()
+    if len(candidates) < payload.num_questions:
+        return None
+    
+    theta = _learner_theta(progress)
+    items = [(q, *irt.item_parameters(q)) for q in candidates]
+    selected = irt.select_by_information(theta, items, payload.num_questions)
+    return [dict(q.question_data) for q in selected]
+
+
+def _update_ability(progress: Optional[LearnerProgress], db_question: Optional[Question],
+                    question_data: Dict[str, Any], evaluation: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """Mise à jour en ligne de θ (LearnerProgress.ability) après une réponse évaluée."""
+    if progress is None:
+        return None
+    a, b = irt.item_parameters(db_question, question_data)
+    progress.ability, progress.ability_se = irt.update_ability(
+        _learner_theta(progress), progress.ability_se, a, b, _answer_score(evaluation)
+    )
+    return {"theta": round(progress.ability, 3), "theta_se": round(progress.ability_se, 3)}
+
+
+def _session_progress(db: Session, session: QuizSession) -> Optional[LearnerProgress]:
+    return db.query(LearnerProgress).filter(
+        LearnerProgress.learner_id == session.learner_id,
+        LearnerProgress.subject_id == session.subject_id
+    ).first()
+
+
+@router.get("/next-question/{session_id}")
+def get_next_question(session_id: str, db: Session = Depends(get_db)):
+    """
+    Question suivante de la session : parmi celles non encore répondues,
+    la plus informative au θ courant de l'apprenant (IRT).
+    """
+    session = db.query(QuizSession).filter(QuizSession.session_id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Quiz session not found")
+    
+    answered = {
+        qid for (qid,) in db.query(Question.question_id).join(
+            Answer, Answer.question_id == Question.id
+        ).filter(Answer.quiz_session_id == session.id)
+    }
+    remaining = [q for q in (session.questions_data or []) if q.get("question_id") not in answered]
+    if not remaining:
+        return {"question": None, "remaining": 0}
+    
+    progress = _session_progress(db, session)
+    theta = _learner_theta(progress)
+    bank = {
+        q.question_id: q
+        for q in db.query(Question).filter(
+            Question.question_id.in_([q.get("question_id") for q in remaining])
+        )
+    }
+    items = [(q, *irt.item_parameters(bank.get(q.get("question_id")), q)) for q in remaining]
+    question = irt.select_by_information(theta, items)[0]
+    a, b = irt.item_parameters(bank.get(question.get("question_id")), question)
+    
+    return {
+        "question": question,
+        "remaining": len(remaining),
+        "theta": round(theta, 3),
+        "success_probability": round(irt.probability(theta, a, b), 3)
+    }
+
+
+@router.get("/review-queue/{learner_id}")
+def get_review_queue(
+    learner_id: str,
+    subject_id: Optional[int] = None,
+    limit: int = 20,
+    db: Session = Depends(get_db)
+):
+    """
+    Révisions dues pour l'apprenant : file précalculée du jour (batch
+    quotidien) si disponible, sinon range scan sur l'index des échéances.
+    Les questions de la file révisées depuis le batch (échéance repoussée
+    au-delà de la journée) sont retirées (une requête IN).
+    """
+    if subject_id is None:
+        queue = db.query(ReviewQueue).filter(ReviewQueue.learner_id == learner_id).first()
+        if queue and queue.queue_date == datetime.utcnow().date():
+            queued = queue.question_ids or []
+            end_of_day = datetime.combine(queue.queue_date, datetime.max.time())
+            still_due = {
+                question_id for (question_id,) in db.query(ReviewItem.question_id).filter(
+                    ReviewItem.learner_id == learner_id,
+                    ReviewItem.question_id.in_(queued),
+                    ReviewItem.due_at <= end_of_day
+                )
+            } if queued else set()
+            question_ids = [qid for qid in queued if qid in still_due]
+            return {
+                **queue.to_dict(),
+                "question_ids": question_ids[:limit],
+                "due_count": max((queue.due_count or 0) - (len(queued) - len(question_ids)), 0),
+                "source": "daily_batch"
+            }
+    
+    items = memory_agent.due_items(db, learner_id, limit=limit, subject_id=subject_id)
+    return {
+        "learner_id": learner_id,
+        "question_ids": [item.question_id for item in items],
+        "items": [item.to_dict() for item in items],
+        "due_count": len(items),
+        "source": "live"
+    }
+
+
+@router.post("/review/generate")
+def generate_review_quiz(
+    payload: ReviewQuizRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    subscription: Subscription = Depends(check_quiz_quota)
+):
+    """
+    Quiz de révision assemblé depuis la banque avec les questions dues
+    (répétition espacée) : aucun appel au LLM. Compté dans le quota quiz à la
+    création de la session, comme /generate.
+    """
+    try:
+        due = memory_agent.due_items(db, payload.learner_id, limit=payload.num_questions,
+                                     subject_id=payload.subject_id)
+        if not due:
+            raise HTTPException(status_code=404, detail="No reviews due for this subject")
+        
+        subject = db.query(Subject).filter(Subject.id == payload.subject_id).first()
+        if not subject:
+            raise HTTPException(status_code=404, detail="Subject not found")
+        
+        bank = {
+            q.id: q for q in db.query(Question).filter(Question.id.in_([item.question_id for item in due]))
+        }
+        questions = [
+            dict(bank[item.question_id].question_data)
+            for item in due
+            if item.question_id in bank and bank[item.question_id].question_data
+        ]
+        if not questions:
+            raise HTTPException(status_code=404, detail="No reviews due for this subject")
+        
+        progress = db.query(LearnerProgress).filter(
+            LearnerProgress.learner_id == payload.learner_id,
+            LearnerProgress.subject_id == payload.subject_id
+        ).first()
+        bloom_level = progress.current_bloom_level if progress else 2
+        
+        quiz_session = QuizSession(
+            session_id=f"quiz_{uuid.uuid4().hex[:12]}",
+            learner_id=payload.learner_id,
+            subject_id=payload.subject_id,
+            subject_name=subject.name,
+            topic="Review",
+            bloom_level=bloom_level,
+            question_type="review",
+            num_questions=len(questions),
+            total_questions=len(questions),
+            questions_data=questions,
+            initial_bloom_level=bloom_level,
+            status="in_progress"
+        )
+        consume_quiz_quota(subscription, db)
+        db.add(quiz_session)
+        db.commit()
+        db.refresh(quiz_session)
+        learner_versions.bump(payload.learner_id, "quiz")
+        intervention_states.get(payload.learner_id).start_session(
+            quiz_session.id, quiz_session.started_at, subject.name, bloom_level
+        )
+        
+        return {
+            "session": quiz_session.to_dict(),
+            "questions": questions
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"❌ Error generating review quiz: {e}")
+        raise HTTPException(status_code=500, detail=f"Error generating review quiz: {str(e)}")
+
+
 @router.post("/submit-answer")
 def submit_answer(
     payload: AnswerSubmitRequest,
@@ -241,70 +521,32 @@ def submit_answer(
             raise HTTPException(status_code=404, detail="Question not found in session")
         
         # Évaluer selon le type de question
-        question_type = question_data.get("question_type")
-        
-        if question_type == "mcq":
-            evaluation = eval_agent.evaluate_mcq(question_data, payload.user_answer)
-        elif question_type == "open_ended":
-            evaluation = eval_agent.evaluate_open_ended(
-                question_data, 
-                payload.user_answer,
-                use_ai=True
-            )
-        elif question_type == "true_false":
-            # ⭐ S'assurer que c'est un boolean
-            user_answer_bool = payload.user_answer
-            if isinstance(user_answer_bool, str):
-                user_answer_bool = user_answer_bool.lower() == 'true'
-            evaluation = eval_agent.evaluate_true_false(question_data, user_answer_bool)
-            
-        elif question_type == "matching":  # ⭐ NOUVEAU
-            evaluation = eval_agent.evaluate_matching(question_data, payload.user_answer)
-        else:
-            # Fallback pour autres types
-            evaluation = {
-                "is_correct": False,
-                "points_earned": 0,
-                "points_possible": question_data.get("points", 10),
-                "feedback": "Evaluation not yet implemented for this question type"
-            }
+        evaluation = eval_agent.evaluate(question_data, payload.user_answer, use_ai=True)
         
         # Récupérer question ID depuis DB
         db_question = db.query(Question).filter(
             Question.question_id == payload.question_id
         ).first()
         
-        # Créer réponse
-        answer = Answer(
-            quiz_session_id=session.id,
-            question_id=db_question.id if db_question else None,
-            learner_id=session.learner_id,
-            user_answer=str(payload.user_answer),
-            is_correct=evaluation.get("is_correct"),
-            points_earned=evaluation.get("points_earned"),
-            points_possible=evaluation.get("points_possible"),
-            score_percentage=evaluation.get("score_percentage"),
-            feedback=evaluation.get("feedback"),
-            explanation=evaluation.get("explanation"),
-            evaluation_data=evaluation,
-            time_taken_seconds=payload.time_taken_seconds,
-            evaluation_method=evaluation.get("evaluation_method", "unknown"),
-            confidence=evaluation.get("confidence", 0.5)
+        # Créer réponse et mettre à jour session
+        answer = _add_answer(
+            db, session, db_question, payload.user_answer, payload.time_taken_seconds, evaluation
         )
         
-        db.add(answer)
-        
-        # Mettre à jour session
-        session.questions_answered += 1
-        if evaluation.get("is_correct"):
-            session.correct_answers += 1
-        session.total_points_earned += evaluation.get("points_earned", 0)
-        session.total_points_possible += evaluation.get("points_possible", 0)
-        session.current_question_index += 1
+        # Mise à jour en ligne du niveau IRT de l'apprenant et de la répétition espacée
+        ability = _update_ability(_session_progress(db, session), db_question, question_data, evaluation)
+        if db_question:
+            memory_agent.record_reviews(
+                db, session.learner_id, session.subject_id, [(db_question.id, _answer_score(evaluation))]
+            )
         
         db.commit()
         db.refresh(answer)
         db.refresh(session)
+        learner_versions.bump(session.learner_id, "quiz")
+        intervention_states.record_answer(
+            session.learner_id, session.id, evaluation.get("is_correct"), payload.time_taken_seconds
+        )
         
         # Mettre à jour stats de la question
         if db_question:
@@ -323,7 +565,8 @@ def submit_answer(
         return {
             "answer": answer.to_dict(),
             "session": session.to_dict(),
-            "evaluation": evaluation
+            "evaluation": evaluation,
+            "ability": ability
         }
     
     except Exception as e:
@@ -331,12 +574,164 @@ def submit_answer(
         raise HTTPException(status_code=500, detail=f"Error submitting answer: {str(e)}")
 
 
+def _add_answer(db: Session, session: QuizSession, db_question: Optional[Question],
+                user_answer: Any, time_taken_seconds: int, evaluation: Dict[str, Any]) -> Answer:
+    """Ajoute la réponse évaluée à la transaction et met à jour les compteurs de session."""
+    answer = Answer(
+        quiz_session_id=session.id,
+        question_id=db_question.id if db_question else None,
+        learner_id=session.learner_id,
+        user_answer=str(user_answer),
+        is_correct=evaluation.get("is_correct"),
+        points_earned=evaluation.get("points_earned"),
+        points_possible=evaluation.get("points_possible"),
+        score_percentage=evaluation.get("score_percentage"),
+        feedback=evaluation.get("feedback"),
+        explanation=evaluation.get("explanation"),
+        evaluation_data=evaluation,
+        time_taken_seconds=time_taken_seconds,
+        evaluation_method=evaluation.get("evaluation_method", "unknown"),
+        confidence=evaluation.get("confidence", 0.5)
+    )
+    db.add(answer)
+    
+    session.questions_answered += 1
+    if evaluation.get("is_correct"):
+        session.correct_answers += 1
+    session.total_points_earned += evaluation.get("points_earned", 0)
+    session.total_points_possible += evaluation.get("points_possible", 0)
+    session.current_question_index += 1
+    return answer
+
+
+@router.post("/submit-answers")
+def submit_answers_batch(
+    payload: BatchAnswerSubmitRequest,
+    db: Session = Depends(get_db),
+    eval_agent: EvaluationAgent = Depends(get_evaluation_agent)
+):
+    """
+    Soumet et évalue toutes les réponses en attente d'une session.
+
+    ⭐ Les types déterministes sont corrigés directement, les réponses
+    ouvertes en appels IA concurrents (au lieu d'un appel bloquant par
+    /submit-answer). Réponses, compteurs de session et statistiques des
+    questions sont écrits en une seule transaction.
+    """
+    try:
+        session = db.query(QuizSession).filter(
+            QuizSession.session_id == payload.session_id
+        ).first()
+        
+        if not session:
+            raise HTTPException(status_code=404, detail="Quiz session not found")
+        
+        if session.status != "in_progress":
+            raise HTTPException(status_code=400, detail="Quiz session is not active")
+        
+        question_ids = [item.question_id for item in payload.answers]
+        if len(set(question_ids)) != len(question_ids):
+            raise HTTPException(status_code=400, detail="Duplicate question_id in batch")
+        
+        questions_by_id = {q.get("question_id"): q for q in (session.questions_data or [])}
+        missing = [qid for qid in question_ids if qid not in questions_by_id]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Questions not found in session: {', '.join(missing)}")
+        
+        # ⭐ Seules les réponses en attente : une soumission rejouée (ou mêlée à
+        # /submit-answer) ne doit pas recompter la session ni réappliquer θ / SM-2
+        already_answered = [
+            question_id for (question_id,) in db.query(Question.question_id)
+            .join(Answer, Answer.question_id == Question.id)
+            .filter(Answer.quiz_session_id == session.id, Question.question_id.in_(question_ids))
+        ]
+        if already_answered:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Questions already answered in this session: {', '.join(sorted(already_answered))}"
+            )
+        
+        # Évaluation (hors transaction : aucune écriture pendant les appels IA)
+        evaluations = eval_agent.evaluate_batch(
+            [(questions_by_id[item.question_id], item.user_answer) for item in payload.answers]
+        )
+        
+        db_questions = {
+            q.question_id: q
+            for q in db.query(Question).filter(Question.question_id.in_(question_ids)).all()
+        }
+        
+        answers = [
+            _add_answer(
+                db, session, db_questions.get(item.question_id),
+                item.user_answer, item.time_taken_seconds, evaluation
+            )
+            for item, evaluation in zip(payload.answers, evaluations)
+        ]
+        
+        progress = _session_progress(db, session)
+        ability = None
+        for item, evaluation in zip(payload.answers, evaluations):
+            ability = _update_ability(
+                progress, db_questions.get(item.question_id), questions_by_id[item.question_id], evaluation
+            ) or ability
+        memory_agent.record_reviews(
+            db, session.learner_id, session.subject_id,
+            [
+                (db_questions[item.question_id].id, _answer_score(evaluation))
+                for item, evaluation in zip(payload.answers, evaluations)
+                if item.question_id in db_questions
+            ]
+        )
+        
+        # Statistiques des questions : un seul GROUP BY pour tout le lot
+        db.flush()
+        question_pks = [q.id for q in db_questions.values()]
+        if question_pks:
+            stats = dict(
+                (question_pk, (total, correct or 0))
+                for question_pk, total, correct in db.query(
+                    Answer.question_id,
+                    func.count(Answer.id),
+                    func.sum(case((Answer.is_correct == True, 1), else_=0))
+                ).filter(Answer.question_id.in_(question_pks)).group_by(Answer.question_id)
+            )
+            for db_question in db_questions.values():
+                total, correct = stats.get(db_question.id, (0, 0))
+                db_question.times_used += 1
+                db_question.avg_success_rate = correct / max(total, 1)
+        
+        db.commit()
+        db.refresh(session)
+        learner_versions.bump(session.learner_id, "quiz")
+        for item, evaluation in zip(payload.answers, evaluations):
+            intervention_states.record_answer(
+                session.learner_id, session.id, evaluation.get("is_correct"), item.time_taken_seconds
+            )
+        
+        return {
+            "answers": [answer.to_dict() for answer in answers],
+            "session": session.to_dict(),
+            "evaluations": evaluations,
+            "ability": ability
+        }
+    
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"❌ Error submitting answers: {e}")
+        raise HTTPException(status_code=500, detail=f"Error submitting answers: {str(e)}")
+
+
 # ========================================
 # MODIFIER complete_quiz
 # ========================================
 
 @router.post("/complete")
 def complete_quiz(
+    request: Request,
     payload: QuizCompleteRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
@@ -344,7 +739,7 @@ def complete_quiz(
 ):
     """
     Complète un quiz et détermine si changement de niveau Bloom.
-    Incrémente automatiquement l'usage des quotas.
+    Le quota quiz a été consommé à la création de la session.
     """
     try:
         logger.info(f"🏁 Completing quiz session: {payload.session_id}")
@@ -365,34 +760,35 @@ def complete_quiz(
             time_diff = session.completed_at - session.started_at
             session.time_spent_seconds = int(time_diff.total_seconds())
         
-        # Récupérer scores récents de l'apprenant
-        recent_answers = db.query(Answer).filter(
-            Answer.learner_id == session.learner_id,
-            Answer.quiz_session_id == session.id
-        ).all()
+        progress = _session_progress(db, session)
         
-        recent_scores = [
-            a.points_earned / a.points_possible 
-            for a in recent_answers 
-            if a.points_possible and a.points_possible > 0
-        ]
-        
-        # Déterminer changement de niveau Bloom
-        bloom_decision = eval_agent.determine_next_bloom_level(
-            current_level=session.bloom_level,
-            recent_scores=recent_scores,
-            threshold_up=0.8,
-            threshold_down=0.5
-        )
+        # ⭐ Déterminer changement de niveau Bloom depuis θ (IRT, mis à jour à
+        # chaque réponse) ; moyenne des scores de la session en l'absence de θ
+        if progress is not None and progress.ability is not None:
+            bloom_decision = irt.bloom_decision(session.bloom_level, progress.ability, progress.ability_se)
+        else:
+            recent_answers = db.query(Answer).filter(
+                Answer.learner_id == session.learner_id,
+                Answer.quiz_session_id == session.id
+            ).all()
+            
+            recent_scores = [
+                a.points_earned / a.points_possible 
+                for a in recent_answers 
+                if a.points_possible and a.points_possible > 0
+            ]
+            
+            bloom_decision = eval_agent.determine_next_bloom_level(
+                current_level=session.bloom_level,
+                recent_scores=recent_scores,
+                threshold_up=0.8,
+                threshold_down=0.5
+            )
         
         session.final_bloom_level = bloom_decision.get("new_level")
         session.level_changed = (session.final_bloom_level != session.initial_bloom_level)
         
         # Mettre à jour progression de l'apprenant
-        progress = db.query(LearnerProgress).filter(
-            LearnerProgress.learner_id == session.learner_id,
-            LearnerProgress.subject_id == session.subject_id
-        ).first()
         
         if progress:
             progress.current_bloom_level = session.final_bloom_level
@@ -414,34 +810,20 @@ def complete_quiz(
         # ⭐ COMMIT #1 : Sauvegarder session et progress
         db.commit()
         db.refresh(session)
+        learner_versions.bump(session.learner_id, "quiz")
         
-        # ⭐ INCRÉMENTER L'USAGE (après le premier commit)
-        from backend.models.subscription import Subscription
-        from backend.middleware.quota_checker import increment_quiz_usage
-        
-        subscription = db.query(Subscription).filter(
-            Subscription.user_id == current_user.id
-        ).first()
+        # ⭐ Quota déjà consommé à la génération : simple lecture
+        subscription = get_request_subscription(request, current_user, db, create_if_missing=False)
         
         quota_info = None
         
         if subscription:
-            logger.info(f"📈 Before increment: {subscription.quizzes_this_month}")
-            
-            # Incrémenter
-            increment_quiz_usage(subscription, db)
-            
-            # Refresh pour obtenir la nouvelle valeur
-            db.refresh(subscription)
-            
-            logger.info(f"📈 After increment: {subscription.quizzes_this_month}")
-            
-            # ⭐ CONSTRUIRE quota_info avec les NOUVELLES COLONNES
             limits = subscription.get_limits()
+            quizzes_used = subscription.usage("quizzes")
             quota_info = {
-                "quizzes_used": subscription.quizzes_this_month,  # ⭐ Colonne, pas usage["quizzes_this_month"]
+                "quizzes_used": quizzes_used,
                 "quizzes_limit": limits["quizzes_per_month"],
-                "quizzes_remaining": limits["quizzes_per_month"] - subscription.quizzes_this_month
+                "quizzes_remaining": max(limits["quizzes_per_month"] - quizzes_used, 0)
             }
         else:
             logger.warning(f"⚠️ No subscription found for user {current_user.id}")
@@ -494,19 +876,30 @@ def get_quiz_session(session_id: str, db: Session = Depends(get_db)):
 @router.get("/history/{learner_id}")
 def get_quiz_history(
     learner_id: str,
+    request: Request,
+    response: Response,
     limit: int = 10,
     db: Session = Depends(get_db)
 ):
     """Récupère l'historique des quiz d'un apprenant."""
-    sessions = db.query(QuizSession).filter(
-        QuizSession.learner_id == learner_id
-    ).order_by(QuizSession.started_at.desc()).limit(limit).all()
+    version = learner_versions.token(learner_id, "quiz")
+    etag = make_etag("quiz-history", learner_id, limit, version, weak=False)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
     
-    return {
-        "learner_id": learner_id,
-        "total_sessions": len(sessions),
-        "sessions": [s.to_dict() for s in sessions]
-    }
+    def build():
+        sessions = db.query(QuizSession).filter(
+            QuizSession.learner_id == learner_id
+        ).order_by(QuizSession.started_at.desc()).limit(limit).all()
+        
+        return {
+            "learner_id": learner_id,
+            "total_sessions": len(sessions),
+            "sessions": [s.to_dict() for s in sessions]
+        }
+    
+    set_etag(response, etag)
+    return response_cache.get_or_compute(("quiz_history", learner_id, limit, version), build)
 
 @router.get("/test-matching/{subject_name}/{topic}")
 def test_matching_generation(
@@ -556,15 +949,17 @@ def get_ai_hint(
         # TODO: Générer un hint avec Groq
         hint = "This is a helpful hint generated by AI..."
         
-        # ⭐ INCRÉMENTER L'USAGE
-        increment_ai_hint_usage(subscription, db)
+        # ⭐ VÉRIFIER ET CONSOMMER L'USAGE (une instruction SQL)
+        current_usage = consume_ai_hint_quota(subscription, db)
         
         return {
             "hint": hint,
-            "current_usage": subscription.quizzes_this_month or 0,
+            "current_usage": current_usage,
             "hints_remaining": subscription.get_limits()["ai_hints_per_month"] - current_usage
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"❌ Error generating AI hint: {e}")
         raise HTTPException(
@@ -582,6 +977,7 @@ def get_ai_hint(
 # Ajoutez cette route
 @router.post("/get-hint")
 def get_ai_hint(
+    request: Request,
     payload: HintRequest,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -592,9 +988,7 @@ def get_ai_hint(
         logger.info(f"   Session: {payload.session_id}, Question: {payload.question_id}")
         
         # Récupérer subscription
-        subscription = db.query(Subscription).filter(
-            Subscription.user_id == current_user.id
-        ).first()
+        subscription = get_request_subscription(request, current_user, db, create_if_missing=False)
         
         if not subscription:
             raise HTTPException(
@@ -602,25 +996,7 @@ def get_ai_hint(
                 detail="No subscription found"
             )
         
-        # Vérifier quota
-        limits = subscription.get_limits()
-        hints_limit = limits["ai_hints_per_month"]
-        hints_used = subscription.ai_hints_this_month or 0
-        
-        logger.info(f"   Hints: {hints_used}/{hints_limit}")
-        
-        if hints_used >= hints_limit:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail={
-                    "error": "quota_exceeded",
-                    "message": f"You've reached your monthly limit of {hints_limit} AI hints",
-                    "current_usage": hints_used,
-                    "limit": hints_limit,
-                    "upgrade_to": "bronze" if subscription.tier.value == "free" else "silver",
-                    "upgrade_url": "/pricing"
-                }
-            )
+        hints_limit = subscription.get_limits()["ai_hints_per_month"]
         
         # Récupérer la session
         session = db.query(QuizSession).filter(
@@ -640,6 +1016,10 @@ def get_ai_hint(
         if not question_data:
             raise HTTPException(status_code=404, detail="Question not found")
         
+        # ⭐ Vérifier et consommer le quota en une instruction SQL (pas de dépassement concurrent)
+        hints_used = consume_ai_hint_quota(subscription, db)
+        logger.info(f"   Hints: {hints_used}/{hints_limit}")
+        
         # Générer hint avec Groq
         hint_prompt = f"""You are a helpful AI tutor. A student is struggling with this question:
 
@@ -660,7 +1040,9 @@ Hint:"""
             
             client = Groq(api_key=os.getenv("GROQ_API_KEY"))
             
-            response = client.chat.completions.create(
+            # ⭐ Priorité interactive auprès de l'ordonnanceur LLM (repli immédiat si saturé)
+            started = time.monotonic()
+            response = llm_scheduler.run("llama-3.1-8b-instant", Priority.INTERACTIVE, lambda: client.chat.completions.create(
                 model="llama-3.1-8b-instant",
                 messages=[
                     {"role": "system", "content": "You are a supportive AI tutor."},
@@ -668,7 +1050,11 @@ Hint:"""
                 ],
                 temperature=0.7,
                 max_tokens=200
-            )
+            ))
+            usage = getattr(response, "usage", None)
+            llm_usage.record("hint", "llama-3.1-8b-instant", hint_prompt,
+                             getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0,
+                             time.monotonic() - started)
             
             hint_text = response.choices[0].message.content.strip()
             logger.info(f"✅ Hint generated: {hint_text[:50]}...")
@@ -677,12 +1063,6 @@ Hint:"""
             logger.error(f"❌ Groq error: {e}")
             hint_text = "Try to break down the problem into smaller parts and think about the key concepts involved."
         
-        # Incrémenter usage
-        from backend.middleware.quota_checker import increment_ai_hint_usage
-        increment_ai_hint_usage(subscription, db)
-        
-        db.refresh(subscription)
-        
         logger.info(f"✅ Hint delivered. New usage: {subscription.ai_hints_this_month}/{hints_limit}")
         
         return {
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from pydantic import BaseModel, Field
@@ -8,7 +8,9 @@ from backend.models.subject import Subject
 from backend.models.user import User
 from backend.agents.subject_agent import SubjectAgent
 from backend.api.auth import get_current_active_user
-from backend.models.subscription import Subscription
+from backend.core.dependencies import get_request_subscription
+from backend.core.http_cache import make_etag, is_not_modified, not_modified_response, set_etag
+from backend.core.subject_catalog import subject_catalog
 from backend.api.auth import get_current_active_user
 import logging 
 
@@ -17,8 +19,8 @@ router = APIRouter(prefix="/api/subjects", tags=["subjects"])
 
 
 def get_subject_agent():
-    from backend.app import _state
-    agent = _state.get("subject_agent")
+    from backend.app import get_agent
+    agent = get_agent("subject_agent")
     if not agent:
         raise HTTPException(status_code=500, detail="SubjectAgent not initialized")
     return agent
@@ -59,25 +61,33 @@ class GenerateSubjectsRequest(BaseModel):
 
 @router.get("/list")
 def list_subjects(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Liste les sujets disponibles selon les favoris de l'utilisateur.
+
+    ⭐ Servi depuis le catalogue en mémoire ; ETag = contenu du catalogue +
+    tier + favoris, donc 304 tant que rien de visible n'a changé.
     """
     try:
-        logger.info(f"📚 Subjects request from: {current_user.username}")
+        logger.debug("Subjects request from: %s", current_user.username)
+        
+        catalog = subject_catalog.get(db)
         
         # Récupérer subscription
-        subscription = db.query(Subscription).filter(
-            Subscription.user_id == current_user.id
-        ).first()
+        subscription = get_request_subscription(request, current_user, db, create_if_missing=False)
         
         if not subscription:
+            etag = make_etag("subjects-list", catalog.etag, "no-subscription")
+            if is_not_modified(request, etag):
+                return not_modified_response(etag)
+            set_etag(response, etag)
             # Pas de subscription = afficher tous pour sélection
-            all_subjects = db.query(Subject).order_by(Subject.name).all()
             return {
-                "subjects": [s.to_dict() for s in all_subjects],
+                "subjects": catalog.subjects,
                 "locked_subjects": [],
                 "access_limit": 2,
                 "needs_favorites_selection": True,
@@ -91,17 +101,18 @@ def list_subjects(
         # Récupérer favoris
         favorite_ids = subscription.get_favorite_subjects()
         
-        # Récupérer tous les sujets
-        all_subjects = db.query(Subject).order_by(Subject.name).all()
+        etag = make_etag("subjects-list", catalog.etag, subscription.tier.value, max_subjects, sorted(favorite_ids, key=str))
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        set_etag(response, etag)
         
-        logger.info(f"   Tier: {subscription.tier.value}, Max: {max_subjects}, Favorites: {favorite_ids}")
+        logger.debug("Tier: %s, Max: %s, Favorites: %s", subscription.tier.value, max_subjects, favorite_ids)
         
         # ⭐ LOGIQUE PRINCIPALE
         if max_subjects >= 999:
             # Illimité (PREMIUM)
-            logger.info(f"   ✅ Unlimited access")
             return {
-                "subjects": [s.to_dict() for s in all_subjects],
+                "subjects": catalog.subjects,
                 "locked_subjects": [],
                 "access_limit": max_subjects,
                 "has_favorites": len(favorite_ids) > 0,
@@ -110,9 +121,8 @@ def list_subjects(
         
         elif len(favorite_ids) == 0:
             # FREE mais pas encore de favoris → AFFICHER TOUS pour qu'il choisisse
-            logger.info(f"   ⚠️ No favorites set, showing all for selection")
             return {
-                "subjects": [s.to_dict() for s in all_subjects],
+                "subjects": catalog.subjects,
                 "locked_subjects": [],
                 "access_limit": max_subjects,
                 "has_favorites": False,
@@ -121,15 +131,12 @@ def list_subjects(
             }
         
         else:
-            # FREE et favoris définis → Filtrer par favoris
-            available_subjects = [s for s in all_subjects if s.id in favorite_ids]
-            locked_subjects = [s for s in all_subjects if s.id not in favorite_ids]
-            
-            logger.info(f"   🎯 Showing {len(available_subjects)} favorite subjects: {favorite_ids}")
+            # FREE et favoris définis → Filtrer par favoris (appartenance O(1))
+            available_subjects, locked_subjects = catalog.split_by_favorites(favorite_ids)
             
             return {
-                "subjects": [s.to_dict() for s in available_subjects],
-                "locked_subjects": [s.to_dict() for s in locked_subjects],
+                "subjects": available_subjects,
+                "locked_subjects": locked_subjects,
                 "access_limit": max_subjects,
                 "has_favorites": True,
                 "favorite_ids": favorite_ids,
@@ -147,13 +154,19 @@ def list_subjects(
     
 @router.get("/all")
 def get_all_subjects(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Récupère TOUS les sujets (pour la sélection de favoris)."""
     try:
-        all_subjects = db.query(Subject).order_by(Subject.name).all()
-        return {"subjects": [s.to_dict() for s in all_subjects]}
+        catalog = subject_catalog.get(db)
+        etag = make_etag("subjects-all", catalog.etag)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        set_etag(response, etag)
+        return {"subjects": catalog.subjects}
     except Exception as e:
         logger.exception(f"❌ Error fetching all subjects: {e}")
         raise HTTPException(
@@ -265,6 +278,7 @@ def create_subject(
         db.add(new_subject)
         db.commit()
         db.refresh(new_subject)
+        subject_catalog.invalidate()
         
         logger.info(f"✅ Subject created: {new_subject.id}")
         
@@ -319,6 +333,7 @@ def update_subject(
         
         db.commit()
         db.refresh(subject)
+        subject_catalog.invalidate()
         
         logger.info(f"✅ Subject updated: {subject.name}")
         
@@ -363,6 +378,7 @@ def delete_subject(
         
         db.delete(subject)
         db.commit()
+        subject_catalog.invalidate()
         
         logger.info(f"✅ Subject deleted: {subject_name}")
         
@@ -390,8 +406,8 @@ def get_subject_content(
     """
     Récupère le contenu adaptatif d'un sujet.
     """
-    from backend.app import _state
-    content_agent = _state.get("content_agent")
+    from backend.app import get_agent
+    content_agent = get_agent("content_agent")
     
     if not content_agent:
         raise HTTPException(status_code=500, detail="ContentAgent not initialized")
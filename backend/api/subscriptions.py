@@ -2,11 +2,12 @@
 API pour gérer les abonnements et les packs premium.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Optional, List
 from pydantic import BaseModel, Field
+import json
 import logging
 
 from backend.models.database import get_db
@@ -18,6 +19,8 @@ from backend.models.subscription import (
     SubscriptionStatus
 )
 from backend.api.auth import get_current_active_user
+from backend.core.http_cache import make_etag, is_not_modified, not_modified_response, set_etag
+from backend.core.response_cache import response_cache
 
 router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
 logger = logging.getLogger("backend.app")
@@ -68,41 +71,53 @@ class QuotaCheckRequest(BaseModel):
 # GET /api/subscriptions/plans
 # ========================================
 
+def _load_subscription_plans(db: Session):
+    """Charge les plans actifs et calcule l'ETag de leur contenu."""
+    plans = db.query(SubscriptionPlan).filter(
+        SubscriptionPlan.is_active == True
+    ).order_by(SubscriptionPlan.display_order).all()
+    
+    result = []
+    for plan in plans:
+        # Créer une subscription temporaire pour obtenir limits et features
+        temp_sub = Subscription(tier=plan.tier)
+        
+        result.append({
+            "id": plan.id,
+            "tier": plan.tier.value,
+            "name": plan.name,
+            "description": plan.description,
+            "price_monthly": plan.price_monthly,
+            "price_yearly": plan.price_yearly,
+            "currency": plan.currency,
+            "badge": plan.badge,
+            "display_order": plan.display_order,
+            "limits": temp_sub.get_limits(),
+            "features": temp_sub.get_features()
+        })
+    
+    etag = make_etag("plans", json.dumps(result, sort_keys=True, default=str), weak=False)
+    return result, etag
+
+
 @router.get("/plans", response_model=List[SubscriptionPlanResponse])
-def get_subscription_plans(db: Session = Depends(get_db)):
+def get_subscription_plans(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Récupère tous les plans d'abonnement disponibles.
     
+    ⭐ Les plans ne changent qu'avec les scripts d'init : servis depuis le cache
+    de réponses (TTL) avec un ETag calculé sur leur contenu.
+    
     Returns:
         Liste des plans avec leurs limites et features
     """
     try:
-        logger.info("📋 Fetching subscription plans")
-        
-        plans = db.query(SubscriptionPlan).filter(
-            SubscriptionPlan.is_active == True
-        ).order_by(SubscriptionPlan.display_order).all()
-        
-        result = []
-        for plan in plans:
-            # Créer une subscription temporaire pour obtenir limits et features
-            temp_sub = Subscription(tier=plan.tier)
-            
-            result.append({
-                "id": plan.id,
-                "tier": plan.tier.value,
-                "name": plan.name,
-                "description": plan.description,
-                "price_monthly": plan.price_monthly,
-                "price_yearly": plan.price_yearly,
-                "currency": plan.currency,
-                "badge": plan.badge,
-                "display_order": plan.display_order,
-                "limits": temp_sub.get_limits(),
-                "features": temp_sub.get_features()
-            })
-        
-        logger.info(f"✅ Found {len(result)} plans")
+        result, etag = response_cache.get_or_compute(
+            ("subscription_plans",), lambda: _load_subscription_plans(db)
+        )
+        if is_not_modified(request, etag):
+            return not_modified_response(etag, cache_control="public, max-age=60")
+        set_etag(response, etag, cache_control="public, max-age=60")
         return result
         
     except Exception as e:
@@ -112,6 +127,7 @@ def get_subscription_plans(db: Session = Depends(get_db)):
             detail=f"Error fetching plans: {str(e)}"
         )
 
+
 # ========================================
 # GET /api/subscriptions/my-subscription
 # ========================================
@@ -408,10 +424,10 @@ def get_usage(
         
         limits = subscription.get_limits()
         
-        # ⭐ Utiliser les colonnes directement avec protection contre NULL
-        quizzes_used = subscription.quizzes_this_month or 0
-        questions_used = subscription.questions_this_month or 0
-        hints_used = subscription.ai_hints_this_month or 0
+        # ⭐ Compteurs de la période courante (0 si la période est échue)
+        quizzes_used = subscription.usage("quizzes")
+        questions_used = subscription.usage("questions")
+        hints_used = subscription.usage("ai_hints")
         
         return {
             "tier": subscription.tier.value,
@@ -471,7 +487,7 @@ def check_quota(
                 return {
                     "allowed": False,
                     "reason": f"Monthly quiz limit reached ({limits['quizzes_per_month']})",
-                    "current_usage": subscription.quizzes_this_month or 0,
+                    "current_usage": subscription.usage("quizzes"),
                     "limit": limits["quizzes_per_month"],
                     "upgrade_to": "silver"  # Suggestion
                 }
@@ -479,7 +495,7 @@ def check_quota(
                 return {
                     "allowed": False,
                     "reason": f"Monthly AI hints limit reached ({limits['ai_hints_per_month']})",
-                    "current_usage": subscription.ai_hints_this_month or 0,
+                    "current_usage": subscription.usage("ai_hints"),
                     "limit": limits["ai_hints_per_month"],
                     "upgrade_to": "bronze"
                 }
@@ -1,21 +1,16 @@
 from pathlib import Path
-from time import time
+import time
+_IMPORT_STARTED_AT = time.perf_counter()
 from dotenv import load_dotenv
 import os 
+import importlib
 from starlette.requests import Request
-from backend.api import stripe_payment
 
 from backend.models.database import init_db
-from backend.agents.subject_agent import SubjectAgent
-from backend.agents.content_agent import ContentAgent
-from backend.agents.bloom_agent import BloomAgent
-from backend.agents.evaluation_agent import EvaluationAgent
-from backend.agents.quiz_agent import QuizAgent
-from backend.agents.analytics_agent import AnalyticsAgent
-from backend.agents.support_agent import SupportAgent
-from backend.agents.admin_agent import AdminAgent
-from backend.api import subjects, content, quiz, dashboard, emotion_support, auth, users,admin, subscriptions
-from backend.core.dependencies import get_current_user
+from backend.middleware.access_log import AccessLogMiddleware
+from backend.middleware.rate_limit import RateLimitMiddleware
+# ⭐ Les agents sont construits à la demande (get_agent), stripe/admin chargés au 1er appel
+from backend.api import subjects, content, quiz, dashboard, emotion_support, auth, users, subscriptions
 
 # Charger .env AVANT tout import
 env_path = Path(__file__).resolve().parents[1] / ".env"
@@ -23,15 +18,19 @@ load_dotenv(dotenv_path=env_path)
 
 # Imports standard
 import logging
+import threading
 from typing import Optional
 
 # Imports FastAPI
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 # Configure logging AVANT d'importer les modules backend
-logging.basicConfig(level=logging.INFO)
+# ⭐ Pipeline QueueHandler/QueueListener + niveaux par module (CLEO_LOG_PROFILE / CLEO_LOG_LEVELS)
+from backend.core.logging_config import configure_logging
+configure_logging()
 logger = logging.getLogger("backend.app")
 
 # Imports backend (APRÈS load_dotenv et logging setup)
@@ -39,6 +38,7 @@ try:
     from backend.core.emotion import EmotionClient
     from backend.core.groq import GroqClient
     from backend.core.orchestrator import Orchestrator
+    from backend.core.warmup import WarmupTracker, get_startup_mode, warm_rag, REQUIRED_COMPONENTS
 except ImportError as e:
     logger.error("Failed to import backend modules: %s", e)
     logger.error("Make sure backend/core/emotion.py, groq_client.py, and orchestrator.py exist")
@@ -50,6 +50,10 @@ description="AI-powered adaptive learning with emotional support",
     version="2.0.0"  # ⭐ Version mise à jour
     )
 
+# ⭐ Limitation de débit par utilisateur/IP (seaux à jetons, budget LLM séparé) ;
+# ajoutée avant CORS pour que les réponses 429 portent les en-têtes CORS
+app.add_middleware(RateLimitMiddleware)
+
 # CORS
 # ⭐ CORS Configuration - IMPORTANT
 app.add_middleware(
@@ -64,8 +68,44 @@ app.add_middleware(
     allow_methods=["*"],  # ⭐ Permettre toutes les méthodes
     allow_headers=["*"],  # ⭐ Permettre tous les headers
 )
+# Logs d'accès structurés (sans lecture du body, via QueueHandler)
+app.add_middleware(AccessLogMiddleware)
+
 # État global
-_state = {}
+_state = {
+    "orchestrator": None,
+    "initializing": False,
+    "init_error": None,
+    "init_started_at": None,
+    "init_finished_at": None,
+    "startup_mode": get_startup_mode(),
+}
+_warmup = WarmupTracker()
+_init_lock = threading.Lock()
+_agents_lock = threading.RLock()
+_routers_lock = threading.Lock()
+
+# Budget de démarrage (import + startup) au-delà duquel on logge un warning
+STARTUP_BUDGET_SECONDS = float(os.getenv("CLEO_STARTUP_BUDGET_SECONDS", "5.0"))
+# Routers rarement utilisés : importés et enregistrés à la première requête
+LAZY_ROUTERS_ENABLED = os.getenv("CLEO_LAZY_ROUTERS", "1") != "0"
+_LAZY_ROUTERS = {
+    "/api/payment": "backend.api.stripe_payment",
+    "/api/admin": "backend.api.admin",
+}
+_loaded_lazy_routers = set()
+
+# Fabriques des agents : nom -> (module, classe, reçoit groq_client)
+_AGENT_FACTORIES = {
+    "subject_agent": ("backend.agents.subject_agent", "SubjectAgent", True),
+    "content_agent": ("backend.agents.content_agent", "ContentAgent", True),
+    "quiz_agent": ("backend.agents.quiz_agent", "QuizAgent", True),
+    "evaluation_agent": ("backend.agents.evaluation_agent", "EvaluationAgent", True),
+    "bloom_agent": ("backend.agents.bloom_agent", "BloomAgent", False),
+    "analytics_agent": ("backend.agents.analytics_agent", "AnalyticsAgent", True),
+    "support_agent": ("backend.agents.support_agent", "SupportAgent", True),
+    "admin_agent": ("backend.agents.admin_agent", "AdminAgent", True),
+}
 
 
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
@@ -73,50 +113,125 @@ API_PORT = int(os.getenv("API_PORT", "8000"))
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
 
-import threading
+def get_groq_client():
+    """GroqClient partagé, créé au premier besoin."""
+    with _agents_lock:
+        client = _state.get("groq_client")
+        if client is None:
+            groq_api_key = os.getenv("GROQ_API_KEY", "GROQ_API_KEY")
+            client = GroqClient(api_key=groq_api_key)
+            _state["groq_client"] = client
+            logger.info("✓ GroqClient initialized")
+        return client
 
 
-# --- Lazy init routine (runs in background thread) ---
-def init_orchestrator_background():
-    if _state["orchestrator"] is not None or _state["initializing"]:
-        return
-    _state["initializing"] = True
-    _state["init_started_at"] = time.time()
-    def _init():
-        try:
-            logger.info("Orchestrator init: importing core modules (this can take time on first run)...")
-            # Import modules inside thread so they perform heavy work here and not at import-time
-            from backend.core.rag import RAG
-            from backend.core.emotion import EmotionClient
-            from backend.core.groq import GroqClient
-            from backend.core.agents import Orchestrator
-            # Instantiate components (these may trigger downloads)
-            rag = RAG()
-            try:
-                emotion_client = EmotionClient()
-            except Exception as e:
-                logger.warning("EmotionClient init failed: %s", e)
-                class _StubEmotion:
-                    def analyze(self, text): return {"dominant_emotion": "neutre", "confidence": 0.0, "error": str(e)}
-                emotion_client = _StubEmotion()
+def get_agent(name: str):
+    """
+    Retourne l'agent demandé, en l'important et le construisant au premier appel.
+    Retourne None si l'agent est inconnu ou si sa construction échoue.
+    """
+    agent = _state.get(name)
+    if agent is not None:
+        return agent
+    factory = _AGENT_FACTORIES.get(name)
+    if factory is None:
+        return None
+    with _agents_lock:
+        agent = _state.get(name)
+        if agent is None:
+            module_name, class_name, needs_groq = factory
             try:
-                groq = GroqClient()
+                cls = getattr(importlib.import_module(module_name), class_name)
+                agent = cls(groq_client=get_groq_client()) if needs_groq else cls()
             except Exception as e:
-                logger.warning("GroqClient init failed: %s", e)
-                class _StubGen:
-                    def generate(self, prompt, system_prompt=None, max_tokens=400, temperature=0.7):
-                        return "[Groq not configured]"
-                groq = _StubGen()
-            orch = Orchestrator(rag=rag, emotion_client=emotion_client, generator=groq)
-            _state["orchestrator"] = orch
-            _state["init_finished_at"] = time.time()
-            logger.info("Orchestrator initialized successfully in %.1fs", _state["init_finished_at"] - _state["init_started_at"])
+                logger.exception("Failed to initialize %s: %s", class_name, e)
+                return None
+            _state[name] = agent
+            logger.info("✓ %s initialized", class_name)
+    return agent
+
+
+def _load_lazy_routers(path: str):
+    """Importe et enregistre les routers paresseux dont le préfixe correspond au chemin."""
+    load_all = path == app.openapi_url
+    for prefix, module_name in _LAZY_ROUTERS.items():
+        if prefix in _loaded_lazy_routers or not (load_all or path.startswith(prefix)):
+            continue
+        with _routers_lock:
+            if prefix in _loaded_lazy_routers:
+                continue
+            module = importlib.import_module(module_name)
+            app.include_router(module.router)
+            app.openapi_schema = None  # régénérer la doc avec les nouvelles routes
+            _loaded_lazy_routers.add(prefix)
+            logger.info("✓ Router %s loaded on first use", module_name)
+
+
+def _build_orchestrator():
+    """
+    Construit et préchauffe l'orchestrateur (RAG + émotion + Groq).
+    Synchrone : appelé directement en mode eager, dans un thread sinon.
+    """
+    _state["init_started_at"] = time.time()
+    _state["init_error"] = None
+    try:
+        logger.info("Orchestrator init: importing core modules (this can take time on first run)...")
+        # Import modules here so they perform heavy work here and not at import-time
+        from backend.core.rag import RAG
+
+        rag = RAG()
+        warm_rag(rag, _warmup)
+
+        t0 = time.perf_counter()
+        try:
+            emotion_client = EmotionClient()
+            _warmup.mark("emotion_client", True, time.perf_counter() - t0)
         except Exception as e:
-            _state["init_error"] = str(e)
-            logger.exception("Failed to initialize orchestrator: %s", e)
-        finally:
-            _state["initializing"] = False
-    t = threading.Thread(target=_init, daemon=True)
+            logger.warning("EmotionClient init failed: %s", e)
+            _warmup.mark("emotion_client", False, error=str(e))
+            emotion_client = None
+
+        t0 = time.perf_counter()
+        try:
+            groq = get_groq_client()
+        except Exception as e:
+            logger.warning("GroqClient init failed: %s", e)
+            groq = None
+        _warmup.mark("generator", groq is not None, time.perf_counter() - t0)
+
+        orch = Orchestrator(emotion_client=emotion_client, groq_client=groq, rag=rag)
+        _state["orchestrator"] = orch
+        _warmup.mark("orchestrator", True, time.time() - _state["init_started_at"])
+        _state["init_finished_at"] = time.time()
+        logger.info("Orchestrator initialized successfully in %.1fs", _state["init_finished_at"] - _state["init_started_at"])
+    except Exception as e:
+        _state["init_error"] = str(e)
+        _warmup.mark("orchestrator", False, error=str(e))
+        logger.exception("Failed to initialize orchestrator: %s", e)
+    finally:
+        _state["initializing"] = False
+
+
+def _claim_init() -> bool:
+    """Réserve l'initialisation (une seule à la fois). Retourne False si déjà faite/en cours."""
+    with _init_lock:
+        if _state["orchestrator"] is not None or _state["initializing"]:
+            return False
+        _state["initializing"] = True
+        return True
+
+
+def init_orchestrator_eager():
+    """Construit l'orchestrateur de façon bloquante (mode eager)."""
+    if _claim_init():
+        _build_orchestrator()
+
+
+# --- Lazy init routine (runs in background thread) ---
+def init_orchestrator_background():
+    if not _claim_init():
+        return
+    t = threading.Thread(target=_build_orchestrator, name="orchestrator-init", daemon=True)
     t.start()
 
 def is_orchestrator_ready() -> bool:
@@ -138,26 +253,11 @@ def get_orchestrator(block: bool = False, timeout: float = 3.0):
     return None
 
 @app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log toutes les requêtes pour debug."""
-    if request.url.path.startswith("/api"):
-        # Lire le body (attention: on ne peut le lire qu'une fois)
-        body = await request.body()
-        logger.info("=== Incoming request ===")
-        logger.info("Method: %s", request.method)
-        logger.info("Path: %s", request.url.path)
-        logger.info("Headers: %s", dict(request.headers))
-        logger.info("Body (raw): %s", body.decode('utf-8', errors='replace'))
-        logger.info("========================")
-        
-        # Reconstruire la requête pour que FastAPI puisse la lire
-        async def receive():
-            return {"type": "http.request", "body": body}
-        
-        request._receive = receive
-    
-    response = await call_next(request)
-    return response
+async def lazy_routers(request: Request, call_next):
+    """Enregistre les routers rarement utilisés (stripe, admin) à leur premier appel."""
+    if len(_loaded_lazy_routers) < len(_LAZY_ROUTERS):
+        _load_lazy_routers(request.url.path)
+    return await call_next(request)
 
 # Start background init on startup (non-blocking)
 @app.on_event("startup")
@@ -194,50 +294,45 @@ def startup_event():
         finally:
             db.close()
         
-        # Initialiser Groq Client
-        groq_api_key = os.getenv("GROQ_API_KEY", "GROQ_API_KEY")
-        groq_client = GroqClient(api_key=groq_api_key)
-        _state["groq_client"] = groq_client
-        logger.info("✓ GroqClient initialized")
-        
-        # Initialiser agents (code existant)
-        subject_agent = SubjectAgent(groq_client=groq_client)
-        _state["subject_agent"] = subject_agent
-        logger.info("✓ SubjectAgent initialized")
-        
-        content_agent = ContentAgent(groq_client=groq_client)
-        _state["content_agent"] = content_agent
-        logger.info("✓ ContentAgent initialized")
+        # Agents : construits à la demande, sauf en mode eager (tout est prêt avant le trafic)
+        mode = _state["startup_mode"]
+        if mode == "eager":
+            for name in _AGENT_FACTORIES:
+                get_agent(name)
+        else:
+            logger.info("Agents deferred until first use")
         
-        quiz_agent = QuizAgent(groq_client=groq_client)
-        _state["quiz_agent"] = quiz_agent
-        logger.info("✓ QuizAgent initialized")
+        # Messages de soutien pré-générés en arrière-plan (opt-in : CLEO_SUPPORT_POOL_WARM=1)
+        if mode != "lazy":
+            support_agent = get_agent("support_agent")
+            if support_agent is not None:
+                support_agent.warm_message_pool()
         
-        eval_agent = EvaluationAgent(groq_client=groq_client)
-        _state["evaluation_agent"] = eval_agent
-        logger.info("✓ EvaluationAgent initialized")
-        
-        bloom_agent = BloomAgent()
-        _state["bloom_agent"] = bloom_agent
-        logger.info("✓ BloomAgent initialized")
-        
-        analytics_agent = AnalyticsAgent(groq_client=groq_client)
-        _state["analytics_agent"] = analytics_agent
-        logger.info("✓ AnalyticsAgent initialized")
-        
-        support_agent = SupportAgent(groq_client=groq_client)
-        _state["support_agent"] = support_agent
-        logger.info("✓ SupportAgent initialized")
-
-        admin_agent = AdminAgent(groq_client=groq_client)
-        _state["admin_agent"] = admin_agent
-        logger.info("✓ AdminAgent initialized")
+        # Orchestrateur / RAG selon le mode de démarrage
+        logger.info("Startup mode: %s", mode)
+        if mode == "eager":
+            init_orchestrator_eager()
+        elif mode == "background":
+            init_orchestrator_background()
         
-        logger.info("=== Backend initialization complete ===")
+        _state["boot_seconds"] = time.perf_counter() - _IMPORT_STARTED_AT
+        logger.info("=== Backend initialization complete (boot %.2fs) ===", _state["boot_seconds"])
+        if _state["boot_seconds"] > STARTUP_BUDGET_SECONDS:
+            logger.warning("Startup budget exceeded: %.2fs > %.2fs (run `python -m backend.diag_imports --importtime`)",
+                           _state["boot_seconds"], STARTUP_BUDGET_SECONDS)
     
     except Exception as e:
         logger.exception("Failed to initialize backend: %s", e)
 
+@app.on_event("shutdown")
+def shutdown_event():
+    # Écrire les lectures d'émotions encore en buffer
+    from backend.core.emotion_buffer import emotion_buffer
+    emotion_buffer.flush()
+    # Et les agrégats de consommation LLM pas encore écrits
+    from backend.core.llm_usage import llm_usage
+    llm_usage.flush()
+
 @app.get("/")
 def root():
     return {
@@ -267,9 +362,9 @@ app.include_router(content.router)
 app.include_router(quiz.router)
 app.include_router(dashboard.router)
 app.include_router(emotion_support.router)
-app.include_router(admin.router)
 app.include_router(subscriptions.router)
-app.include_router(stripe_payment.router)
+if not LAZY_ROUTERS_ENABLED:
+    _load_lazy_routers(app.openapi_url)
 
 # --- API models ---
 # Modèle de requête pour /api/query
@@ -296,7 +391,8 @@ def api_query(payload: QueryRequest):
     
     logger.info("Processing query for learner=%s mode=%s: %s", learner_id, payload.mode, query[:100])
     
-    orch = _state.get("orchestrator")
+    # En mode lazy, le premier appel déclenche l'init en arrière-plan
+    orch = get_orchestrator()
     if not orch:
         raise HTTPException(status_code=503, detail="Orchestrator not initialized")
     
@@ -321,7 +417,29 @@ def health():
         "init_error": _state["init_error"],
         "init_started_at": _state["init_started_at"],
         "init_finished_at": _state["init_finished_at"],
+        "startup_mode": _state["startup_mode"],
+        "components": _warmup.snapshot(),
+        "boot_seconds": _state.get("boot_seconds"),
+        "startup_budget_seconds": STARTUP_BUDGET_SECONDS,
+    }
+
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe : 200 uniquement quand les composants requis sont chauds
+    (la première requête sera rapide). En mode lazy, le process est prêt dès
+    le démarrage et les composants sont chargés à la demande.
+    """
+    mode = _state["startup_mode"]
+    ready = mode == "lazy" or (is_orchestrator_ready() and _warmup.all_warm(REQUIRED_COMPONENTS))
+    body = {
+        "ready": ready,
+        "startup_mode": mode,
+        "initializing": _state["initializing"],
+        "init_error": _state["init_error"],
+        "components": _warmup.snapshot(),
     }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
 
 @app.get("/status")
 def status():
@@ -0,0 +1,41 @@
+"""
+Batch quotidien de répétition espacée : calcule la file de révision du jour
+de chaque apprenant (questions dues avant minuit, les plus en retard d'abord)
+et la stocke dans review_queues, lue par GET /api/quiz/review-queue/{learner_id}.
+
+Usage (cron, une fois par jour) :
+    python -m backend.build_review_queues
+    python -m backend.build_review_queues --max-items 30
+"""
+
+import argparse
+import sys
+import time
+
+from backend.core.agents import MemoryAgent
+from backend.models.database import SessionLocal
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcule les files de révision du jour")
+    parser.add_argument("--max-items", type=int, default=50, help="questions max par file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        counts = MemoryAgent().build_review_queues(db, max_items=args.max_items)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+    print(f"✅ {len(counts)} review queue(s) built, {sum(counts.values())} due review(s) "
+          f"in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Calibration hors ligne des paramètres IRT des questions (et des θ apprenants).
+
+La table answers est lue par lots (pagination par id), convertie en matrice
+creuse apprenant×question (indices COO + score 0-1), puis ajustée par
+backend.core.irt.calibrate (MAP vectorisé NumPy). Les résultats sont écrits en
+une transaction (bulk UPDATE) : Question.irt_difficulty / irt_discrimination /
+irt_responses / irt_calibrated_at et, en mode complet, LearnerProgress.ability.
+
+Un « apprenant » est un couple (learner_id, subject_id) : θ est suivi par sujet.
+
+Modes :
+- complet (défaut) : ré-estime conjointement θ, a et b sur tout l'historique
+- --incremental : ne recalibre que les questions ayant reçu des réponses depuis
+  leur dernière calibration, θ fixés aux valeurs courantes de LearnerProgress
+
+Usage:
+    python -m backend.calibrate_irt                  # calibration complète
+    python -m backend.calibrate_irt --incremental    # nouvelles réponses seulement
+    python -m backend.calibrate_irt --dry-run        # calcule sans écrire
+"""
+
+import argparse
+import sys
+import time
+from array import array
+from datetime import datetime
+
+from sqlalchemy import or_
+
+from backend.core import irt
+from backend.models.database import SessionLocal
+from backend.models.answer import Answer
+from backend.models.learner_progress import LearnerProgress
+from backend.models.question import Question
+
+CHUNK_SIZE = 20000
+MIN_RESPONSES = 20
+
+
+def stale_question_ids(db):
+    """Sous-requête : questions avec des réponses postérieures à leur calibration."""
+    return db.query(Answer.question_id).join(
+        Question, Answer.question_id == Question.id
+    ).filter(
+        or_(Question.irt_calibrated_at.is_(None), Answer.answered_at > Question.irt_calibrated_at)
+    ).distinct()
+
+
+def stream_responses(db, chunk_size=CHUNK_SIZE, only_questions=None):
+    """
+    Lit answers par lots et construit la matrice creuse des réponses.
+
+    Returns:
+        (learner_idx, item_idx, scores, learner_keys, item_ids)
+    """
+    learners, items = {}, {}
+    learner_idx, item_idx, scores = array("l"), array("l"), array("d")
+
+    last_id, chunks = 0, 0
+    while True:
+        query = db.query(
+            Answer.id, Answer.learner_id, Answer.question_id, Answer.points_earned,
+            Answer.points_possible, Answer.is_correct, Question.subject_id
+        ).join(Question, Answer.question_id == Question.id).filter(Answer.id > last_id)
+        if only_questions is not None:
+            query = query.filter(Answer.question_id.in_(only_questions))
+        rows = query.order_by(Answer.id).limit(chunk_size).all()
+        if not rows:
+            break
+
+        for answer_id, learner_id, question_id, earned, possible, is_correct, subject_id in rows:
+            if possible:
+                score = (earned or 0.0) / possible
+            else:
+                score = 1.0 if is_correct else 0.0
+            learner_idx.append(learners.setdefault((learner_id, subject_id), len(learners)))
+            item_idx.append(items.setdefault(question_id, len(items)))
+            scores.append(score)
+        last_id = rows[-1][0]
+        chunks += 1
+
+    print(f"📥 {len(scores)} responses read in {chunks} chunk(s): "
+          f"{len(learners)} learner×subject, {len(items)} questions")
+    return learner_idx, item_idx, scores, list(learners), list(items)
+
+
+def load_question_priors(db, item_ids):
+    """b a priori (depuis difficulty / bloom_level) et a courant de chaque question."""
+    priors, discriminations = {}, {}
+    for start in range(0, len(item_ids), 900):  # limite de paramètres SQLite
+        batch = item_ids[start:start + 900]
+        for qid, difficulty, bloom_level, a in db.query(
+            Question.id, Question.difficulty, Question.bloom_level, Question.irt_discrimination
+        ).filter(Question.id.in_(batch)):
+            priors[qid] = irt.prior_difficulty(difficulty, bloom_level)
+            discriminations[qid] = a or irt.DEFAULT_DISCRIMINATION
+    return [priors[q] for q in item_ids], [discriminations[q] for q in item_ids]
+
+
+def load_progress(db):
+    """(learner_id, subject_id) -> (id, ability, current_bloom_level)"""
+    return {
+        (learner_id, subject_id): (pid, ability, level)
+        for pid, learner_id, subject_id, ability, level in db.query(
+            LearnerProgress.id, LearnerProgress.learner_id, LearnerProgress.subject_id,
+            LearnerProgress.ability, LearnerProgress.current_bloom_level
+        )
+    }
+
+
+def run(incremental=False, min_responses=MIN_RESPONSES, iterations=50,
+        chunk_size=CHUNK_SIZE, dry_run=False):
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        only = stale_question_ids(db) if incremental else None
+        learner_idx, item_idx, scores, learner_keys, item_ids = stream_responses(db, chunk_size, only)
+        if not scores:
+            print("✅ Nothing to calibrate")
+            return 0
+
+        b_prior, a_init = load_question_priors(db, item_ids)
+        progress = load_progress(db)
+
+        theta_init = []
+        for key in learner_keys:
+            _, ability, level = progress.get(key, (None, None, None))
+            theta_init.append(ability if ability is not None else irt.theta_for_level(level))
+
+        fit = irt.calibrate(
+            learner_idx, item_idx, scores,
+            n_learners=len(learner_keys), n_items=len(item_ids),
+            b_prior=b_prior, iterations=iterations,
+            theta_init=theta_init, fit_theta=not incremental,
+            a_init=a_init if incremental else None,
+        )
+
+        now = datetime.utcnow()
+        question_rows = [
+            {
+                "id": qid,
+                "irt_difficulty": round(float(fit["b"][i]), 4),
+                "irt_discrimination": round(float(fit["a"][i]), 4),
+                "irt_responses": int(fit["counts"][i]),
+                "irt_calibrated_at": now,
+            }
+            for i, qid in enumerate(item_ids)
+            if fit["counts"][i] >= min_responses
+        ]
+        progress_rows = [] if incremental else [
+            {
+                "id": progress[key][0],
+                "ability": round(float(fit["theta"][i]), 4),
+                "ability_se": round(float(fit["theta_se"][i]), 4),
+            }
+            for i, key in enumerate(learner_keys)
+            if key in progress
+        ]
+
+        skipped = len(item_ids) - len(question_rows)
+        print(f"📐 Calibrated {len(question_rows)} question(s) "
+              f"({skipped} with fewer than {min_responses} responses kept their prior)")
+        if not incremental:
+            print(f"👤 {len(progress_rows)} learner abilities re-estimated")
+
+        if dry_run:
+            print("📋 Dry run: nothing written")
+            return 0
+
+        db.bulk_update_mappings(Question, question_rows)
+        if progress_rows:
+            db.bulk_update_mappings(LearnerProgress, progress_rows)
+        db.commit()
+        print(f"✅ Written in {time.perf_counter() - started:.1f}s")
+        return 0
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibration IRT des questions depuis l'historique des réponses")
+    parser.add_argument("--incremental", action="store_true",
+                        help="ne recalibre que les questions ayant de nouvelles réponses (θ fixés)")
+    parser.add_argument("--min-responses", type=int, default=MIN_RESPONSES,
+                        help="réponses minimum pour écrire les paramètres d'une question")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="réponses lues par lot")
+    parser.add_argument("--dry-run", action="store_true", help="calcule sans écrire")
+    args = parser.parse_args(argv)
+    return run(
+        incremental=args.incremental, min_responses=args.min_responses,
+        iterations=args.iterations, chunk_size=args.chunk_size, dry_run=args.dry_run
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,30 @@
 """
 Core module for CLEO backend.
 Provides security, configuration, and utility functions.
+
+⭐ Les exports sont résolus à la demande (PEP 562) : importer un sous-module
+comme backend.core.groq ne charge plus jwt/passlib/pydantic-settings.
 """
 
-from .security import (
-    verify_password,
-    get_password_hash,
-    create_access_token,
-    create_refresh_token,
-    validate_password_strength, 
-    decode_access_token,  # ⭐ CORRECTION : decode_access_token (pas decode_token)
-)
+import importlib
+
+_LAZY_EXPORTS = {
+    'verify_password': '.security',
+    'get_password_hash': '.security',
+    'create_access_token': '.security',
+    'create_refresh_token': '.security',
+    'validate_password_strength': '.security',
+    'decode_access_token': '.security',  # ⭐ CORRECTION : decode_access_token (pas decode_token)
+    'settings': '.config',
+}
+
+__all__ = list(_LAZY_EXPORTS)
 
-from .config import settings
 
-__all__ = [
-    'verify_password',
-    'get_password_hash',
-    'create_access_token',
-    'create_refresh_token',
-    validate_password_strength, 
-    'decode_access_token',
-    'settings',
-]
\ No newline at end of file
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -2,7 +2,8 @@
 Agents: Orchestrator + PedagogicalAgent + MemoryAgent + AttentionAgent + QualityFilter + TelemetryAgent
 These are skeletons to be extended.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from datetime import datetime, timedelta
 import time
 import logging
 from .rag import RAG
@@ -10,7 +11,6 @@ from .emotion import EmotionClient
 from .groq import GroqClient
 
 logger = logging.getLogger("cleo")
-logger.setLevel(logging.INFO)
 
 class TelemetryAgent:
     def __init__(self, path: str = "./telemetry.log"):
@@ -30,13 +30,140 @@ class QualityFilter:
         return True
 
 class MemoryAgent:
+    """
+    Répétition espacée (SM-2) par (apprenant, question).
+
+    L'état de chaque paire est une ligne ReviewItem indexée par
+    (learner_id, due_at) : « qu'est-ce qui est dû pour X maintenant » est un
+    range scan sur cet index, sans relire la table answers.
+    """
+
+    MIN_EASINESS = 1.3
+
     def __init__(self):
-        # For MVP, memory is handled via DB; this agent computes spaced repetition next interval
-        pass
-    def update(self, learner_id: str, item_id: str, result: Dict[str,Any]):
-        # placeholder: log update
         pass
 
+    @staticmethod
+    def quality_from_score(score: float) -> int:
+        """Convertit un score 0-1 en qualité de rappel SM-2 (0-5)."""
+        if score >= 0.95:
+            return 5
+        if score >= 0.8:
+            return 4
+        if score >= 0.6:
+            return 3
+        if score >= 0.4:
+            return 2
+        return 1 if score > 0 else 0
+
+    def schedule(self, item, quality: int, now: Optional[datetime] = None):
+        """Applique une révision de qualité 0-5 à un ReviewItem (SM-2)."""
+        now = now or datetime.utcnow()
+        easiness = item.easiness or 2.5
+        if quality < 3:
+            item.repetitions = 0
+            item.lapses = (item.lapses or 0) + 1
+            item.interval_days = 1.0
+        else:
+            item.repetitions = (item.repetitions or 0) + 1
+            if item.repetitions == 1:
+                item.interval_days = 1.0
+            elif item.repetitions == 2:
+                item.interval_days = 6.0
+            else:
+                item.interval_days = round((item.interval_days or 1.0) * easiness, 2)
+        item.easiness = max(self.MIN_EASINESS, easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        item.last_quality = quality
+        item.last_reviewed_at = now
+        item.due_at = now + timedelta(days=item.interval_days)
+        return item
+
+    def record_reviews(self, db, learner_id: str, subject_id: Optional[int],
+                       results: Iterable[Tuple[int, float]], now: Optional[datetime] = None):
+        """
+        Enregistre des révisions [(question_pk, score 0-1), ...] dans la
+        transaction courante (un seul SELECT pour les états existants).
+        """
+        from backend.models.review_item import ReviewItem
+
+        results = [(qid, score) for qid, score in results if qid is not None]
+        if not results:
+            return []
+        now = now or datetime.utcnow()
+        existing = {
+            item.question_id: item
+            for item in db.query(ReviewItem).filter(
+                ReviewItem.learner_id == learner_id,
+                ReviewItem.question_id.in_({qid for qid, _ in results})
+            )
+        }
+        items = []
+        for question_id, score in results:
+            item = existing.get(question_id)
+            if item is None:
+                item = ReviewItem(learner_id=learner_id, question_id=question_id, subject_id=subject_id,
+                                  easiness=2.5, interval_days=0.0, repetitions=0, lapses=0)
+                db.add(item)
+                existing[question_id] = item
+            items.append(self.schedule(item, self.quality_from_score(score), now))
+        return items
+
+    def update(self, learner_id: str, item_id: Any, result: Dict[str, Any], db=None):
+        """Révision d'une question de la banque (item_id = Question.id) ; ignoré sans session DB."""
+        if db is None or not isinstance(item_id, int):
+            return None
+        score = result.get("score", 1.0 if result.get("success") else 0.0)
+        return self.record_reviews(db, learner_id, result.get("subject_id"), [(item_id, score)])
+
+    def due_items(self, db, learner_id: str, now: Optional[datetime] = None,
+                  limit: int = 20, subject_id: Optional[int] = None):
+        """Révisions dues, les plus en retard d'abord (range scan sur l'index learner/due_at)."""
+        from backend.models.review_item import ReviewItem
+
+        query = db.query(ReviewItem).filter(
+            ReviewItem.learner_id == learner_id,
+            ReviewItem.due_at <= (now or datetime.utcnow())
+        )
+        if subject_id is not None:
+            query = query.filter(ReviewItem.subject_id == subject_id)
+        return query.order_by(ReviewItem.due_at).limit(limit).all()
+
+    def build_review_queues(self, db, now: Optional[datetime] = None, max_items: int = 50) -> Dict[str, int]:
+        """
+        Batch quotidien : calcule la file du jour de chaque apprenant (révisions
+        dues avant la fin de la journée) et la stocke dans review_queues.
+        """
+        from backend.models.review_item import ReviewItem, ReviewQueue
+
+        now = now or datetime.utcnow()
+        end_of_day = datetime.combine(now.date(), datetime.max.time())
+        queues: Dict[str, List[int]] = {}
+        counts: Dict[str, int] = {}
+        rows = db.query(ReviewItem.learner_id, ReviewItem.question_id).filter(
+            ReviewItem.due_at <= end_of_day
+        ).order_by(ReviewItem.learner_id, ReviewItem.due_at).yield_per(5000)
+        for learner_id, question_id in rows:
+            counts[learner_id] = counts.get(learner_id, 0) + 1
+            queue = queues.setdefault(learner_id, [])
+            if len(queue) < max_items:
+                queue.append(question_id)
+
+        existing = {q.learner_id: q for q in db.query(ReviewQueue)}
+        for learner_id, queue in existing.items():
+            if learner_id not in queues:
+                queue.queue_date, queue.question_ids, queue.due_count, queue.generated_at = now.date(), [], 0, now
+        for learner_id, question_ids in queues.items():
+            queue = existing.get(learner_id)
+            if queue is None:
+                queue = ReviewQueue(learner_id=learner_id)
+                db.add(queue)
+            queue.queue_date = now.date()
+            queue.question_ids = question_ids
+            queue.due_count = counts[learner_id]
+            queue.generated_at = now
+        db.commit()
+        return counts
+
 class AttentionAgent:
     def __init__(self):
         pass
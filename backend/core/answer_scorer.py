@@ -0,0 +1,250 @@
+"""
+Correction locale des réponses ouvertes (premier étage de la cascade).
+
+Score = 50% couverture des mots-clés + 20% longueur + 30% similarité avec la
+réponse modèle. La similarité est un cosinus d'embeddings (EMBEDDING_MODEL,
+partagé avec le RAG) ; les embeddings des réponses modèles sont précalculés à la
+génération du quiz et gardés en cache LRU.
+
+Mots-clés et similarité lexicale passent par core/text_similarity (une passe
+sur les tokens de la réponse). Tant que le modèle n'est pas chargé (chargement
+lancé en arrière-plan), ou si sentence-transformers n'est pas installé, la
+similarité retombe sur le cosinus lexical : la correction ne bloque jamais sur
+le modèle.
+
+Seuls les scores dans la bande incertaine
+[CLEO_GRADING_UNCERTAIN_LOW, CLEO_GRADING_UNCERTAIN_HIGH[ sont envoyés au
+correcteur IA (voir EvaluationAgent.evaluate_open_ended). Les mots-clés et la
+longueur suffisent à atteindre 0.7 ; pour qu'ils ne suffisent pas à conclure
+localement :
+- similarité sous CLEO_GRADING_SIMILARITY_FLOOR : score plafonné sous le seuil
+  de réussite (mots-clés alignés sans le sens de la réponse modèle)
+- similarité sous CLEO_GRADING_CONFIDENT_SIMILARITY, ou négations absentes /
+  ajoutées par rapport à la réponse modèle (sens possiblement inversé) : score
+  plafonné juste sous le haut de la bande, donc confié au correcteur IA
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.core.text_similarity import question_profiles
+
+logger = logging.getLogger("cleo.answer_scorer")
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+GRADING_UNCERTAIN_LOW = float(os.getenv("CLEO_GRADING_UNCERTAIN_LOW", "0.35"))
+GRADING_UNCERTAIN_HIGH = float(os.getenv("CLEO_GRADING_UNCERTAIN_HIGH", "0.75"))
+GRADING_SIMILARITY_FLOOR = float(os.getenv("CLEO_GRADING_SIMILARITY_FLOOR", "0.3"))
+GRADING_CONFIDENT_SIMILARITY = float(os.getenv("CLEO_GRADING_CONFIDENT_SIMILARITY", "0.6"))
+PASS_THRESHOLD = 0.6
+LOW_SIMILARITY_CAP = 0.55     # score maximal sous le plancher de similarité (< PASS_THRESHOLD)
+VERBATIM_RATIO = 0.9          # réponse quasi identique à la réponse modèle (cosinus lexical)
+VERBATIM_ORDER_RATIO = 0.8    # ... et mêmes trigrammes de mots, dans l'ordre (pas de négation insérée)
+MIN_ANSWER_WORDS = 3          # en dessous : réponse vide / hors sujet, échec certain
+SAMPLE_EMBEDDING_CACHE_SIZE = 2048
+
+
+class LocalAnswerScorer:
+    """Scoreur local à base de mots-clés et de similarité d'embeddings."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL,
+                 uncertain_low: float = GRADING_UNCERTAIN_LOW,
+                 uncertain_high: float = GRADING_UNCERTAIN_HIGH,
+                 similarity_floor: float = GRADING_SIMILARITY_FLOOR,
+                 confident_similarity: float = GRADING_CONFIDENT_SIMILARITY,
+                 cache_size: int = SAMPLE_EMBEDDING_CACHE_SIZE):
+        self.model_name = model_name
+        self.uncertain_low = uncertain_low
+        self.uncertain_high = uncertain_high
+        self.similarity_floor = similarity_floor
+        self.confident_similarity = confident_similarity
+        self.cache_size = cache_size
+        self._sample_embeddings: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loader: Optional[threading.Thread] = None
+        self._model_unavailable = False
+        self.stats = {"graded": 0, "local": 0, "escalated": 0}
+
+    # --- modèle d'embeddings --------------------------------------------
+
+    def _model(self):
+        """Modèle chargé, ou None (le chargement est alors lancé en arrière-plan)."""
+        from backend.core.rag import get_loaded_embedding_model
+
+        model = get_loaded_embedding_model(self.model_name)
+        if model is None and not self._model_unavailable:
+            self._start_loader()
+        return model
+
+    def _start_loader(self, on_loaded=None):
+        with self._lock:
+            if self._loader is not None and self._loader.is_alive():
+                return
+            self._loader = threading.Thread(
+                target=self._load_model, args=(on_loaded,), name="answer-scorer-model", daemon=True
+            )
+            self._loader.start()
+
+    def _load_model(self, on_loaded=None):
+        from backend.core.rag import load_embedding_model
+
+        try:
+            load_embedding_model(self.model_name)
+        except Exception as e:
+            self._model_unavailable = True
+            logger.warning("Embedding model unavailable, using lexical similarity: %s", e)
+            return
+        if on_loaded:
+            on_loaded()
+
+    def _encode(self, texts: List[str]):
+        return self._model().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+    def _sample_embedding(self, sample_answer: str):
+        with self._lock:
+            embedding = self._sample_embeddings.get(sample_answer)
+            if embedding is not None:
+                self._sample_embeddings.move_to_end(sample_answer)
+                return embedding
+        embedding = self._encode([sample_answer])[0]
+        self._remember(sample_answer, embedding)
+        return embedding
+
+    def _remember(self, sample_answer: str, embedding):
+        with self._lock:
+            self._sample_embeddings[sample_answer] = embedding
+            while len(self._sample_embeddings) > self.cache_size:
+                self._sample_embeddings.popitem(last=False)
+
+    def precompute(self, questions: Iterable[Dict[str, Any]]):
+        """
+        Encode en un seul lot les réponses modèles des questions ouvertes.
+        Non bloquant : s'exécute dans un thread si le modèle doit être chargé.
+        """
+        samples = list({
+            q.get("sample_answer") for q in questions
+            if q.get("question_type") == "open_ended" and q.get("sample_answer")
+        })
+        if not samples or self._model_unavailable:
+            return
+
+        def encode_missing():
+            missing = [s for s in samples if s not in self._sample_embeddings]
+            if missing:
+                for sample, embedding in zip(missing, self._encode(missing)):
+                    self._remember(sample, embedding)
+                logger.debug("Precomputed %s sample-answer embeddings", len(missing))
+
+        if self._model() is not None:
+            threading.Thread(target=encode_missing, name="answer-scorer-precompute", daemon=True).start()
+        else:
+            self._start_loader(on_loaded=encode_missing)
+
+    # --- score ----------------------------------------------------------
+
+    def similarity(self, user_answer: str, sample_answer: str,
+                   lexical: Optional[float] = None) -> Dict[str, Any]:
+        """Similarité [0, 1] réponse / réponse modèle et méthode utilisée."""
+        if not sample_answer:
+            return {"value": 0.0, "method": "none"}
+        if self._model() is not None:
+            try:
+                sample = self._sample_embedding(sample_answer)
+                answer = self._encode([user_answer])[0]
+                return {"value": max(0.0, float((sample * answer).sum())), "method": "embedding"}
+            except Exception as e:
+                logger.warning("Embedding similarity failed, using lexical: %s", e)
+        if lexical is None:
+            lexical = question_profiles.get(sample_answer, ()).compare(user_answer)["similarity"]
+        return {"value": lexical, "method": "lexical"}
+
+    def score(self, question: Dict[str, Any], user_answer: Any) -> Dict[str, Any]:
+        """
+        Score local d'une réponse ouverte.
+
+        Returns:
+            dict avec final_score (0-1), composantes, confidence et uncertain
+            (True si le score tombe dans la bande à confier au correcteur IA)
+        """
+        keywords = question.get("keywords", []) or []
+        sample_answer = question.get("sample_answer", "") or ""
+        min_words = question.get("min_words", 20)
+
+        text = str(user_answer or "").strip()
+        word_count = len(text.split())
+
+        lexical = question_profiles.get(sample_answer, keywords).compare(text)
+        missing_keywords = lexical["missing_keywords"]
+        keywords_found = len(keywords) - len(missing_keywords)
+        keyword_score = keywords_found / max(len(keywords), 1)
+        length_score = min(word_count / max(min_words, 1), 1.0)
+
+        result = {
+            "keyword_score": keyword_score,
+            "length_score": length_score,
+            "keywords_found": keywords_found,
+            "keywords_total": len(keywords),
+            "missing_keywords": missing_keywords,
+            "word_count": word_count,
+        }
+
+        # Cas évidents : pas besoin d'embedding ni d'IA
+        if word_count < MIN_ANSWER_WORDS:
+            result.update(similarity=0.0, similarity_method="none", final_score=0.0,
+                          confidence=0.95, uncertain=False, shortcut="empty")
+            return result
+        # Le cosinus ignore l'ordre des mots : « X is not Y » recopié de « X is Y »
+        # ne doit pas passer pour une réponse recopiée
+        if (sample_answer and lexical["similarity"] >= VERBATIM_RATIO
+                and lexical["order_similarity"] >= VERBATIM_ORDER_RATIO):
+            result.update(similarity=1.0, similarity_method="lexical", final_score=1.0,
+                          confidence=0.95, uncertain=False, shortcut="verbatim")
+            return result
+
+        similarity = self.similarity(text, sample_answer, lexical["similarity"])
+        final_score = keyword_score * 0.5 + length_score * 0.2 + similarity["value"] * 0.3
+        if sample_answer and similarity["value"] < self.similarity_floor:
+            # Mots-clés sans le sens de la réponse modèle : jamais validé localement
+            final_score = min(final_score, LOW_SIMILARITY_CAP)
+        elif sample_answer and (similarity["value"] < self.confident_similarity or lexical["negation_mismatch"]):
+            # Sens incertain : pas de validation locale au-dessus de la bande
+            final_score = min(final_score, max(self.uncertain_low, self.uncertain_high - 0.01))
+        uncertain = self.uncertain_low <= final_score < self.uncertain_high
+        result.update(
+            similarity=similarity["value"],
+            similarity_method=similarity["method"],
+            final_score=final_score,
+            confidence=0.5 if uncertain else 0.75,
+            uncertain=uncertain,
+            shortcut=None,
+        )
+        return result
+
+    # --- taux d'escalade ------------------------------------------------
+
+    def record(self, escalated: bool):
+        with self._lock:
+            self.stats["graded"] += 1
+            self.stats["escalated" if escalated else "local"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        graded = self.stats["graded"]
+        return {
+            **self.stats,
+            "escalation_rate": round(self.stats["escalated"] / graded, 4) if graded else 0.0,
+            "uncertain_band": [self.uncertain_low, self.uncertain_high],
+            "similarity_floor": self.similarity_floor,
+            "confident_similarity": self.confident_similarity,
+            "embedding_model_loaded": self._model_loaded(),
+            "cached_sample_embeddings": len(self._sample_embeddings),
+        }
+
+    def _model_loaded(self) -> bool:
+        from backend.core.rag import get_loaded_embedding_model
+        return get_loaded_embedding_model(self.model_name) is not None
+
+
+answer_scorer = LocalAnswerScorer()
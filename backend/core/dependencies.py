@@ -1,7 +1,10 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Dict, Optional
+import os
+import threading
+import time
 import logging
 
 from backend.models.database import get_db
@@ -11,64 +14,147 @@ from backend.core.security import decode_access_token
 security = HTTPBearer()
 logger = logging.getLogger("backend.app")
 
+USER_STATUS_TTL_SECONDS = float(os.getenv("CLEO_USER_STATUS_TTL_SECONDS", "30"))
+
+
+class UserStatusCache:
+    """
+    Cache process à TTL court : user_id -> is_active.
+    Permet de rejeter un compte suspendu/supprimé sans requête. Le rôle n'est
+    pas mis en cache : toutes les routes authentifiées utilisent l'objet User
+    (username, relations), chargé de toute façon par db.get, qui porte déjà le
+    rôle. Invalidé par les routes admin (suspension, réactivation, suppression).
+    """
+
+    def __init__(self, ttl_seconds: float = USER_STATUS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[bool]:
+        """is_active en cache, ou None si absent / expiré."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, is_active = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[user_id]
+                return None
+            return is_active
+
+    def set(self, user_id: int, is_active: bool):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, bool(is_active))
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_status_cache = UserStatusCache()
+
+
+def _credentials_exception(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def authenticate_token(request: Request, token: Optional[str], db: Session, require_active: bool = True) -> User:
+    """
+    Implémentation unique de l'authentification JWT.
+
+    Le token est décodé une seule fois par requête : l'utilisateur résolu est
+    mémorisé dans request.state, toutes les dépendances (auth.py, dependencies.py,
+    quotas) le réutilisent ensuite sans nouveau décodage ni requête.
+    """
+    user = getattr(request.state, "current_user", None)
+    if user is None:
+        # ⭐ Vérifier que le token n'est pas vide
+        if not token or token in ("undefined", "null"):
+            raise _credentials_exception()
+
+        # ⭐ Token déjà décodé par RateLimitMiddleware pour cette requête
+        decoded = getattr(request.state, "token_payload", None)
+        payload = decoded[1] if decoded is not None and decoded[0] == token else decode_access_token(token)
+        if payload is None:
+            raise _credentials_exception("Invalid authentication credentials")
+        if payload.get("type") != "access":
+            raise _credentials_exception("Invalid token type")
+
+        try:
+            user_id = int(payload.get("sub"))
+        except (TypeError, ValueError):
+            raise _credentials_exception("Invalid token payload")
+
+        cached_active = user_status_cache.get(user_id)
+        if cached_active is not None and require_active and not cached_active:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User account is inactive")
+
+        user = db.get(User, user_id)
+        if user is None:
+            user_status_cache.invalidate(user_id)
+            logger.warning("User not found: %s", user_id)
+            raise _credentials_exception("User not found")
+
+        user_status_cache.set(user.id, user.is_active)
+        request.state.current_user = user
+
+    if require_active and not user.is_active:
+        logger.warning("User inactive: %s", user.username)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User account is inactive")
+
+    return user
+
+
+def get_request_subscription(request: Request, user: User, db: Session, create_if_missing: bool = True):
+    """
+    Retourne l'abonnement de l'utilisateur, chargé au plus une fois par requête
+    (mémorisé dans request.state). Crée un abonnement FREE s'il n'existe pas.
+    """
+    from backend.models.subscription import Subscription, SubscriptionTier, SubscriptionStatus
+
+    cached = getattr(request.state, "subscription", None)
+    if cached is not None and cached.user_id == user.id:
+        return cached
+
+    subscription = db.query(Subscription).filter(Subscription.user_id == user.id).first()
+    if subscription is None and create_if_missing:
+        logger.warning("No subscription found for %s, creating FREE", user.username)
+        subscription = Subscription(
+            user_id=user.id,
+            tier=SubscriptionTier.FREE,
+            status=SubscriptionStatus.ACTIVE
+        )
+        db.add(subscription)
+        db.commit()
+        db.refresh(subscription)
+
+    if subscription is not None:
+        # Tier à jour pour le limiteur de débit (budgets par tier)
+        from backend.core.rate_limit import tier_cache
+        tier_cache.set(user.id, subscription.tier)
+
+    request.state.subscription = subscription
+    return subscription
+
 
 def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
     """
     Récupère l'utilisateur courant depuis le JWT token.
     """
-    token = credentials.credentials
-    
-    logger.info(f"Attempting to decode token: {token[:20]}...")
-    
-    payload = decode_access_token(token)
-    if payload is None:
-        logger.error("Failed to decode token")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    logger.info(f"Token decoded successfully. Payload: {payload}")
-    
-    if payload.get("type") != "access":
-        logger.error(f"Invalid token type: {payload.get('type')}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token type",
-        )
-    
-    user_id: int = payload.get("sub")
-    if user_id is None:
-        logger.error("No user_id in token payload")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
-        )
-    
-    logger.info(f"Looking for user with id: {user_id}")
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        logger.error(f"User not found: {user_id}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-    
-    logger.info(f"✅ User found: {user.username} (role: {user.role})")
-    
-    if not user.is_active:
-        logger.error(f"User inactive: {user.username}")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User account is inactive",
-        )
-    
-    return user
+    return authenticate_token(request, credentials.credentials, db)
 
 
 def get_current_active_user(
@@ -84,36 +170,26 @@ def get_current_admin_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """Vérifie que l'utilisateur est admin."""
-    logger.info(f"Checking admin access for: {current_user.username} (role: {current_user.role})")
-    
     if current_user.role != "admin":
         logger.warning(f"❌ Access denied: {current_user.username} is '{current_user.role}', not 'admin'")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Not enough permissions. Your role: {current_user.role}"
         )
-    
-    logger.info(f"✅ Admin access granted for: {current_user.username}")
+
     return current_user
 
 
 def get_optional_user(
+    request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
     db: Session = Depends(get_db)
 ) -> Optional[User]:
     """Récupère l'utilisateur s'il est connecté, sinon None."""
     if credentials is None:
         return None
-    
+
     try:
-        token = credentials.credentials
-        payload = decode_access_token(token)
-        
-        if payload and payload.get("type") == "access":
-            user_id = payload.get("sub")
-            if user_id:
-                return db.query(User).filter(User.id == user_id).first()
-    except:
-        pass
-    
-    return None
\ No newline at end of file
+        return authenticate_token(request, credentials.credentials, db, require_active=False)
+    except HTTPException:
+        return None
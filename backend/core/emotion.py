@@ -8,7 +8,6 @@ from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger("cleo.emotion")
-logger.setLevel(logging.INFO)
 
 # Accepte plusieurs noms d'env pour compatibilité
 HF_API_KEY = os.getenv("HF_API_KEY") or os.getenv("HUGGINGFACE_API_KEY") or os.getenv("HUGGING_FACE_API_KEY")
@@ -0,0 +1,173 @@
+"""
+Ingestion bufferisée des lectures d'émotions (webcam).
+
+Au lieu d'un INSERT + COMMIT + refresh par lecture, les lectures sont :
+1. agrégées par fenêtre (moyenne par apprenant / session / question / fenêtre
+   de CLEO_EMOTION_WINDOW_SECONDS), ce qui divise le volume par le taux d'échantillonnage
+2. accumulées dans un buffer mémoire
+3. écrites en une transaction (executemany) dès que le buffer atteint
+   CLEO_EMOTION_BUFFER_MAX_ROWS lignes ou CLEO_EMOTION_BUFFER_MAX_SECONDS secondes
+
+Les lectures non encore flushées ne sont visibles en base qu'après le flush
+suivant (au plus CLEO_EMOTION_BUFFER_MAX_SECONDS). flush() est appelé à l'arrêt.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("cleo.emotion_buffer")
+
+EMOTION_WINDOW_SECONDS = float(os.getenv("CLEO_EMOTION_WINDOW_SECONDS", "5"))
+EMOTION_BUFFER_MAX_ROWS = int(os.getenv("CLEO_EMOTION_BUFFER_MAX_ROWS", "200"))
+EMOTION_BUFFER_MAX_SECONDS = float(os.getenv("CLEO_EMOTION_BUFFER_MAX_SECONDS", "2"))
+
+EMOTIONS = ("happy", "sad", "angry", "fear", "disgust", "surprise", "neutral")
+
+
+def downsample(readings: Iterable[Dict[str, Any]], window_seconds: float = EMOTION_WINDOW_SECONDS) -> List[Dict[str, Any]]:
+    """
+    Agrège les lectures en une ligne par (apprenant, session, question, méthode,
+    fenêtre de `window_seconds`) : moyenne des scores, horodatage = fin de fenêtre
+    observée, raw_data = nombre d'échantillons. window_seconds <= 0 désactive l'agrégation.
+    """
+    from backend.models.emotion_log import EmotionLog
+
+    readings = list(readings)
+    if window_seconds <= 0:
+        rows = readings
+    else:
+        groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        for reading in readings:
+            bucket = int(reading["detected_at"].timestamp() // window_seconds)
+            key = (reading["learner_id"], reading.get("quiz_session_id"), reading.get("question_id"),
+                   reading.get("detection_method"), bucket)
+            groups[key].append(reading)
+
+        rows = []
+        for (learner_id, session_id, question_id, method, _), samples in groups.items():
+            count = len(samples)
+            row = {name: sum(s.get(name, 0.0) for s in samples) / count for name in EMOTIONS}
+            row.update({
+                "learner_id": learner_id,
+                "quiz_session_id": session_id,
+                "question_id": question_id,
+                "detection_method": method,
+                "detected_at": max(s["detected_at"] for s in samples),
+                "raw_data": {"samples": count, "window_seconds": window_seconds},
+            })
+            rows.append(row)
+
+    for row in rows:
+        row.setdefault("raw_data", None)  # executemany : mêmes colonnes pour toutes les lignes
+        row["stress_level"], row["confidence_level"] = EmotionLog.derived_metrics(row)
+    return rows
+
+
+class EmotionWriteBuffer:
+    """Buffer d'écriture thread-safe, flushé par taille ou par âge."""
+
+    def __init__(self, max_rows: int = EMOTION_BUFFER_MAX_ROWS,
+                 max_seconds: float = EMOTION_BUFFER_MAX_SECONDS,
+                 window_seconds: float = EMOTION_WINDOW_SECONDS):
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.window_seconds = window_seconds
+        self.max_pending = max_rows * 10  # au-delà, on abandonne plutôt que saturer la mémoire
+        self._rows: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Thread] = None
+        self.stats = {"received": 0, "written": 0, "flushes": 0, "dropped": 0}
+
+    def add(self, readings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Agrège et met en buffer des lectures ; retourne les lignes produites."""
+        rows = downsample(readings, self.window_seconds)
+        with self._lock:
+            self.stats["received"] += len(readings)
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            should_flush = len(self._rows) >= self.max_rows
+        self._ensure_timer()
+        if should_flush:
+            self.flush()
+        return rows
+
+    def pending(self) -> int:
+        return len(self._rows)
+
+    def flush(self) -> int:
+        """Écrit tout le buffer en une transaction (executemany). Retourne le nombre de lignes."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows, self._oldest = self._rows, [], None
+            if not rows:
+                return 0
+
+            from sqlalchemy import insert
+            from backend.models.database import engine
+            from backend.models.emotion_log import EmotionLog
+            from backend.core.response_cache import learner_versions
+
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(EmotionLog.__table__), rows)
+            except Exception as e:
+                logger.exception("Emotion buffer flush failed (%s rows): %s", len(rows), e)
+                with self._lock:
+                    if len(self._rows) + len(rows) <= self.max_pending:
+                        self._rows[:0] = rows
+                        self._oldest = self._oldest or time.monotonic()
+                    else:
+                        self.stats["dropped"] += len(rows)
+                return 0
+
+            self.stats["written"] += len(rows)
+            self.stats["flushes"] += 1
+            for learner_id in {row["learner_id"] for row in rows}:
+                learner_versions.bump(learner_id, "emotion")
+            logger.debug("Emotion buffer flushed %s rows", len(rows))
+            return len(rows)
+
+    def _ensure_timer(self):
+        if self._timer is not None and self._timer.is_alive():
+            return
+        with self._lock:
+            if self._timer is not None and self._timer.is_alive():
+                return
+            self._timer = threading.Thread(target=self._run, name="emotion-buffer-flush", daemon=True)
+            self._timer.start()
+
+    def _run(self):
+        interval = max(0.1, self.max_seconds / 2)
+        while True:
+            time.sleep(interval)
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.max_seconds:
+                self.flush()
+
+
+def reading_from_payload(data: Dict[str, Any], received_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Normalise une lecture reçue par l'API (detected_at client optionnel)."""
+    detected_at = data.get("detected_at") or received_at or datetime.utcnow()
+    if detected_at.tzinfo is not None:
+        detected_at = detected_at.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    reading = {name: float(data.get(name) or 0.0) for name in EMOTIONS}
+    reading.update({
+        "learner_id": data["learner_id"],
+        "quiz_session_id": data.get("quiz_session_id"),
+        "question_id": data.get("question_id"),
+        "detection_method": data.get("detection_method") or "webcam",
+        "detected_at": detected_at,
+    })
+    return reading
+
+
+emotion_buffer = EmotionWriteBuffer()
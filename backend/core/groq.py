@@ -1,13 +1,16 @@
 import os
+import time
 import logging
 import requests
 from typing import Optional
 from dotenv import load_dotenv
 
+from backend.core.llm_scheduler import Priority, llm_scheduler
+from backend.core.llm_usage import llm_usage
+
 load_dotenv()
 
 logger = logging.getLogger("cleo.groq")
-logger.setLevel(logging.INFO)
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
@@ -24,38 +27,57 @@ class GroqClient:
         self.model = GROQ_MODEL
         logger.info("GroqClient initialized: api_key_set=%s model=%s", bool(self.api_key), self.model)
 
-    def chat(self, prompt: str, max_tokens: int = 500) -> str:
+    def chat(self, prompt: str, max_tokens: int = 500, priority: Priority = Priority.GENERATION,
+             agent: str = "unknown", system: Optional[str] = None) -> str:
         """
         Envoie un prompt à Groq et retourne la réponse.
         
         Args:
             prompt: Le prompt complet (contexte + question)
             max_tokens: Nombre max de tokens dans la réponse
+            priority: classe de priorité auprès de l'ordonnanceur LLM
+            agent: étiquette de l'appelant pour la comptabilité des tokens (llm_usage)
+            system: message système partagé (consignes fixes, voir core/prompt_builder.py)
             
         Returns:
             str: La réponse générée
+            
+        Raises:
+            LLMOverloaded: file d'attente au-delà du SLO de la classe (l'appelant sert son repli)
         """
         if not self.api_key:
             raise ValueError("GROQ_API_KEY is not set")
+        
+        return llm_scheduler.run(self.model, priority, lambda: self._request(prompt, max_tokens, agent, system))
+
+    def _request(self, prompt: str, max_tokens: int, agent: str = "unknown", system: Optional[str] = None) -> str:
+        """Appel HTTP à l'API Groq (tokens et latence comptabilisés dans llm_usage)."""
 
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+
         payload = {
             "model": self.model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
+            "messages": messages,
             "max_tokens": max_tokens,
             "temperature": 0.7
         }
 
+        started = time.monotonic()
+        usage = {}
+        error = True
         try:
             response = requests.post(self.api_url, headers=headers, json=payload, timeout=GROQ_TIMEOUT)
             response.raise_for_status()
             data = response.json()
+            usage = data.get("usage") or {}
+            error = False
             
             # Extraire le contenu de la réponse
             content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -73,4 +95,8 @@ class GroqClient:
         
         except Exception as e:
             logger.exception("Groq request failed: %s", e)
-            return f"Erreur lors de l'appel à Groq: {str(e)}"
\ No newline at end of file
+            return f"Erreur lors de l'appel à Groq: {str(e)}"
+
+        finally:
+            llm_usage.record(agent, self.model, prompt, usage.get("prompt_tokens", 0),
+                             usage.get("completion_tokens", 0), time.monotonic() - started, error=error)
@@ -0,0 +1,44 @@
+"""
+Validation HTTP conditionnelle (ETag / If-None-Match) pour les routes JSON.
+
+Usage dans une route :
+
+    etag = make_etag("subjects", snapshot.etag, user.id)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+"""
+
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any, weak: bool = True) -> str:
+    """Construit un ETag (faible par défaut) à partir de composants (versions, ids...)."""
+    raw = "|".join(str(part) for part in parts).encode("utf-8")
+    tag = f'"{hashlib.sha1(raw).hexdigest()[:20]}"'
+    return f"W/{tag}" if weak else tag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True si le client possède déjà cette version (If-None-Match)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip() for tag in header.split(",")}
+    if "*" in candidates:
+        return True
+    # Comparaison faible : W/"x" et "x" désignent la même représentation
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((c[2:] if c.startswith("W/") else c) == bare for c in candidates)
+
+
+def not_modified_response(etag: str, cache_control: str = "private, no-cache") -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_etag(response: Response, etag: str, cache_control: str = "private, no-cache"):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
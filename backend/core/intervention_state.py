@@ -0,0 +1,272 @@
+"""
+État incrémental par apprenant pour la détection d'interventions.
+
+Les émotions et réponses sont poussées dans l'état au moment où elles arrivent
+(log-emotion, lot d'émotions, submit-answer) : chaque mise à jour est O(1)
+amorti, et check-intervention ne fait plus que lire des moyennes glissantes
+et des compteurs déjà calculés.
+
+Fenêtres (identiques à l'ancienne requête de check_intervention) :
+- émotions : au plus EMOTION_WINDOW_SIZE lectures des EMOTION_WINDOW_SECONDS dernières secondes
+- réponses : les ANSWER_WINDOW_SIZE dernières réponses de la session courante
+
+Après un redémarrage, l'état d'un apprenant est réhydraté une seule fois
+depuis la base (voir hydrate()).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+EMOTION_WINDOW_SECONDS = 300.0
+EMOTION_WINDOW_SIZE = 10
+ANSWER_WINDOW_SIZE = 5
+SLOW_ANSWER_SECONDS = 120
+INTERVENTION_STATE_MAX_LEARNERS = int(os.getenv("CLEO_INTERVENTION_STATE_MAX_LEARNERS", "10000"))
+
+
+class LearnerSignalState:
+    """Moyennes glissantes d'émotions et compteurs de performance d'un apprenant."""
+
+    __slots__ = (
+        "_emotions", "_sum_stress", "_sum_frustration", "_sum_sadness",
+        "session_id", "consecutive_errors", "_slow_flags", "_slow_count",
+        "session_started_at", "subject_name", "bloom_level", "session_resolved", "hydrated", "_lock",
+    )
+
+    def __init__(self):
+        self._emotions: deque = deque()  # (monotonic_ts, stress, frustration, sadness)
+        self._sum_stress = 0.0
+        self._sum_frustration = 0.0
+        self._sum_sadness = 0.0
+        self.session_id: Optional[int] = None
+        self.consecutive_errors = 0
+        self._slow_flags: deque = deque()
+        self._slow_count = 0
+        self.session_started_at: Optional[datetime] = None
+        self.subject_name: Optional[str] = None
+        self.bloom_level: Optional[int] = None
+        self.session_resolved = False   # contexte de session_id lu (même si la session n'existe plus)
+        self.hydrated = False
+        self._lock = threading.Lock()
+
+    # --- émotions -------------------------------------------------------
+
+    def add_emotion(self, stress: float, angry: float, disgust: float, sad: float,
+                    at: Optional[float] = None):
+        frustration = ((angry or 0.0) + (disgust or 0.0)) / 2
+        sample = (at if at is not None else time.monotonic(), stress or 0.0, frustration, sad or 0.0)
+        with self._lock:
+            self._emotions.append(sample)
+            self._sum_stress += sample[1]
+            self._sum_frustration += sample[2]
+            self._sum_sadness += sample[3]
+            self._evict(time.monotonic())
+
+    def _evict(self, now: float):
+        while self._emotions and (
+            len(self._emotions) > EMOTION_WINDOW_SIZE
+            or now - self._emotions[0][0] > EMOTION_WINDOW_SECONDS
+        ):
+            _, stress, frustration, sadness = self._emotions.popleft()
+            self._sum_stress -= stress
+            self._sum_frustration -= frustration
+            self._sum_sadness -= sadness
+
+    def emotion_averages(self) -> Optional[Dict[str, float]]:
+        """Moyennes sur la fenêtre courante, ou None si aucune lecture récente."""
+        with self._lock:
+            self._evict(time.monotonic())
+            count = len(self._emotions)
+            if not count:
+                return None
+            return {
+                "stress": max(0.0, self._sum_stress / count),
+                "frustration": max(0.0, self._sum_frustration / count),
+                "sadness": max(0.0, self._sum_sadness / count),
+                "samples": count,
+            }
+
+    # --- réponses -------------------------------------------------------
+
+    def add_answer(self, session_id: Optional[int], is_correct: bool, time_taken_seconds: Optional[int]):
+        with self._lock:
+            if session_id != self.session_id:
+                # Session inconnue : le contexte sera rechargé par hydrate()
+                self._reset_answers(session_id)
+                self.session_started_at = None
+                self.session_resolved = False
+            self.consecutive_errors = 0 if is_correct else self.consecutive_errors + 1
+            slow = (time_taken_seconds or 0) > SLOW_ANSWER_SECONDS
+            self._slow_flags.append(slow)
+            self._slow_count += slow
+            if len(self._slow_flags) > ANSWER_WINDOW_SIZE:
+                self._slow_count -= self._slow_flags.popleft()
+
+    def _reset_answers(self, session_id: Optional[int]):
+        self.session_id = session_id
+        self.consecutive_errors = 0
+        self._slow_flags.clear()
+        self._slow_count = 0
+
+    def answer_signals(self, session_id: Optional[int]) -> Optional[Dict[str, int]]:
+        """Compteurs de la session demandée (None si aucune réponse connue)."""
+        with self._lock:
+            if session_id is None or session_id != self.session_id or not self._slow_flags:
+                return None
+            return {
+                "consecutive_errors": min(self.consecutive_errors, ANSWER_WINDOW_SIZE),
+                "slow_answers": self._slow_count,
+                "answers": len(self._slow_flags),
+            }
+
+    # --- contexte de session --------------------------------------------
+
+    def start_session(self, session_id: int, started_at: Optional[datetime],
+                      subject_name: Optional[str], bloom_level: Optional[int]):
+        with self._lock:
+            self._reset_answers(session_id)
+            self.session_started_at = started_at
+            self.subject_name = subject_name
+            self.bloom_level = bloom_level
+            self.session_resolved = True
+
+    def needs_session(self, session_id: Optional[int]) -> bool:
+        """
+        True si le contexte de `session_id` doit être rechargé depuis la base
+        (une session inconnue ou supprimée n'est cherchée qu'une fois).
+        """
+        return session_id is not None and (
+            session_id != self.session_id or not self.session_resolved
+        )
+
+    def needs_hydration(self, session_id: Optional[int]) -> bool:
+        return not self.hydrated or self.needs_session(session_id)
+
+    def session_context(self, session_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        if session_id is None or session_id != self.session_id or self.session_started_at is None:
+            return None
+        return {
+            "session_duration_minutes": (datetime.utcnow() - self.session_started_at).total_seconds() / 60,
+            "current_subject": self.subject_name,
+            "bloom_level": self.bloom_level,
+        }
+
+
+def monotonic_at(detected_at, now_wall: Optional[datetime] = None,
+                 now_mono: Optional[float] = None) -> float:
+    """
+    Horodatage monotonic d'une lecture datée detected_at (datetime UTC naïf ou
+    ISO 8601) : maintenant moins son âge, une date future comptant pour maintenant.
+    """
+    now_mono = time.monotonic() if now_mono is None else now_mono
+    if isinstance(detected_at, str):
+        try:
+            detected_at = datetime.fromisoformat(detected_at)
+        except ValueError:
+            detected_at = None
+    if detected_at is None:
+        return now_mono
+    if detected_at.tzinfo is not None:
+        detected_at = detected_at.astimezone(timezone.utc).replace(tzinfo=None)
+    age = ((now_wall or datetime.utcnow()) - detected_at).total_seconds()
+    return now_mono - max(age, 0.0)
+
+
+class InterventionStateStore:
+    """États par apprenant, bornés en nombre (LRU)."""
+
+    def __init__(self, max_learners: int = INTERVENTION_STATE_MAX_LEARNERS):
+        self.max_learners = max_learners
+        self._states: "OrderedDict[str, LearnerSignalState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, learner_id: str) -> LearnerSignalState:
+        learner_id = str(learner_id)
+        with self._lock:
+            state = self._states.get(learner_id)
+            if state is None:
+                state = LearnerSignalState()
+                self._states[learner_id] = state
+                while len(self._states) > self.max_learners:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(learner_id)
+            return state
+
+    def record_emotion(self, learner_id: str, row: Dict[str, Any]):
+        """
+        Pousse une lecture (dict EmotionLog ou ligne agrégée) dans l'état, datée
+        par son detected_at comme dans hydrate() : une ligne agrégée par le
+        buffer sort de la fenêtre selon l'âge de ses lectures, pas selon
+        l'heure de son écriture.
+        Ignorée tant que l'état n'est pas hydraté : hydrate() la relira en base.
+        """
+        state = self.get(learner_id)
+        if not state.hydrated:
+            return
+        state.add_emotion(
+            stress=row.get("stress_level", 0.0),
+            angry=row.get("angry", 0.0),
+            disgust=row.get("disgust", 0.0),
+            sad=row.get("sad", 0.0),
+            at=monotonic_at(row.get("detected_at")),
+        )
+
+    def record_answer(self, learner_id: str, session_id: Optional[int],
+                      is_correct: bool, time_taken_seconds: Optional[int]):
+        self.get(learner_id).add_answer(session_id, bool(is_correct), time_taken_seconds)
+
+    def hydrate(self, learner_id: str, quiz_session_id: Optional[int], db) -> LearnerSignalState:
+        """
+        Premier accès après un redémarrage : recharge une fois la fenêtre
+        d'émotions, les dernières réponses et le contexte de session.
+        """
+        state = self.get(learner_id)
+        if not state.needs_hydration(quiz_session_id):
+            return state
+        needs_session = state.needs_session(quiz_session_id)
+
+        from datetime import timedelta
+        from backend.models.answer import Answer
+        from backend.models.emotion_log import EmotionLog
+        from backend.models.quiz_session import QuizSession
+
+        if not state.hydrated:
+            since = datetime.utcnow() - timedelta(seconds=EMOTION_WINDOW_SECONDS)
+            rows = db.query(
+                EmotionLog.detected_at, EmotionLog.stress_level, EmotionLog.angry,
+                EmotionLog.disgust, EmotionLog.sad
+            ).filter(
+                EmotionLog.learner_id == learner_id,
+                EmotionLog.detected_at >= since
+            ).order_by(EmotionLog.detected_at.desc()).limit(EMOTION_WINDOW_SIZE).all()
+            now_wall, now_mono = datetime.utcnow(), time.monotonic()
+            for detected_at, stress, angry, disgust, sad in reversed(rows):
+                state.add_emotion(stress, angry, disgust, sad, at=monotonic_at(detected_at, now_wall, now_mono))
+            state.hydrated = True
+
+        if needs_session:
+            session = db.query(
+                QuizSession.started_at, QuizSession.subject_name, QuizSession.bloom_level
+            ).filter(QuizSession.id == quiz_session_id).first()
+            state.start_session(
+                quiz_session_id,
+                session.started_at if session else None,
+                session.subject_name if session else None,
+                session.bloom_level if session else None,
+            )
+            answers = db.query(Answer.is_correct, Answer.time_taken_seconds).filter(
+                Answer.learner_id == learner_id,
+                Answer.quiz_session_id == quiz_session_id
+            ).order_by(Answer.answered_at.desc()).limit(ANSWER_WINDOW_SIZE).all()
+            for is_correct, time_taken in reversed(answers):
+                state.add_answer(quiz_session_id, bool(is_correct), time_taken)
+
+        return state
+
+
+intervention_states = InterventionStateStore()
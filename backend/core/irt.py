@@ -0,0 +1,224 @@
+"""
+Moteur adaptatif IRT (modèle logistique à 2 paramètres).
+
+    P(réussite | θ, a, b) = 1 / (1 + exp(-a (θ - b)))
+
+- θ (ability) : niveau de l'apprenant, par sujet (LearnerProgress.ability)
+- b (irt_difficulty) et a (irt_discrimination) : paramètres de chaque question
+  (Question), initialisés depuis difficulty (1-5) tant qu'elle n'est pas calibrée
+
+En ligne, chaque réponse met à jour θ par une étape de Newton sur le
+postérieur (approximation de Laplace : θ et son erreur standard). La question
+suivante est celle de la banque qui apporte le plus d'information en θ.
+
+Hors ligne, calibrate() ré-estime conjointement θ, a et b à partir de la
+table answers (MAP vectorisé NumPy, a priori gaussiens) : voir
+backend/calibrate_irt.py.
+
+Les réponses partiellement correctes (questions ouvertes, matching) comptent
+pour leur fraction de points (0-1).
+"""
+
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("cleo.irt")
+
+THETA_PRIOR_SD = 1.0
+MAX_ABILITY_SE = 1.0              # incertitude initiale sur θ
+MIN_ABILITY_SE = 0.15
+LEVEL_CHANGE_MAX_SE = float(os.getenv("CLEO_IRT_LEVEL_CHANGE_MAX_SE", "0.6"))
+DEFAULT_DISCRIMINATION = 1.0
+BLOOM_THETA_STEP = 0.6            # écart de θ entre deux niveaux Bloom
+
+
+def sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+def probability(theta: float, a: float, b: float) -> float:
+    """Probabilité de réussite d'un apprenant de niveau θ sur une question (a, b)."""
+    return sigmoid(a * (theta - b))
+
+
+def information(theta: float, a: float, b: float) -> float:
+    """Information de Fisher d'une question en θ : a² p (1 - p)."""
+    p = probability(theta, a, b)
+    return a * a * p * (1.0 - p)
+
+
+# --- échelles -------------------------------------------------------------
+
+def prior_difficulty(difficulty: Optional[int], bloom_level: Optional[int] = None) -> float:
+    """b initial d'une question non calibrée, depuis difficulty (1-5) et le niveau Bloom."""
+    b = ((difficulty or 3) - 3) * 0.75
+    if bloom_level:
+        b += (bloom_level - 3.5) * 0.25
+    return b
+
+
+def theta_for_level(bloom_level: Optional[int]) -> float:
+    """θ initial d'un apprenant sans historique, depuis son niveau Bloom courant."""
+    return ((bloom_level or 2) - 3.5) * BLOOM_THETA_STEP
+
+
+def level_for_theta(theta: float) -> int:
+    """Niveau Bloom (1-6) correspondant à θ."""
+    return max(1, min(6, int(round(theta / BLOOM_THETA_STEP + 3.5))))
+
+
+def item_parameters(question: Any = None, question_data: Optional[Dict[str, Any]] = None) -> Tuple[float, float]:
+    """(a, b) d'une question : calibrés si disponibles, sinon a priori depuis difficulty."""
+    if question is not None and question.irt_difficulty is not None:
+        return question.irt_discrimination or DEFAULT_DISCRIMINATION, question.irt_difficulty
+    data = question_data or (question.question_data if question is not None else None) or {}
+    difficulty = getattr(question, "difficulty", None) or data.get("difficulty")
+    bloom_level = getattr(question, "bloom_level", None) or data.get("bloom_level")
+    return DEFAULT_DISCRIMINATION, prior_difficulty(difficulty, bloom_level)
+
+
+# --- estimation en ligne --------------------------------------------------
+
+def update_ability(theta: float, se: Optional[float], a: float, b: float, score: float) -> Tuple[float, float]:
+    """
+    Met à jour (θ, erreur standard) après une réponse de score 0-1.
+    Une étape de Newton sur le log-postérieur ; la précision s'additionne.
+    """
+    se = se or MAX_ABILITY_SE
+    p = probability(theta, a, b)
+    precision = 1.0 / (se * se) + a * a * p * (1.0 - p)
+    theta = theta + a * (score - p) / precision
+    theta = max(-4.0, min(4.0, theta))
+    return theta, max(MIN_ABILITY_SE, 1.0 / math.sqrt(precision))
+
+
+def select_by_information(theta: float, items: Sequence[Tuple[Any, float, float]], count: int = 1) -> List[Any]:
+    """
+    Retourne les `count` éléments les plus informatifs en θ.
+    items : séquence de (élément, a, b).
+    """
+    if not items:
+        return []
+    import numpy as np
+
+    a = np.fromiter((item[1] for item in items), dtype=float, count=len(items))
+    b = np.fromiter((item[2] for item in items), dtype=float, count=len(items))
+    p = 1.0 / (1.0 + np.exp(-a * (theta - b)))
+    info = a * a * p * (1.0 - p)
+    order = np.argsort(-info, kind="stable")[:count]
+    return [items[i][0] for i in order]
+
+
+def bloom_decision(current_level: int, theta: float, se: Optional[float]) -> Dict[str, Any]:
+    """
+    Décision de niveau Bloom depuis θ (remplace la moyenne des scores de la session).
+    Le niveau ne change que si l'estimation est assez précise (se <= CLEO_IRT_LEVEL_CHANGE_MAX_SE).
+    """
+    target = level_for_theta(theta)
+    se = se or MAX_ABILITY_SE
+    decision = {"theta": round(theta, 3), "theta_se": round(se, 3), "target_level": target}
+
+    if se > LEVEL_CHANGE_MAX_SE or target == current_level:
+        reason = ("Not enough data yet" if se > LEVEL_CHANGE_MAX_SE
+                  else f"Estimated ability matches this level (θ={theta:.2f}). Keep practicing at this level.")
+        decision.update(new_level=current_level, action="maintain", reason=reason)
+    elif target > current_level:
+        decision.update(new_level=current_level + 1, action="level_up",
+                        reason=f"Excellent performance (θ={theta:.2f})! Ready for next level.")
+    else:
+        decision.update(new_level=current_level - 1, action="level_down",
+                        reason=f"Let's reinforce fundamentals (θ={theta:.2f}). Don't worry, this is normal!")
+    return decision
+
+
+# --- calibration hors ligne -----------------------------------------------
+
+def calibrate(
+    learner_idx,
+    item_idx,
+    scores,
+    n_learners: int,
+    n_items: int,
+    b_prior=None,
+    iterations: int = 50,
+    theta_init=None,
+    fit_theta: bool = True,
+    a_init=None,
+) -> Dict[str, Any]:
+    """
+    Estimation MAP conjointe de θ (apprenants) et (a, b) (questions), vectorisée.
+
+    Args:
+        learner_idx, item_idx: indices (0..n-1) de chaque réponse
+        scores: score 0-1 de chaque réponse
+        b_prior: moyenne a priori de b par question (défaut 0)
+        theta_init: valeurs initiales de θ (défaut 0)
+        fit_theta: False pour garder θ fixé à theta_init (calibration incrémentale
+            des seules questions, sur l'échelle des θ déjà estimés)
+        a_init: valeurs initiales de a (défaut 1)
+
+    Returns:
+        dict avec theta, theta_se, a, b (tableaux NumPy), counts (réponses par question)
+    """
+    import numpy as np
+
+    learner_idx = np.asarray(learner_idx, dtype=np.int64)
+    item_idx = np.asarray(item_idx, dtype=np.int64)
+    u = np.clip(np.asarray(scores, dtype=float), 0.0, 1.0)
+    b0 = np.zeros(n_items) if b_prior is None else np.asarray(b_prior, dtype=float)
+
+    theta = np.zeros(n_learners) if theta_init is None else np.asarray(theta_init, dtype=float).copy()
+    b = b0.copy()
+    log_a = np.zeros(n_items) if a_init is None else np.log(np.clip(np.asarray(a_init, dtype=float), 0.2, 3.0))
+    LOG_A_PRIOR_SD, B_PRIOR_SD = 0.5, 1.0
+
+    def sums(values, index, size):
+        return np.bincount(index, weights=values, minlength=size)
+
+    for _ in range(iterations):
+        a = np.exp(log_a)
+        z = theta[learner_idx] - b[item_idx]
+        p = 1.0 / (1.0 + np.exp(-a[item_idx] * z))
+        w = p * (1.0 - p)
+        r = u - p
+
+        # θ : gradient / hessienne diagonale (a priori N(0, 1))
+        if fit_theta:
+            grad = sums(a[item_idx] * r, learner_idx, n_learners) - theta / THETA_PRIOR_SD ** 2
+            hess = sums(a[item_idx] ** 2 * w, learner_idx, n_learners) + 1.0 / THETA_PRIOR_SD ** 2
+            theta = np.clip(theta + grad / hess, -4.0, 4.0)
+
+        z = theta[learner_idx] - b[item_idx]
+        p = 1.0 / (1.0 + np.exp(-a[item_idx] * z))
+        w = p * (1.0 - p)
+        r = u - p
+
+        # b : a priori N(b0, 1)
+        grad = -sums(a[item_idx] * r, item_idx, n_items) - (b - b0) / B_PRIOR_SD ** 2
+        hess = sums(a[item_idx] ** 2 * w, item_idx, n_items) + 1.0 / B_PRIOR_SD ** 2
+        b = np.clip(b + grad / hess, -4.0, 4.0)
+
+        # log a : a priori N(0, 0.5)
+        z = theta[learner_idx] - b[item_idx]
+        p = 1.0 / (1.0 + np.exp(-a[item_idx] * z))
+        w = p * (1.0 - p)
+        r = u - p
+        grad = sums(a[item_idx] * z * r, item_idx, n_items) - log_a / LOG_A_PRIOR_SD ** 2
+        hess = sums((a[item_idx] * z) ** 2 * w, item_idx, n_items) + 1.0 / LOG_A_PRIOR_SD ** 2
+        log_a = np.clip(log_a + grad / hess, math.log(0.2), math.log(3.0))
+
+    a = np.exp(log_a)
+    p = 1.0 / (1.0 + np.exp(-a[item_idx] * (theta[learner_idx] - b[item_idx])))
+    precision = sums(a[item_idx] ** 2 * p * (1.0 - p), learner_idx, n_learners) + 1.0 / THETA_PRIOR_SD ** 2
+    return {
+        "theta": theta,
+        "theta_se": np.maximum(MIN_ABILITY_SE, 1.0 / np.sqrt(precision)),
+        "a": a,
+        "b": b,
+        "counts": np.bincount(item_idx, minlength=n_items),
+    }
@@ -0,0 +1,207 @@
+"""
+Ordonnanceur global des appels LLM (GroqClient.chat).
+
+- classes de priorité : INTERACTIVE (correction, indices, questions à
+  l'assistant) > GENERATION (quiz, contenus) > BACKGROUND (préchargement et
+  renouvellement des messages de soutien)
+- plafond de concurrence par modèle amont (CLEO_LLM_MAX_CONCURRENCY, surchargeable
+  par modèle via CLEO_LLM_MODEL_CONCURRENCY="modèle=n,...") ; un créneau libéré
+  va à la requête en attente la plus prioritaire, FIFO dans une même classe
+- contrôle d'admission : une requête dont l'attente estimée (file devant elle ×
+  durée moyenne d'un appel / concurrence) dépasse le SLO de sa classe est
+  rejetée immédiatement (LLMOverloaded), de même qu'une requête restée en file
+  plus longtemps que ce SLO ; l'appelant sert alors son repli rapide (correction
+  locale, questions de secours, message modèle...)
+- métriques : profondeur des files, attentes (moyenne, p95, max), rejets, appels
+  en cours par modèle (GET /api/admin/llm-scheduler)
+"""
+
+import enum
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("cleo.llm_scheduler")
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    GENERATION = 1
+    BACKGROUND = 2
+
+
+LLM_MAX_CONCURRENCY = int(os.getenv("CLEO_LLM_MAX_CONCURRENCY", "4"))
+LLM_MODEL_CONCURRENCY = {
+    model.strip(): int(limit)
+    for model, _, limit in (
+        item.partition("=") for item in os.getenv("CLEO_LLM_MODEL_CONCURRENCY", "").split(",") if "=" in item
+    )
+}
+LLM_SLO_SECONDS = {
+    Priority.INTERACTIVE: float(os.getenv("CLEO_LLM_SLO_INTERACTIVE_SECONDS", "5")),
+    Priority.GENERATION: float(os.getenv("CLEO_LLM_SLO_GENERATION_SECONDS", "30")),
+    Priority.BACKGROUND: float(os.getenv("CLEO_LLM_SLO_BACKGROUND_SECONDS", "120")),
+}
+INITIAL_SERVICE_SECONDS = 2.0     # durée d'appel supposée avant la première mesure
+
+
+class LLMOverloaded(RuntimeError):
+    """Requête LLM rejetée par le contrôle d'admission (file au-delà du SLO)."""
+
+
+class _Ticket:
+    __slots__ = ("priority", "event", "granted", "cancelled")
+
+    def __init__(self, priority: Priority):
+        self.priority = priority
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class _Lane:
+    """File d'attente et créneaux d'un modèle."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.heap: List[tuple] = []
+        self.queued = {p: 0 for p in Priority}
+        self.service_seconds = INITIAL_SERVICE_SECONDS
+        self.calls = 0
+
+
+class _ClassStats:
+    __slots__ = ("admitted", "shed", "timed_out", "wait_total", "wait_max", "recent")
+
+    def __init__(self):
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent = deque(maxlen=500)
+
+    def record_wait(self, seconds: float):
+        self.admitted += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        self.recent.append(seconds)
+
+
+class LLMScheduler:
+    """Admission et ordonnancement des appels LLM, partagés par tout le processus."""
+
+    def __init__(self, default_concurrency: int = LLM_MAX_CONCURRENCY,
+                 model_concurrency: Optional[Dict[str, int]] = None,
+                 slo_seconds: Optional[Dict[Priority, float]] = None):
+        self.default_concurrency = default_concurrency
+        self.model_concurrency = dict(LLM_MODEL_CONCURRENCY if model_concurrency is None else model_concurrency)
+        self.slo_seconds = dict(LLM_SLO_SECONDS if slo_seconds is None else slo_seconds)
+        self._lanes: Dict[str, _Lane] = {}
+        self._stats = {p: _ClassStats() for p in Priority}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def run(self, model: str, priority: Priority, call: Callable[[], Any]) -> Any:
+        """
+        Exécute `call` quand un créneau du modèle est attribué à cette requête.
+        Lève LLMOverloaded si l'attente dépasserait (ou a dépassé) le SLO de la classe.
+        """
+        lane = self._admit(model, Priority(priority))
+        started = time.monotonic()
+        try:
+            return call()
+        finally:
+            self._release(lane, time.monotonic() - started)
+
+    def _lane(self, model: str) -> _Lane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _Lane(self.model_concurrency.get(model, self.default_concurrency))
+        return lane
+
+    def _admit(self, model: str, priority: Priority) -> _Lane:
+        slo = self.slo_seconds[priority]
+        stats = self._stats[priority]
+        with self._lock:
+            lane = self._lane(model)
+            ahead = sum(lane.queued[p] for p in Priority if p <= priority)
+            if lane.active < lane.limit and not ahead:
+                lane.active += 1
+                stats.record_wait(0.0)
+                return lane
+
+            estimated = (ahead + 1) * lane.service_seconds / lane.limit
+            if estimated > slo:
+                stats.shed += 1
+                logger.warning("LLM request shed: model=%s class=%s estimated_wait=%.1fs slo=%.1fs",
+                               model, priority.name, estimated, slo)
+                raise LLMOverloaded(f"LLM busy ({priority.name.lower()} queue over {slo:.0f}s)")
+
+            ticket = _Ticket(priority)
+            heapq.heappush(lane.heap, (priority, next(self._seq), ticket))
+            lane.queued[priority] += 1
+
+        queued_at = time.monotonic()
+        ticket.event.wait(timeout=slo)
+        with self._lock:
+            if ticket.granted:
+                stats.record_wait(time.monotonic() - queued_at)
+                return lane
+            ticket.cancelled = True
+            lane.queued[priority] -= 1
+            stats.timed_out += 1
+        logger.warning("LLM request timed out in queue: model=%s class=%s slo=%.1fs", model, priority.name, slo)
+        raise LLMOverloaded(f"LLM busy ({priority.name.lower()} request waited over {slo:.0f}s)")
+
+    def _release(self, lane: _Lane, service_seconds: float):
+        with self._lock:
+            lane.calls += 1
+            lane.service_seconds += 0.2 * (service_seconds - lane.service_seconds)
+            while lane.heap:
+                _, _, ticket = heapq.heappop(lane.heap)
+                if ticket.cancelled:
+                    continue
+                # Le créneau passe directement au plus prioritaire (active inchangé)
+                lane.queued[ticket.priority] -= 1
+                ticket.granted = True
+                ticket.event.set()
+                return
+            lane.active -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Profondeur des files, attentes et rejets par classe ; créneaux par modèle."""
+        with self._lock:
+            classes = {}
+            for priority, stats in self._stats.items():
+                recent = sorted(stats.recent)
+                classes[priority.name.lower()] = {
+                    "queued": sum(lane.queued[priority] for lane in self._lanes.values()),
+                    "admitted": stats.admitted,
+                    "shed": stats.shed,
+                    "timed_out": stats.timed_out,
+                    "wait_avg_ms": round(1000 * stats.wait_total / stats.admitted, 1) if stats.admitted else 0.0,
+                    "wait_p95_ms": round(1000 * recent[min(len(recent) - 1, int(0.95 * len(recent)))], 1) if recent else 0.0,
+                    "wait_max_ms": round(1000 * stats.wait_max, 1),
+                    "slo_seconds": self.slo_seconds[priority],
+                }
+            models = {
+                model: {
+                    "active": lane.active,
+                    "limit": lane.limit,
+                    "queued": sum(lane.queued.values()),
+                    "avg_call_ms": round(1000 * lane.service_seconds, 1),
+                    "calls": lane.calls,
+                }
+                for model, lane in self._lanes.items()
+            }
+        return {"classes": classes, "models": models}
+
+
+llm_scheduler = LLMScheduler()
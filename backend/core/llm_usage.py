@@ -0,0 +1,235 @@
+"""
+Comptabilité des appels LLM : tokens (prompt / complétion) et latence par appel.
+
+- chaque appel est étiqueté par agent (argument de GroqClient.chat), route,
+  user_id et tier ; route / utilisateur / tier viennent du contexte de la
+  requête, posé par RateLimitMiddleware (contextvars, propagé aux threads de
+  FastAPI)
+- les appels sont agrégés en mémoire par (heure, agent, route, utilisateur,
+  tier, modèle) et écrits en lot dans llm_usage toutes les
+  CLEO_LLM_USAGE_FLUSH_SECONDS (et à l'arrêt)
+- budget mensuel de tokens par tier (TIER_LIMITS["llm_tokens_per_month"]),
+  vérifié à l'admission des routes LLM : total en base au début du mois,
+  relu toutes les CLEO_LLM_BUDGET_TTL_SECONDS, plus les appels du processus
+  depuis cette lecture
+- prompts les plus coûteux (empreinte du texte exact) en mémoire, pour repérer
+  ce qu'il faut raccourcir ou mettre en cache (GET /api/admin/llm-usage/top-prompts)
+"""
+
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("cleo.llm_usage")
+
+LLM_USAGE_FLUSH_SECONDS = float(os.getenv("CLEO_LLM_USAGE_FLUSH_SECONDS", "30"))
+LLM_BUDGET_TTL_SECONDS = float(os.getenv("CLEO_LLM_BUDGET_TTL_SECONDS", "60"))
+MAX_TRACKED_PROMPTS = 1000
+PROMPT_EXCERPT_CHARS = 200
+
+# Contexte de la requête HTTP en cours : {"scope", "user_id", "tier"}
+_request_context: contextvars.ContextVar = contextvars.ContextVar("cleo_llm_request", default=None)
+
+
+def bind_request(scope, user_id: Optional[int], tier: Optional[str]):
+    """Associe les appels LLM de la requête à son utilisateur et à sa route."""
+    return _request_context.set({"scope": scope, "user_id": user_id, "tier": tier})
+
+
+def current_tags() -> Dict[str, Any]:
+    """route (gabarit FastAPI si déjà résolu), user_id, tier de la requête en cours."""
+    context = _request_context.get()
+    if context is None:
+        return {"route": None, "user_id": None, "tier": None}
+    scope = context["scope"]
+    route = getattr(scope.get("route"), "path", None) or scope.get("path")
+    return {"route": route, "user_id": context["user_id"], "tier": context["tier"]}
+
+
+class LLMUsageRecorder:
+    """Agrégats en mémoire, flush périodique en lot, budgets mensuels."""
+
+    def __init__(self, flush_seconds: float = LLM_USAGE_FLUSH_SECONDS,
+                 budget_ttl_seconds: float = LLM_BUDGET_TTL_SECONDS):
+        self.flush_seconds = flush_seconds
+        self.budget_ttl_seconds = budget_ttl_seconds
+        self._pending: Dict[tuple, List[float]] = {}
+        self._prompts: Dict[str, Dict[str, Any]] = {}
+        self._budgets: Dict[int, List[Any]] = {}    # user_id -> [début du mois, tokens, expiration]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Thread] = None
+        self.stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "flushes": 0, "rows_written": 0}
+
+    # --- enregistrement ----------------------------------------------------
+
+    def record(self, agent: str, model: str, prompt: str, prompt_tokens: int,
+               completion_tokens: int, latency_seconds: float, error: bool = False):
+        tags = current_tags()
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        key = (hour, agent, tags["route"], tags["user_id"], tags["tier"], model)
+        total = prompt_tokens + completion_tokens
+        fingerprint = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = [0, 0, 0, 0, 0.0]
+            entry[0] += 1
+            entry[1] += int(error)
+            entry[2] += prompt_tokens
+            entry[3] += completion_tokens
+            entry[4] += latency_seconds * 1000
+
+            self.stats["calls"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+            budget = self._budgets.get(tags["user_id"])
+            if budget is not None:
+                budget[1] += total
+
+            prompt_stats = self._prompts.get(fingerprint)
+            if prompt_stats is None:
+                if len(self._prompts) >= MAX_TRACKED_PROMPTS:
+                    self._evict_prompts()
+                prompt_stats = self._prompts[fingerprint] = {
+                    "fingerprint": fingerprint, "agent": agent, "route": tags["route"],
+                    "excerpt": prompt[:PROMPT_EXCERPT_CHARS], "prompt_chars": len(prompt),
+                    "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_ms_total": 0.0,
+                }
+            prompt_stats["calls"] += 1
+            prompt_stats["prompt_tokens"] += prompt_tokens
+            prompt_stats["completion_tokens"] += completion_tokens
+            prompt_stats["latency_ms_total"] += latency_seconds * 1000
+        self._ensure_timer()
+
+    def _evict_prompts(self):
+        """Retire le dixième le moins coûteux des prompts suivis."""
+        ranked = sorted(self._prompts.values(), key=lambda p: p["prompt_tokens"] + p["completion_tokens"])
+        for stats in ranked[:max(1, len(ranked) // 10)]:
+            del self._prompts[stats["fingerprint"]]
+
+    # --- écriture en lot ---------------------------------------------------
+
+    def flush(self) -> int:
+        """Écrit les agrégats en une transaction (executemany). Retourne le nombre de lignes."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            from sqlalchemy import insert
+            from backend.models.database import engine
+            from backend.models.llm_usage import LLMUsage
+
+            now = datetime.utcnow()
+            rows = [
+                {
+                    "period_start": hour, "agent": agent, "route": route, "user_id": user_id,
+                    "tier": tier, "model": model, "calls": calls, "errors": errors,
+                    "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                    "latency_ms_total": round(latency_ms, 1), "flushed_at": now,
+                }
+                for (hour, agent, route, user_id, tier, model),
+                    (calls, errors, prompt_tokens, completion_tokens, latency_ms) in pending.items()
+            ]
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(LLMUsage.__table__), rows)
+            except Exception as e:
+                logger.exception("LLM usage flush failed (%s rows): %s", len(rows), e)
+                with self._lock:
+                    for key, values in pending.items():
+                        entry = self._pending.setdefault(key, [0, 0, 0, 0, 0.0])
+                        for i, value in enumerate(values):
+                            entry[i] += value
+                return 0
+
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += len(rows)
+            logger.debug("LLM usage flushed %s rows", len(rows))
+            return len(rows)
+
+    def _ensure_timer(self):
+        if self._timer is not None and self._timer.is_alive():
+            return
+        with self._lock:
+            if self._timer is not None and self._timer.is_alive():
+                return
+            self._timer = threading.Thread(target=self._run, name="llm-usage-flush", daemon=True)
+            self._timer.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    # --- budgets -----------------------------------------------------------
+
+    def month_tokens(self, user_id: int) -> Optional[int]:
+        """Tokens consommés ce mois (None si la valeur en cache est absente ou expirée)."""
+        from backend.models.subscription import usage_period_start
+
+        with self._lock:
+            budget = self._budgets.get(user_id)
+            if budget is None or budget[2] <= time.monotonic() or budget[0] != usage_period_start():
+                return None
+            return budget[1]
+
+    def load_month_tokens(self, user_id: int) -> int:
+        """Relit en base les tokens du mois de l'utilisateur (une requête SUM)."""
+        from sqlalchemy import func
+        from backend.models.database import SessionLocal
+        from backend.models.llm_usage import LLMUsage
+        from backend.models.subscription import usage_period_start
+
+        period_start = usage_period_start()
+        db = SessionLocal()
+        try:
+            used = db.query(
+                func.coalesce(func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens), 0)
+            ).filter(LLMUsage.user_id == user_id, LLMUsage.period_start >= period_start).scalar()
+        finally:
+            db.close()
+        with self._lock:
+            # Les agrégats pas encore écrits de ce processus comptent aussi
+            used += sum(values[2] + values[3] for key, values in self._pending.items()
+                        if key[3] == user_id and key[0] >= period_start)
+            self._budgets[user_id] = [period_start, int(used), time.monotonic() + self.budget_ttl_seconds]
+        return int(used)
+
+    @staticmethod
+    def budget_for(tier: Optional[str]) -> Optional[int]:
+        from backend.models.subscription import TIER_LIMITS, SubscriptionTier
+
+        try:
+            limits = TIER_LIMITS[SubscriptionTier(tier)] if tier else TIER_LIMITS[SubscriptionTier.FREE]
+        except ValueError:
+            limits = TIER_LIMITS[SubscriptionTier.FREE]
+        return limits.get("llm_tokens_per_month")
+
+    # --- consultation ------------------------------------------------------
+
+    def top_prompts(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Prompts les plus coûteux (tokens cumulés) depuis le démarrage du processus."""
+        with self._lock:
+            prompts = [dict(p) for p in self._prompts.values()]
+        prompts.sort(key=lambda p: p["prompt_tokens"] + p["completion_tokens"], reverse=True)
+        for p in prompts[:limit]:
+            p["total_tokens"] = p["prompt_tokens"] + p["completion_tokens"]
+            p["avg_latency_ms"] = round(p.pop("latency_ms_total") / p["calls"], 1)
+        return prompts[:limit]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "pending_rows": len(self._pending), "tracked_prompts": len(self._prompts)}
+
+
+llm_usage = LLMUsageRecorder()
@@ -0,0 +1,168 @@
+"""
+Configuration du logging non bloquant.
+
+Les handlers réels (stream, fichier) tournent dans le thread d'un QueueListener ;
+les loggers applicatifs n'écrivent que dans une file (QueueHandler), donc un log
+ne coûte jamais d'I/O synchrone dans le chemin de la requête.
+
+Variables d'environnement :
+- CLEO_LOG_PROFILE   : production (défaut) ou development
+- CLEO_LOG_LEVELS    : surcharges par module, ex. "backend.app=INFO,cleo.groq=DEBUG"
+- CLEO_LOG_RATE_LIMIT: nb max de messages INFO/DEBUG par appelant et par minute
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+_listeners: Dict[str, QueueListener] = {}
+_lock = threading.Lock()
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Niveaux par module selon le profil. Les routes (backend.app) et les agents
+# loggent beaucoup en INFO à chaque requête : en production on ne garde que WARNING+.
+LOG_LEVEL_PROFILES = {
+    "production": {
+        "": logging.INFO,
+        "backend.app": logging.WARNING,
+        "cleo.quiz_agent": logging.WARNING,
+        "cleo.evaluation_agent": logging.WARNING,
+        "cleo.subject_agent": logging.WARNING,
+        "cleo.support_agent": logging.WARNING,
+        "cleo.groq": logging.WARNING,
+        "cleo.emotion": logging.WARNING,
+        "cleo.orchestrator": logging.WARNING,
+        "cleo.database": logging.WARNING,
+        "cleo.access": logging.INFO,
+        "sqlalchemy.engine": logging.WARNING,
+        "uvicorn.access": logging.WARNING,
+    },
+    "development": {
+        "": logging.INFO,
+        "cleo.access": logging.INFO,
+        "sqlalchemy.engine": logging.WARNING,
+    },
+}
+
+LOG_RATE_LIMIT = int(os.getenv("CLEO_LOG_RATE_LIMIT", "30"))
+LOG_RATE_PERIOD = 60.0
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limite les messages répétitifs : au plus `rate` messages par appelant
+    (logger, fichier, ligne) et par fenêtre de `period` secondes. Les messages
+    supprimés sont comptés et signalés au premier message de la fenêtre suivante.
+    WARNING et au-dessus ne sont jamais filtrés.
+    """
+
+    def __init__(self, rate: int = LOG_RATE_LIMIT, period: float = LOG_RATE_PERIOD,
+                 exempt_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.exempt_level = exempt_level
+        self._windows: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= self.exempt_level:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+                return True
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def _parse_level_overrides(raw: str) -> Dict[str, int]:
+    """Parse "module=LEVEL,module2=LEVEL" en dict {module: niveau}."""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, level = item.partition("=")
+        level_value = logging.getLevelName(level.strip().upper())
+        if isinstance(level_value, int):
+            overrides[name.strip()] = level_value
+    return overrides
+
+
+def configure_logging(profile: Optional[str] = None) -> QueueListener:
+    """
+    Installe le pipeline QueueHandler -> QueueListener sur le root logger,
+    applique les niveaux par module du profil puis les surcharges CLEO_LOG_LEVELS.
+    Idempotent.
+    """
+    profile = (profile or os.getenv("CLEO_LOG_PROFILE", "production")).lower()
+    levels = dict(LOG_LEVEL_PROFILES.get(profile, LOG_LEVEL_PROFILES["production"]))
+    levels.update(_parse_level_overrides(os.getenv("CLEO_LOG_LEVELS", "")))
+
+    with _lock:
+        listener = _listeners.get("")
+        if listener is None:
+            target = logging.StreamHandler()
+            target.setFormatter(logging.Formatter(LOG_FORMAT))
+
+            log_queue = queue.SimpleQueue()
+            queue_handler = QueueHandler(log_queue)
+            queue_handler.addFilter(RateLimitFilter())
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(queue_handler)
+
+            listener = QueueListener(log_queue, target, respect_handler_level=True)
+            listener.start()
+            atexit.register(listener.stop)
+            _listeners[""] = listener
+
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level)
+    return listener
+
+
+def attach_queue_handler(
+    logger_name: str,
+    handler: Optional[logging.Handler] = None,
+    fmt: str = "%(message)s",
+    level: int = logging.INFO,
+) -> QueueListener:
+    """
+    Branche un QueueHandler sur `logger_name` et démarre le QueueListener qui
+    écrit vers `handler` (StreamHandler par défaut). Idempotent par logger.
+    """
+    with _lock:
+        if logger_name in _listeners:
+            return _listeners[logger_name]
+
+        target = handler or logging.StreamHandler()
+        target.setFormatter(logging.Formatter(fmt))
+
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, target, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+        target_logger = logging.getLogger(logger_name)
+        target_logger.addHandler(QueueHandler(log_queue))
+        if target_logger.level == logging.NOTSET:
+            target_logger.setLevel(level)  # ne pas écraser configure_logging / CLEO_LOG_LEVELS
+        target_logger.propagate = False
+
+        _listeners[logger_name] = listener
+        return listener
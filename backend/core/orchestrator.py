@@ -2,8 +2,10 @@ import datetime
 import logging
 from typing import Dict, Any, Optional
 
+from backend.core.llm_scheduler import Priority
+from backend.core.prompt_builder import MODE_INSTRUCTIONS, ORCHESTRATOR_SYSTEM_PROMPT
+
 logger = logging.getLogger("cleo.orchestrator")
-logger.setLevel(logging.INFO)
 
 
 class Orchestrator:
@@ -12,12 +14,13 @@ class Orchestrator:
     la génération de réponse via Groq, et la gestion du profil apprenant.
     """
 
-    def __init__(self, emotion_client=None, groq_client=None):
+    def __init__(self, emotion_client=None, groq_client=None, rag=None):
         self.emotion_client = emotion_client
         self.groq_client = groq_client
+        self.rag = rag  # Optionnel : récupération de documents (déjà préchauffé au startup)
         self._learners = {}  # Stockage en mémoire des profils
-        logger.info("Orchestrator initialized with emotion_client=%s groq_client=%s", 
-                    bool(emotion_client), bool(groq_client))
+        logger.info("Orchestrator initialized with emotion_client=%s groq_client=%s rag=%s", 
+                    bool(emotion_client), bool(groq_client), bool(rag))
 
     def process_query(self, learner_id: str, query: str, mode: str = "explain", top_k: int = 3) -> Dict[str, Any]:
         """
@@ -43,6 +46,9 @@ class Orchestrator:
             
             # 3) Construction du contexte pour le prompt (inclure le mode)
             context = self._build_context(learner_profile, emotion_result, query, mode)
+            docs = self._retrieve_documents(query, top_k)
+            if docs:
+                context += "\n\nRelevant sources:\n" + "\n\n".join(d.get("content", "") for d in docs)
             
             # 4) Génération de la réponse
             response_text = self._generate_response(context, query)
@@ -81,6 +87,16 @@ class Orchestrator:
             logger.warning("Emotion analysis failed: %s", e)
             return {"dominant_emotion": "neutre", "confidence": 0.0, "source": "error"}
 
+    def _retrieve_documents(self, query: str, top_k: int) -> list:
+        """Récupère les documents RAG si un RAG est configuré."""
+        if not self.rag or not top_k:
+            return []
+        try:
+            return self.rag.retrieve(query, n_results=top_k)
+        except Exception as e:
+            logger.warning("RAG retrieval failed: %s", e)
+            return []
+
     def _get_or_create_learner(self, learner_id: str) -> Dict[str, Any]:
         """Récupère ou crée un profil apprenant."""
         if learner_id not in self._learners:
@@ -94,42 +110,29 @@ class Orchestrator:
         return self._learners[learner_id]
 
     def _build_context(self, learner_profile: Dict, emotion: Dict, query: str, mode: str = "explain") -> str:
-        """Construit le contexte pour le prompt Groq."""
+        """
+        Construit la partie variable du prompt Groq (émotion, mode, historique).
+        Les consignes fixes sont envoyées en message système (ORCHESTRATOR_SYSTEM_PROMPT).
+        """
         emotion_label = emotion.get("dominant_emotion", "neutre")
         confidence = emotion.get("confidence", 0.0)
+        instruction = MODE_INSTRUCTIONS.get(mode, MODE_INSTRUCTIONS["explain"])
         
-        # Adapter le prompt selon le mode
-        mode_instructions = {
-            "explain": "Provide a clear, detailed explanation with examples.",
-            "quiz": "Create quiz questions based on the topic.",
-            "summarize": "Provide a concise summary of the key points.",
-            "define": "Give a precise definition with context."
-        }
-        instruction = mode_instructions.get(mode, mode_instructions["explain"])
-        
-        context = f"""You are CLEO, an adaptive learning assistant specialized in personalized education.
-
-    Current context:
-    - User emotion: {emotion_label} (confidence: {confidence:.2f})
-    - Mode: {mode} - {instruction}
-    - Adapt your tone based on emotion (encouraging if sad/frustrated, enthusiastic if happy)
-
-    Guidelines:
-    - Provide clear, educational responses
-    - Use examples when helpful
-    - Break down complex concepts
-    - Encourage continuous learning"""
+        parts = [
+            "Current context:",
+            f"- User emotion: {emotion_label} (confidence: {confidence:.2f})",
+            f"- Mode: {mode} - {instruction}",
+        ]
 
         # Historique récent
-        history = learner_profile.get("history", [])
-        if history:
-            recent = history[-3:]
-            context += "\n\nRecent conversation:"
+        recent = learner_profile.get("history", [])[-3:]
+        if recent:
+            parts.append("\nRecent conversation:")
             for idx, h in enumerate(recent, 1):
-                context += f"\n{idx}. User: {h.get('query', '')[:100]}"
-                context += f"\n   You: {h.get('response', '')[:100]}"
+                parts.append(f"{idx}. User: {h.get('query', '')[:100]}")
+                parts.append(f"   You: {h.get('response', '')[:100]}")
         
-        return context
+        return "\n".join(parts)
 
     def _generate_response(self, context: str, query: str) -> str:
         """Génère la réponse via GroqClient."""
@@ -139,7 +142,8 @@ class Orchestrator:
         
         try:
             full_prompt = f"{context}\n\nUser: {query}\n\nAssistant:"
-            response = self.groq_client.chat(full_prompt)
+            response = self.groq_client.chat(full_prompt, priority=Priority.INTERACTIVE, agent="orchestrator",
+                                             system=ORCHESTRATOR_SYSTEM_PROMPT)
             logger.info("Response generated (len=%d)", len(response))
             return response
         except Exception as e:
@@ -0,0 +1,67 @@
+"""
+Pagination par curseur (keyset) sur (horodatage, id).
+
+Le curseur est opaque pour le client : base64 de "<iso datetime>|<id>".
+Une page = filtre (ts, id) </> curseur + ORDER BY ts, id + LIMIT n+1,
+ce qui reste un parcours d'index borné quel que soit le nombre de pages.
+"""
+
+import base64
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Décode un curseur ; lève ValueError s'il est invalide."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_page(
+    query,
+    ts_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+    serialize: Callable[[Any], Dict[str, Any]] = lambda row: row.to_dict(),
+) -> Dict[str, Any]:
+    """
+    Applique la pagination keyset à `query` et retourne
+    {"items": [...], "next_cursor": str|None, "has_more": bool}.
+    """
+    key = tuple_(ts_column, id_column)
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(key < (timestamp, row_id) if descending else key > (timestamp, row_id))
+
+    if descending:
+        query = query.order_by(ts_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(ts_column.asc(), id_column.asc())
+
+    rows: List[Any] = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, ts_column.key), getattr(last, id_column.key))
+
+    return {
+        "items": [serialize(row) for row in rows],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
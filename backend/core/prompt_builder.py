@@ -0,0 +1,359 @@
+"""
+Construction des prompts LLM : messages système partagés et gabarits précompilés.
+
+- les consignes invariantes (rôle, format JSON strict) vont dans un message
+  système commun (QUIZ_SYSTEM_PROMPT, ORCHESTRATOR_SYSTEM_PROMPT) au lieu
+  d'être répétées dans chaque prompt utilisateur
+- les gabarits de génération de quiz (consignes + structure JSON attendue par
+  type de question) sont assemblés une fois à l'import ; un appel ne fait plus
+  qu'un str.format des champs variables (sujet, thème, Bloom, difficulté)
+- deux variantes par type : "full" (gabarits historiques : exemple matching
+  répété, JSON indenté) et "compact" (consignes dédupliquées, une seule
+  structure en JSON sur une ligne). CLEO_QUIZ_PROMPT_VARIANT choisit la
+  variante servie, CLEO_QUIZ_PROMPT_AB_SHARE la part des appels servis avec
+  l'autre variante (test A/B)
+- mesure : taille estimée du prompt (estimate_tokens) et taux de réponses
+  exploitables par (type, variante) (GET /api/admin/prompt-stats) ; les tokens
+  réellement facturés sont dans llm_usage, l'agent y étant étiqueté
+  "quiz:<variante>"
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("cleo.prompt_builder")
+
+QUIZ_PROMPT_VARIANT = os.getenv("CLEO_QUIZ_PROMPT_VARIANT", "compact")
+QUIZ_PROMPT_AB_SHARE = float(os.getenv("CLEO_QUIZ_PROMPT_AB_SHARE", "0"))
+
+PROMPT_VARIANTS = ("full", "compact")
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens (mots + ponctuation), sans tokenizer."""
+    return len(_TOKEN_RE.findall(text))
+
+
+# ============================================================================
+# Messages système partagés
+# ============================================================================
+
+QUIZ_SYSTEM_PROMPT = """You are an expert educational assessment creator.
+Output ONLY a valid JSON array of questions: no markdown, no explanations, no comments.
+Start with [ and end with ]. Use double quotes for all strings. No trailing commas."""
+
+ORCHESTRATOR_SYSTEM_PROMPT = """You are CLEO, an adaptive learning assistant specialized in personalized education.
+Adapt your tone to the user's emotion (encouraging if sad/frustrated, enthusiastic if happy).
+Give clear, educational responses, use examples when helpful, break down complex concepts and encourage continuous learning."""
+
+MODE_INSTRUCTIONS = {
+    "explain": "Provide a clear, detailed explanation with examples.",
+    "quiz": "Create quiz questions based on the topic.",
+    "summarize": "Provide a concise summary of the key points.",
+    "define": "Give a precise definition with context.",
+}
+
+
+# ============================================================================
+# Gabarits de génération de quiz
+# ============================================================================
+
+_QUIZ_HEADER = """Generate {num_questions} {question_type} questions.
+Subject: {subject}
+Topic: {topic}
+Bloom Taxonomy Level: {bloom_level} - {bloom_label}
+Difficulty: {difficulty}/5
+
+"""
+
+_QUIZ_FIELDS = ("num_questions", "question_type", "subject", "topic", "bloom_level", "bloom_label", "difficulty")
+
+_QUIZ_FOOTER = """
+
+Questions must target Bloom level {bloom_level} ({bloom_label}).
+Generate the JSON array now:"""
+
+# Variante historique : consignes et exemples tels qu'ils étaient envoyés par QuizAgent
+_FULL_INSTRUCTIONS = {
+    "mcq": """For Multiple Choice Questions (MCQ):
+- Provide 4 options (A, B, C, D)
+- Only ONE correct answer
+- Distractors should be plausible but clearly incorrect
+- Avoid "all of the above" or "none of the above"
+- Include brief explanation for the correct answer""",
+    "open_ended": """For Open-Ended Questions:
+- Questions should require 2-3 sentence answers
+- Clear evaluation criteria
+- Sample answer provided
+- Keywords that must be present in correct answers""",
+    "matching": """For Matching Questions - STRICT FORMAT REQUIRED:
+
+STRUCTURE:
+- Provide EXACTLY 5 items to match (L1-L5 and R1-R5)
+- Left items: concepts, terms, or key words
+- Right items: definitions, descriptions, or explanations
+- Shuffle right items (different order than left)
+- One correct match per left item
+
+CRITICAL JSON REQUIREMENTS:
+- Use IDs: "L1", "L2", "L3", "L4", "L5" for left
+- Use IDs: "R1", "R2", "R3", "R4", "R5" for right
+- Text must be clear and distinct
+- correct_matches must have ALL 5 pairs
+- NO trailing commas
+- NO comments in JSON
+
+Example (you must follow this EXACT structure):
+[
+{
+    "question_text": "Match the Big Data concepts:",
+    "left_items": [
+    {"id": "L1", "text": "HDFS"},
+    {"id": "L2", "text": "MapReduce"}
+    ],
+    "right_items": [
+    {"id": "R1", "text": "Processing framework"},
+    {"id": "R2", "text": "Distributed storage"}
+    ],
+    "correct_matches": [
+    {"left": "L1", "right": "R2"},
+    {"left": "L2", "right": "R1"}
+    ],
+    "points": 20
+}
+]""",
+    "true_false": """For True/False Questions:
+- Statement should be clearly true or false
+- Avoid ambiguous statements
+- Provide explanation for the correct answer""",
+}
+
+_FULL_TEMPLATES = {
+    "mcq": """[
+  {
+    "question_text": "What is...?",
+    "options": [
+      {"key": "A", "text": "Option A"},
+      {"key": "B", "text": "Option B"},
+      {"key": "C", "text": "Option C"},
+      {"key": "D", "text": "Option D"}
+    ],
+    "correct_answer": "B",
+    "explanation": "Explanation of why B is correct",
+    "points": 10
+  }
+]""",
+    "open_ended": """[
+  {
+    "question_text": "Explain...",
+    "sample_answer": "A model answer (2-3 sentences)",
+    "keywords": ["keyword1", "keyword2", "keyword3"],
+    "min_words": 30,
+    "points": 15
+  }
+]""",
+    "matching": """[
+    {
+        "question_text": "Match concepts with definitions:",
+        "left_items": [
+        {"id": "L1", "text": "First concept"},
+        {"id": "L2", "text": "Second concept"},
+        {"id": "L3", "text": "Third concept"},
+        {"id": "L4", "text": "Fourth concept"},
+        {"id": "L5", "text": "Fifth concept"}
+        ],
+        "right_items": [
+        {"id": "R1", "text": "Definition for first"},
+        {"id": "R2", "text": "Definition for second"},
+        {"id": "R3", "text": "Definition for third"},
+        {"id": "R4", "text": "Definition for fourth"},
+        {"id": "R5", "text": "Definition for fifth"}
+        ],
+        "correct_matches": [
+        {"left": "L1", "right": "R1"},
+        {"left": "L2", "right": "R2"},
+        {"left": "L3", "right": "R3"},
+        {"left": "L4", "right": "R4"},
+        {"left": "L5", "right": "R5"}
+        ],
+        "points": 20
+    }
+    ]""",
+    "true_false": """[
+  {
+    "question_text": "Statement to evaluate",
+    "correct_answer": true,
+    "explanation": "Why this is true/false",
+    "points": 5
+  }
+]""",
+}
+
+# Variante compacte : une consigne par règle, une seule structure (JSON sur une ligne)
+_COMPACT_INSTRUCTIONS = {
+    "mcq": "Rules: 4 options A-D, exactly one correct; plausible distractors; "
+           "no \"all/none of the above\"; brief explanation of the correct answer.",
+    "open_ended": "Rules: answers of 2-3 sentences; give a sample answer and the keywords "
+                  "a correct answer must contain.",
+    "matching": "Rules: EXACTLY 5 left items (ids L1-L5: concepts/terms) and 5 right items "
+                "(ids R1-R5: definitions), right items shuffled; correct_matches lists all 5 pairs.",
+    "true_false": "Rules: statements clearly true or false, not ambiguous; explain the answer.",
+}
+
+_COMPACT_TEMPLATES = {
+    "mcq": [{
+        "question_text": "...",
+        "options": [{"key": k, "text": "..."} for k in "ABCD"],
+        "correct_answer": "B",
+        "explanation": "...",
+        "points": 10,
+    }],
+    "open_ended": [{
+        "question_text": "...",
+        "sample_answer": "...",
+        "keywords": ["..."],
+        "min_words": 30,
+        "points": 15,
+    }],
+    "matching": [{
+        "question_text": "Match concepts with definitions:",
+        "left_items": [{"id": f"L{i}", "text": "..."} for i in range(1, 6)],
+        "right_items": [{"id": f"R{i}", "text": "..."} for i in range(1, 6)],
+        "correct_matches": [{"left": f"L{i}", "right": f"R{r}"} for i, r in zip(range(1, 6), (3, 1, 5, 2, 4))],
+        "points": 20,
+    }],
+    "true_false": [{
+        "question_text": "...",
+        "correct_answer": True,
+        "explanation": "...",
+        "points": 5,
+    }],
+}
+
+
+def _literal(text: str) -> str:
+    """Échappe les accolades d'un texte fixe pour str.format."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+@dataclass(frozen=True)
+class QuizPrompt:
+    system: str
+    user: str
+    variant: str
+    estimated_tokens: int
+
+
+class PromptTemplate:
+    """Gabarit de prompt utilisateur d'un (type, variante), assemblé une seule fois."""
+
+    __slots__ = ("question_type", "variant", "_format", "static_tokens")
+
+    def __init__(self, question_type: str, variant: str, instructions: str, structure: str):
+        self.question_type = question_type
+        self.variant = variant
+        self._format = (
+            _QUIZ_HEADER
+            + _literal(instructions)
+            + "\n\nJSON structure:\n"
+            + _literal(structure)
+            + _QUIZ_FOOTER
+        )
+        # Tokens fixes (système + gabarit), hors champs variables
+        self.static_tokens = (estimate_tokens(QUIZ_SYSTEM_PROMPT)
+                              + estimate_tokens(self.render(**dict.fromkeys(_QUIZ_FIELDS, ""))))
+
+    def render(self, **fields: Any) -> str:
+        return self._format.format(**fields)
+
+
+def _compile_templates() -> Dict[Tuple[str, str], PromptTemplate]:
+    templates = {}
+    for question_type, instructions in _FULL_INSTRUCTIONS.items():
+        templates[(question_type, "full")] = PromptTemplate(
+            question_type, "full", instructions, _FULL_TEMPLATES[question_type]
+        )
+    for question_type, instructions in _COMPACT_INSTRUCTIONS.items():
+        structure = json.dumps(_COMPACT_TEMPLATES[question_type], ensure_ascii=False)
+        templates[(question_type, "compact")] = PromptTemplate(
+            question_type, "compact", instructions, structure
+        )
+    return templates
+
+
+class PromptBuilder:
+    """Choix de la variante (A/B), rendu des prompts de quiz et statistiques par variante."""
+
+    def __init__(self, variant: str = QUIZ_PROMPT_VARIANT, ab_share: float = QUIZ_PROMPT_AB_SHARE):
+        if variant not in PROMPT_VARIANTS:
+            logger.warning("Unknown CLEO_QUIZ_PROMPT_VARIANT=%s, using compact", variant)
+            variant = "compact"
+        self.variant = variant
+        self.ab_share = min(1.0, max(0.0, ab_share))
+        self.templates = _compile_templates()
+        self._stats: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        logger.info("PromptBuilder ready: variant=%s ab_share=%.2f templates=%d",
+                    self.variant, self.ab_share, len(self.templates))
+
+    def choose_variant(self) -> str:
+        if self.ab_share and random.random() < self.ab_share:
+            return next(v for v in PROMPT_VARIANTS if v != self.variant)
+        return self.variant
+
+    def quiz_prompt(self, subject: str, topic: str, bloom_level: int, bloom_label: str,
+                    question_type: str, num_questions: int, difficulty: int,
+                    variant: Optional[str] = None) -> QuizPrompt:
+        """Prompt système + utilisateur pour générer `num_questions` questions d'un type."""
+        variant = variant or self.choose_variant()
+        template = self.templates.get((question_type, variant)) or self.templates[("mcq", variant)]
+        user = template.render(
+            num_questions=num_questions, question_type=question_type, subject=subject, topic=topic,
+            bloom_level=bloom_level, bloom_label=bloom_label, difficulty=difficulty,
+        )
+        estimated = estimate_tokens(QUIZ_SYSTEM_PROMPT) + estimate_tokens(user)
+        with self._lock:
+            stats = self._stats.setdefault((question_type, variant), {"calls": 0, "ok": 0, "failed": 0, "tokens": 0})
+            stats["calls"] += 1
+            stats["tokens"] += estimated
+        return QuizPrompt(QUIZ_SYSTEM_PROMPT, user, variant, estimated)
+
+    def record_outcome(self, question_type: str, variant: str, ok: bool):
+        """Réponse exploitable (JSON valide, questions conformes) ou non, pour comparer les variantes."""
+        with self._lock:
+            stats = self._stats.setdefault((question_type, variant), {"calls": 0, "ok": 0, "failed": 0, "tokens": 0})
+            stats["ok" if ok else "failed"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            variants: List[Dict[str, Any]] = [
+                {
+                    "question_type": question_type,
+                    "variant": variant,
+                    "calls": stats["calls"],
+                    "avg_prompt_tokens": round(stats["tokens"] / stats["calls"], 1) if stats["calls"] else 0.0,
+                    "success_rate": round(stats["ok"] / (stats["ok"] + stats["failed"]), 3)
+                    if stats["ok"] + stats["failed"] else None,
+                }
+                for (question_type, variant), stats in sorted(self._stats.items())
+            ]
+        return {
+            "variant": self.variant,
+            "ab_share": self.ab_share,
+            "static_tokens": {
+                f"{question_type}:{variant}": template.static_tokens
+                for (question_type, variant), template in sorted(self.templates.items())
+            },
+            "variants": variants,
+        }
+
+
+prompt_builder = PromptBuilder()
@@ -0,0 +1,291 @@
+"""
+Déduplication de la banque de questions.
+
+- identifiant de contenu : question_id = q_<sha1> du contenu normalisé (sujet,
+  type, énoncé, options / éléments à associer) ; une question régénérée garde
+  le même identifiant quels que soient son thème et sa position dans le quiz
+- quasi-doublons : signature MinHash (64 permutations) des bigrammes de mots
+  porteurs de l'énoncé (racinisés, mots vides exclus mais négations gardées,
+  cf. backend.core.text_similarity) et des options entières, indexée par LSH
+  (16 bandes de 4 lignes) ; un candidat n'est retenu que si la similarité de
+  Jaccard estimée atteint CLEO_DEDUP_THRESHOLD et si la réponse attendue
+  (vrai/faux, texte de la bonne option d'un QCM) est la même
+- l'index est tenu en mémoire par (sujet, type de question), chargé depuis la
+  banque à la première utilisation puis complété par id croissant : les
+  questions insérées par les autres workers sont vues au quiz suivant
+
+Les signatures sont stockées dans Question.minhash ; celles des questions
+antérieures (colonne NULL) sont recalculées au chargement.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.core.text_similarity import NEGATIONS, STOPWORDS, tokenize
+from backend.models.question import Question
+
+logger = logging.getLogger("cleo.question_index")
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 2
+DEDUP_THRESHOLD = float(os.getenv("CLEO_DEDUP_THRESHOLD", "0.8"))
+# « is mutable » et « is NOT mutable » sont deux questions distinctes
+SHINGLE_STOPWORDS = STOPWORDS - NEGATIONS
+
+_PRIME = (1 << 61) - 1
+# Permutations fixes : les signatures persistées restent comparables d'un démarrage à l'autre
+_rng = random.Random(0xC1E0)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def _segments(question: Dict[str, Any]) -> List[str]:
+    """Textes qui définissent une question : énoncé, puis options ou éléments à associer."""
+    segments = [question.get("question_text") or ""]
+    qtype = question.get("question_type")
+    if qtype == "mcq":
+        segments += [opt.get("text") or "" for opt in question.get("options") or [] if isinstance(opt, dict)]
+    elif qtype == "matching":
+        for side in ("left_items", "right_items"):
+            segments += [item.get("text") or "" for item in question.get(side) or [] if isinstance(item, dict)]
+    return segments
+
+
+def _answer_key(question: Dict[str, Any]) -> str:
+    """
+    Une affirmation et sa négation se ressemblent : la réponse attendue doit
+    coïncider (vrai/faux, ou texte de la bonne option d'un QCM, indépendant de sa lettre).
+    """
+    qtype = question.get("question_type")
+    if qtype == "true_false":
+        return str(question.get("correct_answer")).lower()
+    if qtype == "mcq":
+        correct = str(question.get("correct_answer") or "").strip().upper()
+        for opt in question.get("options") or []:
+            if isinstance(opt, dict) and str(opt.get("key") or "").strip().upper() == correct:
+                return " ".join(tokenize(opt.get("text") or ""))
+        return correct.lower()
+    return ""
+
+
+def content_id(subject: str, question: Dict[str, Any]) -> str:
+    """Identifiant stable d'une question, dérivé de son contenu normalisé."""
+    segments = [" ".join(tokenize(text)) for text in _segments(question)]
+    # L'ordre des options n'en change pas le contenu
+    parts = [
+        (subject or "").strip().lower(),
+        question.get("question_type") or "",
+        segments[0],
+        "\x1f".join(sorted(segments[1:])),
+        _answer_key(question),
+    ]
+    return "q_" + hashlib.sha1("\x1e".join(parts).encode("utf-8")).hexdigest()[:20]
+
+
+def signature(question: Dict[str, Any]) -> List[int]:
+    """
+    Signature MinHash : bigrammes des mots porteurs de l'énoncé (insensibles aux
+    reformulations mineures « What's a » / « What is the ») et options entières.
+    """
+    statement, *items = _segments(question)
+    words = [t for t in tokenize(statement) if t not in SHINGLE_STOPWORDS and len(t) > 1]
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    shingles += ["\x1f" + " ".join(tokenize(text)) for text in items if text]
+
+    hashes = set()
+    for shingle in shingles:
+        hashes.add(int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"))
+    if not hashes:
+        return [_PRIME] * NUM_PERM
+    return [min((a * x + b) % _PRIME for x in hashes) for a, b in _PERMUTATIONS]
+
+
+def jaccard(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Similarité de Jaccard estimée entre deux signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _band_keys(sig: Sequence[int]):
+    for band in range(BANDS):
+        yield band, hash(tuple(sig[band * ROWS:(band + 1) * ROWS]))
+
+
+class _Scope:
+    """Index LSH des questions d'un (sujet, type)."""
+
+    __slots__ = ("max_id", "entries", "buckets")
+
+    def __init__(self):
+        self.max_id = 0
+        self.entries: Dict[str, Tuple[array, str]] = {}   # question_id -> (signature, clé de réponse)
+        self.buckets: Dict[Tuple[int, int], List[str]] = {}
+
+    def add(self, question_id: str, sig: Sequence[int], answer_key: str):
+        if question_id in self.entries:
+            return
+        self.entries[question_id] = (array("Q", sig), answer_key)
+        for key in _band_keys(sig):
+            self.buckets.setdefault(key, []).append(question_id)
+
+    def find(self, sig: Sequence[int], answer_key: str) -> Optional[Tuple[str, float]]:
+        """Question la plus proche au-dessus du seuil, parmi les candidats LSH."""
+        candidates = set()
+        for key in _band_keys(sig):
+            candidates.update(self.buckets.get(key, ()))
+        best = None
+        for question_id in candidates:
+            other, other_key = self.entries[question_id]
+            if other_key != answer_key:
+                continue
+            score = jaccard(sig, other)
+            if score >= DEDUP_THRESHOLD and (best is None or score > best[1]):
+                best = (question_id, score)
+        return best
+
+
+class QuestionIndex:
+    """Index des quasi-doublons de la banque, partagé par les requêtes du processus."""
+
+    def __init__(self):
+        self._scopes: Dict[Tuple[int, str], _Scope] = {}
+        self._lock = threading.Lock()
+        self.stats = {"exact": 0, "near": 0, "in_batch": 0, "new": 0}
+
+    def _scope(self, db, subject_id: int, question_type: str) -> _Scope:
+        """Scope à jour : ajoute les questions insérées depuis le dernier chargement."""
+        with self._lock:
+            scope = self._scopes.setdefault((subject_id, question_type), _Scope())
+            since = scope.max_id
+
+        rows = db.query(
+            Question.id, Question.question_id, Question.question_data, Question.minhash
+        ).filter(
+            Question.subject_id == subject_id,
+            Question.question_type == question_type,
+            Question.id > since
+        ).order_by(Question.id).all()
+
+        if rows:
+            loaded = []
+            for pk, question_id, data, stored in rows:
+                data = data or {}
+                sig = stored if stored and len(stored) == NUM_PERM else signature(data)
+                loaded.append((question_id, sig, _answer_key(data)))
+            with self._lock:
+                for question_id, sig, key in loaded:
+                    scope.add(question_id, sig, key)
+                scope.max_id = max(scope.max_id, rows[-1][0])
+            if not since:
+                logger.info("Question index loaded: subject=%s type=%s (%d questions)",
+                            subject_id, question_type, len(rows))
+        return scope
+
+    def canonicalize(self, db, subject_id: int, subject_name: str,
+                     questions: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, List[int]]]:
+        """
+        Remplace chaque question générée déjà présente dans la banque (identique ou
+        quasi identique) par sa version canonique ; les doublons internes au lot sont retirés.
+        Les versions canoniques sont lues en une seule requête IN.
+
+        Returns:
+            (questions, signatures des nouvelles questions par question_id)
+        """
+        prepared = []
+        scopes: Dict[str, _Scope] = {}
+        for q in questions:
+            if q.get("fallback"):
+                prepared.append((q, None, None, None))
+                continue
+            qtype = q.get("question_type") or "mcq"
+            q["question_id"] = content_id(subject_name, q)
+            sig, key = signature(q), _answer_key(q)
+            if qtype not in scopes:
+                scopes[qtype] = self._scope(db, subject_id, qtype)
+            with self._lock:
+                match = scopes[qtype].find(sig, key)
+            prepared.append((q, sig, key, match[0] if match else None))
+
+        wanted = {q["question_id"] for q, sig, _, _ in prepared if sig is not None}
+        wanted |= {match for _, _, _, match in prepared if match}
+        bank = dict(
+            db.query(Question.question_id, Question.question_data).filter(
+                Question.question_id.in_(list(wanted)), Question.question_data.isnot(None)
+            )
+        ) if wanted else {}
+
+        result, new_signatures = [], {}
+        batch: List[Tuple[str, List[int], str]] = []
+        for q, sig, key, match in prepared:
+            if sig is None:
+                result.append(q)
+                continue
+
+            if any(qid == q["question_id"] or (k == key and jaccard(sig, s) >= DEDUP_THRESHOLD)
+                   for qid, s, k in batch):
+                self.stats["in_batch"] += 1
+                continue
+
+            canonical, kind = (q["question_id"], "exact") if q["question_id"] in bank else (match, "near")
+            if canonical in bank:
+                logger.info("Question mapped onto bank item %s (%s)", canonical, kind)
+                self.stats[kind] += 1
+                data = dict(bank[canonical])
+                data["question_id"] = canonical
+                batch.append((canonical, sig, key))
+                result.append(data)
+                continue
+
+            self.stats["new"] += 1
+            batch.append((q["question_id"], sig, key))
+            new_signatures[q["question_id"]] = sig
+            result.append(q)
+
+        return result, new_signatures
+
+
+def upsert_questions(db, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Insère en bloc les questions absentes de la banque, en un nombre constant de
+    requêtes quel que soit le nombre de questions :
+    1. SELECT ... WHERE question_id IN (...) pour les questions existantes
+    2. INSERT ... ON CONFLICT(question_id) DO NOTHING (executemany) pour les autres ;
+       une insertion concurrente par un autre worker est ignorée sans erreur
+    3. SELECT des ids des questions insérées
+
+    Args:
+        rows: colonnes de Question (question_id obligatoire), mêmes clés pour toutes
+
+    Returns:
+        question_id -> Question.id pour toutes les questions du lot
+    """
+    if not rows:
+        return {}
+    from sqlalchemy.dialects.sqlite import insert
+
+    def id_map(question_ids):
+        return dict(
+            db.query(Question.question_id, Question.id).filter(Question.question_id.in_(list(question_ids)))
+        )
+
+    ids = id_map({row["question_id"] for row in rows})
+    missing = {row["question_id"]: row for row in rows if row["question_id"] not in ids}
+    if missing:
+        db.execute(
+            insert(Question.__table__).on_conflict_do_nothing(index_elements=["question_id"]),
+            list(missing.values())
+        )
+        ids.update(id_map(missing))
+        logger.debug("Question bank upsert: %d inserted, %d existing", len(missing), len(rows) - len(missing))
+    return ids
+
+
+question_index = QuestionIndex()
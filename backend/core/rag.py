@@ -3,6 +3,8 @@ RAG wrapper avec chargement lazy du modèle d'embeddings et du client Chroma.
 But: éviter les téléchargements/initialisations lourdes lors de l'import du module.
 """
 import os
+import threading
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -11,6 +13,30 @@ _EMB_MODEL_ENV = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-
 _CHROMA_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_pdf_db")
 _DEFAULT_COLLECTION = "adaptive_learning_kb"
 
+# Modèles d'embeddings partagés dans le process (RAG, correction locale des réponses)
+_embedding_models: Dict[str, Any] = {}
+_embedding_lock = threading.Lock()
+
+
+def load_embedding_model(model_name: str = _EMB_MODEL_ENV):
+    """Charge (une seule fois par process) et retourne le SentenceTransformer demandé."""
+    model = _embedding_models.get(model_name)
+    if model is None:
+        with _embedding_lock:
+            model = _embedding_models.get(model_name)
+            if model is None:
+                # Import gourmand placé ici
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name)
+                _embedding_models[model_name] = model
+    return model
+
+
+def get_loaded_embedding_model(model_name: str = _EMB_MODEL_ENV):
+    """Modèle déjà chargé, ou None (ne déclenche aucun chargement)."""
+    return _embedding_models.get(model_name)
+
+
 class RAG:
     def __init__(self, embedding_model_name: str = _EMB_MODEL_ENV, collection_name: str = _DEFAULT_COLLECTION):
         # Ne pas instancier SentenceTransformer ni Chromadb ici — faire lazy.
@@ -22,9 +48,7 @@ class RAG:
 
     def _ensure_embedding(self):
         if self.embedding_model is None:
-            # Import gourmand placé ici
-            from sentence_transformers import SentenceTransformer
-            self.embedding_model = SentenceTransformer(self._embedding_model_name)
+            self.embedding_model = load_embedding_model(self._embedding_model_name)
 
     def _ensure_chroma(self):
         if self.client is None:
@@ -43,6 +67,22 @@ class RAG:
             except Exception:
                 self.collection = self.client.create_collection(name=self._collection_name)
 
+    def warmup(self, text: str = "warm-up") -> Dict[str, float]:
+        """
+        Charge le modèle et Chroma puis exécute un encode et une query factices,
+        pour que la première vraie requête ne paie pas le coût de première inférence.
+        Retourne la durée (s) de préchauffage de chaque composant.
+        """
+        t0 = time.perf_counter()
+        self._ensure_embedding()
+        q_emb = self.embedding_model.encode([text], convert_to_numpy=True).tolist()
+        t1 = time.perf_counter()
+        self._ensure_chroma()
+        if self.collection.count() > 0:
+            self.collection.query(query_embeddings=q_emb, n_results=1)
+        t2 = time.perf_counter()
+        return {"embedder": t1 - t0, "vector_store": t2 - t1}
+
     def add_documents(self, docs: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
         # Ensure model + client available
         self._ensure_embedding()
@@ -0,0 +1,217 @@
+"""
+Limitation de débit par seaux à jetons (token buckets).
+
+Chaque client (utilisateur authentifié, sinon adresse IP) dispose de deux seaux :
+- « api » : toutes les routes /api, RATE_LIMIT_REQUESTS par RATE_LIMIT_PERIOD
+  secondes (backend/core/config.py)
+- « llm » : routes qui appellent Groq (génération de quiz, contenus, indices,
+  correction des réponses ouvertes, /api/query), budget séparé
+  CLEO_RATE_LIMIT_LLM_REQUESTS par période
+
+Une requête refusée par un seau ne consomme rien : les jetons déjà pris dans
+les seaux précédents sont rendus (take avec un coût négatif).
+
+Les deux budgets sont multipliés selon le SubscriptionTier de l'utilisateur.
+
+Le stockage est interchangeable (CLEO_RATE_LIMIT_BACKEND) :
+- "local" (défaut) : LocalBucketStore, en mémoire du processus ; chaque worker
+  applique alors sa propre limite
+- "paquet.module:fabrique" : fabrique sans argument retournant un objet qui
+  expose take(key, capacity, refill_per_second, cost) -> (autorisé, jetons
+  restants, secondes avant réessai), cost < 0 rendant des jetons, par exemple un seau partagé dans Redis
+  (script Lua) pour une limite commune à tous les workers
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from array import array
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("cleo.rate_limit")
+
+RATE_LIMIT_ENABLED = os.getenv("CLEO_RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_LLM_REQUESTS = int(os.getenv("CLEO_RATE_LIMIT_LLM_REQUESTS", "10"))
+RATE_LIMIT_BACKEND = os.getenv("CLEO_RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_TIER_TTL_SECONDS = float(os.getenv("CLEO_RATE_LIMIT_TIER_TTL_SECONDS", "300"))
+
+# Routes dont chaque appel déclenche un appel LLM
+LLM_PATH_PREFIXES = (
+    "/api/quiz/generate",
+    "/api/quiz/get-hint",
+    "/api/quiz/ai-hint",
+    "/api/quiz/submit-answer",     # réponses ouvertes incertaines : correcteur IA
+    "/api/quiz/submit-answers",
+    "/api/content/",
+    "/api/query",
+)
+
+# Multiplicateur des budgets par tier (clé : SubscriptionTier.value ; None = anonyme)
+TIER_MULTIPLIERS = {
+    None: 1,
+    "free": 1,
+    "bronze": 2,
+    "silver": 3,
+    "gold": 5,
+    "platinum": 10,
+}
+
+
+class LocalBucketStore:
+    """
+    Seaux à jetons en mémoire, compacts : deux tableaux de doubles (jetons,
+    dernier remplissage) et un dict clé -> emplacement. Les seaux redevenus
+    pleins sont libérés périodiquement (un seau plein équivaut à un seau absent).
+    """
+
+    blocking = False
+
+    def __init__(self, sweep_every: int = 10000):
+        self._slots: Dict[str, int] = {}
+        self._tokens = array("d")
+        self._updated = array("d")
+        self._refill = array("d")
+        self._capacity = array("d")
+        self._free = []
+        self._lock = threading.Lock()
+        self._sweep_every = sweep_every
+        self._ops = 0
+
+    def take(self, key: str, capacity: float, refill_per_second: float,
+             cost: float = 1.0) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._allocate(key)
+                tokens = capacity
+            else:
+                tokens = min(capacity, self._tokens[slot] + (now - self._updated[slot]) * refill_per_second)
+            self._updated[slot] = now
+            self._refill[slot] = refill_per_second
+            self._capacity[slot] = capacity
+
+            if tokens >= cost:
+                self._tokens[slot] = tokens - cost
+                allowed, retry_after = True, 0.0
+            else:
+                self._tokens[slot] = tokens
+                allowed = False
+                retry_after = (cost - tokens) / refill_per_second if refill_per_second > 0 else float("inf")
+
+            self._ops += 1
+            if self._ops >= self._sweep_every:
+                self._sweep(now)
+            return allowed, self._tokens[slot], retry_after
+
+    def _allocate(self, key: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._tokens)
+            for column in (self._tokens, self._updated, self._refill, self._capacity):
+                column.append(0.0)
+        self._slots[key] = slot
+        return slot
+
+    def _sweep(self, now: float):
+        """Libère les seaux qui se sont remplis depuis leur dernier usage."""
+        self._ops = 0
+        for key, slot in list(self._slots.items()):
+            if self._tokens[slot] + (now - self._updated[slot]) * self._refill[slot] >= self._capacity[slot]:
+                del self._slots[key]
+                self._free.append(slot)
+
+    def __len__(self):
+        return len(self._slots)
+
+
+def load_backend(spec: str = RATE_LIMIT_BACKEND):
+    """Construit le stockage des seaux : "local" ou "paquet.module:fabrique"."""
+    if spec == "local":
+        return LocalBucketStore()
+    module_name, _, factory = spec.partition(":")
+    backend = getattr(importlib.import_module(module_name), factory or "create_backend")()
+    logger.info("Rate limit backend: %s", spec)
+    return backend
+
+
+class TierCache:
+    """Cache process à TTL : user_id -> tier d'abonnement (valeur de SubscriptionTier)."""
+
+    def __init__(self, ttl_seconds: float = RATE_LIMIT_TIER_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Tuple[bool, Optional[str]]:
+        """(trouvé, tier)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or time.monotonic() >= entry[0]:
+                return False, None
+            return True, entry[1]
+
+    def set(self, user_id: int, tier):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, getattr(tier, "value", tier))
+
+    def load(self, user_id: int) -> Optional[str]:
+        """Lit le tier en base (une requête) et le met en cache."""
+        from backend.models.database import SessionLocal
+        from backend.models.subscription import Subscription
+
+        db = SessionLocal()
+        try:
+            tier = db.query(Subscription.tier).filter(Subscription.user_id == user_id).scalar()
+        finally:
+            db.close()
+        self.set(user_id, tier)
+        return getattr(tier, "value", tier)
+
+
+class RateLimiter:
+    """Budgets « api » et « llm » par client, multipliés selon le tier."""
+
+    def __init__(self, requests: int, period: float, llm_requests: int = RATE_LIMIT_LLM_REQUESTS,
+                 backend=None):
+        self.requests = requests
+        self.period = period
+        self.llm_requests = llm_requests
+        self.backend = backend if backend is not None else load_backend()
+        self.stats = {"allowed": 0, "limited_api": 0, "limited_llm": 0}
+
+    @staticmethod
+    def is_llm_path(path: str) -> bool:
+        return path.startswith(LLM_PATH_PREFIXES)
+
+    def check(self, client_key: str, tier: Optional[str], path: str) -> Optional[Dict[str, float]]:
+        """
+        Consomme un jeton « api » (et « llm » pour les routes LLM).
+        Retourne None si la requête passe, sinon {budget, limit, retry_after} ;
+        une requête refusée rend les jetons déjà pris.
+        """
+        multiplier = TIER_MULTIPLIERS.get(tier, 1)
+        budgets = [("api", self.requests * multiplier)]
+        if self.is_llm_path(path):
+            budgets.append(("llm", self.llm_requests * multiplier))
+
+        taken = []
+        for budget, limit in budgets:
+            allowed, _, retry_after = self.backend.take(
+                f"{client_key}:{budget}", limit, limit / self.period
+            )
+            if not allowed:
+                for taken_budget, taken_limit in taken:
+                    self.backend.take(f"{client_key}:{taken_budget}", taken_limit,
+                                      taken_limit / self.period, cost=-1.0)
+                self.stats[f"limited_{budget}"] += 1
+                return {"budget": budget, "limit": limit, "retry_after": retry_after}
+            taken.append((budget, limit))
+        self.stats["allowed"] += 1
+        return None
+
+
+tier_cache = TierCache()
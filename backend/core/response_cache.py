@@ -0,0 +1,105 @@
+"""
+Cache de réponses des endpoints apprenant (dashboard, historiques).
+
+Chaque apprenant a un compteur de version par domaine de données :
+- "quiz"    : sessions, réponses, progression (alimente aussi le dashboard)
+- "emotion" : logs d'émotions
+
+Les routes d'écriture appellent learner_versions.bump(learner_id, domaine).
+Les routes de lecture dérivent leur ETag du jeton de version : si le client
+renvoie cet ETag, on répond 304 sans requête ni calcul ; sinon le payload est
+servi depuis response_cache tant que la version n'a pas bougé.
+
+Les versions sont propres au processus (identifiant de boot inclus dans le
+jeton) : un redémarrage invalide tous les ETags. Avec plusieurs workers,
+CLEO_RESPONSE_CACHE_TTL_SECONDS borne la durée pendant laquelle un worker
+peut servir une donnée modifiée par un autre (le jeton change à chaque fenêtre).
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger("cleo.response_cache")
+
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("CLEO_RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("CLEO_RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class LearnerDataVersions:
+    """Compteurs de version par (apprenant, domaine)."""
+
+    def __init__(self):
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, learner_id: str, *domains: str):
+        with self._lock:
+            for domain in domains:
+                key = (str(learner_id), domain)
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get(self, learner_id: str, domain: str) -> int:
+        return self._versions.get((str(learner_id), domain), 0)
+
+    def token(self, learner_id: str, *domains: str) -> str:
+        """
+        Jeton combinant les versions des domaines demandés, ex. "a1b2c3d4:812:quiz=3".
+        La fenêtre temporelle (TTL) force une revalidation périodique.
+        """
+        versions = ",".join(f"{d}={self.get(learner_id, d)}" for d in domains)
+        window = int(time.time() // RESPONSE_CACHE_TTL_SECONDS) if RESPONSE_CACHE_TTL_SECONDS > 0 else 0
+        return f"{BOOT_ID}:{window}:{versions}"
+
+
+class ResponseCache:
+    """Cache LRU à TTL pour des payloads déjà calculés."""
+
+    def __init__(self, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Retourne la valeur en cache pour `key` ou la calcule. La clé doit inclure
+        le jeton de version : une écriture produit une nouvelle clé, l'ancienne
+        entrée sort par LRU/TTL.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+learner_versions = LearnerDataVersions()
+response_cache = ResponseCache()
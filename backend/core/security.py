@@ -1,25 +1,31 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, Optional
 import jwt
 import re
 
-# Context pour hasher les mots de passe
-# ⭐ Context pour hasher les mots de passe - Support Argon2 ET bcrypt
-pwd_context = CryptContext(
-    schemes=["argon2", "bcrypt"],  # ⭐ CORRECTION : ajouter argon2
-    deprecated="auto"
-)
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """
+    Context pour hasher les mots de passe - Support Argon2 ET bcrypt.
+    ⭐ Créé au premier usage : passlib/argon2 ne sont plus importés au démarrage.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],  # ⭐ CORRECTION : ajouter argon2
+        deprecated="auto"
+    )
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Vérifie qu'un mot de passe correspond au hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash un mot de passe."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def validate_password_strength(password: str) -> Dict[str, any]:
     """
@@ -74,8 +80,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     
     to_encode = data.copy()
     
-    # ⭐ DEBUG
-    logger.info(f"🔑 Creating token with sub={data.get('sub')} (type: {type(data.get('sub'))})")
+    logger.debug("Creating token with sub=%s", data.get('sub'))
     
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -95,8 +100,6 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
             algorithm=settings.ALGORITHM
         )
         
-        logger.info(f"✅ Token created successfully (length: {len(encoded_jwt)})")
-        
         return encoded_jwt
     except Exception as e:
         logger.exception(f"❌ Error creating token: {e}")
@@ -131,8 +134,6 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
             algorithm=settings.ALGORITHM
         )
         
-        logger.info(f"✅ Refresh token created (length: {len(encoded_jwt)})")
-        
         return encoded_jwt
     except Exception as e:
         logger.exception(f"❌ Error creating refresh token: {e}")
@@ -147,15 +148,13 @@ def decode_access_token(token: str) -> Optional[dict]:
     logger = logging.getLogger("backend.app")
     
     try:
-        logger.info(f"🔓 Decoding token (length: {len(token)})")
-        
         payload = jwt.decode(
             token, 
             settings.SECRET_KEY, 
             algorithms=[settings.ALGORITHM]
         )
         
-        logger.info(f"✅ Token decoded successfully: sub={payload.get('sub')}")
+        logger.debug("Token decoded: sub=%s", payload.get('sub'))
         
         return payload
     except jwt.ExpiredSignatureError:
@@ -0,0 +1,170 @@
+"""
+Cache process du catalogue des sujets.
+
+La table `subjects` ne change que via les routes admin (CRUD) : on la charge une
+fois, on précalcule les dicts servis par l'API (to_dict, icône, niveau de
+difficulté) et on ne la recharge que lorsque la version du catalogue change.
+
+- invalidate() incrémente la version (appelé par create/update/delete)
+- CLEO_SUBJECT_CATALOG_TTL_SECONDS borne la durée de vie d'un snapshot, pour
+  les modifications faites par un autre worker ou un script de seed
+- chaque snapshot porte un ETag calculé sur son contenu (stable entre workers)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("cleo.catalog")
+
+SUBJECT_CATALOG_TTL_SECONDS = float(os.getenv("CLEO_SUBJECT_CATALOG_TTL_SECONDS", "300"))
+
+SUBJECT_ICONS = {
+    "math": "🔢", "mathematics": "🔢", "algebra": "🔢", "geometry": "📐", "calculus": "📊",
+    "python": "🐍", "javascript": "💛", "java": "☕", "c++": "⚙️", "programming": "💻",
+    "physics": "⚛️", "chemistry": "🧪", "biology": "🧬", "science": "🔬",
+    "history": "📜", "geography": "🌍", "literature": "📚", "english": "📖",
+    "art": "🎨", "music": "🎵", "design": "✨",
+    "business": "💼", "economics": "💰", "finance": "💵",
+    "machine learning": "🤖", "ai": "🤖", "data": "📊", "web": "🌐",
+    "database": "🗄️", "network": "🔗", "security": "🔒"
+}
+
+CATEGORY_ICONS = {
+    "stem": "🔬",
+    "science": "🧪",
+    "technology": "💻",
+    "engineering": "⚙️",
+    "mathematics": "🔢",
+    "arts": "🎨",
+    "humanities": "📚",
+    "social": "👥",
+    "business": "💼",
+    "language": "🗣️"
+}
+
+
+def subject_icon(name: str, category: Optional[str] = None) -> str:
+    """Génère un emoji approprié pour le sujet (nom puis catégorie)."""
+    name_lower = (name or "").lower()
+    for keyword, icon in SUBJECT_ICONS.items():
+        if keyword in name_lower:
+            return icon
+
+    category_lower = (category or "").lower()
+    for keyword, icon in CATEGORY_ICONS.items():
+        if keyword in category_lower:
+            return icon
+
+    return "📚"  # Default icon
+
+
+def difficulty_label(rating: Optional[float]) -> str:
+    """Convertit difficulty_rating (1-5) en difficulty_level."""
+    if not rating:
+        return "intermediate"
+    if rating <= 2.0:
+        return "beginner"
+    elif rating <= 3.5:
+        return "intermediate"
+    return "advanced"
+
+
+class CatalogSnapshot:
+    """Vue figée du catalogue. Les dicts sont partagés : ne pas les modifier."""
+
+    __slots__ = ("version", "loaded_at", "etag", "subjects", "cards", "by_id", "by_name", "ids")
+
+    def __init__(self, version: int, subjects: List[Dict[str, Any]], cards: List[Dict[str, Any]]):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.subjects = subjects            # Subject.to_dict(), triés par nom
+        self.cards = cards                  # format SubjectAgent (icône, niveau)
+        self.by_id = {s["id"]: s for s in subjects}
+        self.by_name = {s["name"]: s for s in subjects}
+        self.ids = frozenset(self.by_id)
+        payload = json.dumps(subjects, sort_keys=True, default=str).encode("utf-8")
+        self.etag = hashlib.sha1(payload).hexdigest()[:16]
+
+    def split_by_favorites(self, favorite_ids) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Sépare (favoris, verrouillés) avec un test d'appartenance O(1)."""
+        favorites = set(favorite_ids or ())
+        available, locked = [], []
+        for subject in self.subjects:
+            (available if subject["id"] in favorites else locked).append(subject)
+        return available, locked
+
+
+class SubjectCatalog:
+    """Catalogue des sujets en mémoire, rechargé quand sa version change."""
+
+    def __init__(self, ttl_seconds: float = SUBJECT_CATALOG_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        """À appeler après toute écriture sur la table subjects."""
+        with self._lock:
+            self._version += 1
+        logger.debug("Subject catalog invalidated (version %s)", self._version)
+
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - snapshot.loaded_at < self.ttl_seconds
+        )
+
+    def category_of(self, subject_name: Optional[str], default: str = "General") -> str:
+        """Catégorie d'un sujet d'après le snapshot courant, sans accès base."""
+        snapshot = self._snapshot
+        subject = snapshot.by_name.get(subject_name) if snapshot and subject_name else None
+        return (subject or {}).get("category") or default
+
+    def get(self, db) -> CatalogSnapshot:
+        """Retourne le snapshot courant, en rechargeant la table si nécessaire."""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            snapshot = self._load(db, self._version)
+            self._snapshot = snapshot
+            return snapshot
+
+    def _load(self, db, version: int) -> CatalogSnapshot:
+        from backend.models.subject import Subject
+
+        rows = db.query(Subject).order_by(Subject.name).all()
+        subjects = [row.to_dict() for row in rows]
+        cards = [
+            {
+                "id": row.id,
+                "name": row.name,
+                "category": row.category or "General",
+                "description": row.summary or f"Learn {row.name} concepts and skills",
+                "icon": subject_icon(row.name, row.category),
+                "difficulty_level": difficulty_label(row.difficulty_rating),
+                "estimated_duration_hours": row.estimated_duration_hours or 10,
+                "difficulty_rating": row.difficulty_rating or 3.0
+            }
+            for row in rows
+        ]
+        logger.debug("Subject catalog loaded: %s subjects (version %s)", len(rows), version)
+        return CatalogSnapshot(version, subjects, cards)
+
+
+subject_catalog = SubjectCatalog()
@@ -0,0 +1,211 @@
+"""
+Similarité textuelle au niveau des tokens, linéaire en longueur de réponse.
+
+Remplace difflib.SequenceMatcher (quadratique sur les caractères) et les
+recherches de mots-clés par sous-chaîne répétées :
+- normalisation : minuscules, tokens alphanumériques, racinisation légère
+  (suffixes anglais courants), mise en cache par mot
+- similarité : cosinus de vecteurs TF (log) sur unigrammes + bigrammes, mots
+  vides exclus ; le vecteur de la réponse modèle est précalculé par question.
+  Ce cosinus ignore l'ordre des mots : la détection des réponses recopiées
+  s'appuie en plus sur le Jaccard des trigrammes de mots (non racinisés, dans
+  l'ordre), qui distingue « not reassigned » de « reassigned »
+- mots-clés : automate Aho–Corasick sur les séquences de tokens racinisés,
+  une seule passe sur la réponse quel que soit le nombre de mots-clés
+"""
+
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CONTRACTED_NOT_RE = re.compile(r"n't\b")
+SHINGLE_SIZE = 3
+
+# Les négations ne sont jamais des mots vides : elles inversent le sens d'une réponse
+NEGATIONS = frozenset({"not", "no", "nor", "never", "none", "cannot"})
+
+STOPWORDS = frozenset("""
+a an the and or but if then else of to in on at by for with from as is are was were be been
+being it its this that these those there here which who whom what when where how why i you he
+she we they me him her us them my your his our their so than too very can could should
+would will shall may might must do does did done has have had having into onto over under about
+also just only such each any all some more most other own same
+""".split())
+
+# (suffixe, remplacement), du plus long au plus court
+_SUFFIXES = (
+    ("ational", "at"), ("ization", "iz"), ("fulness", "ful"), ("ousness", "ous"),
+    ("iveness", "iv"), ("ations", "at"), ("ation", "at"), ("ments", ""), ("ment", ""),
+    ("ness", ""), ("ings", ""), ("ing", ""), ("ies", "y"), ("ied", "y"), ("ers", ""),
+    ("er", ""), ("ed", ""), ("ly", ""), ("es", ""), ("s", ""),
+)
+
+
+@lru_cache(maxsize=50000)
+def stem(word: str) -> str:
+    """
+    Racinisation légère : remplace le suffixe le plus long en gardant >= 3
+    lettres, puis retire un 'e' final (iterate / iterating / iteration -> iterat).
+    """
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)] + replacement
+            break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def words(text: str) -> List[str]:
+    """Mots en minuscules, non racinisés ; « isn't » donne « is not »."""
+    return _TOKEN_RE.findall(_CONTRACTED_NOT_RE.sub(" not", (text or "").lower()))
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens racinisés (mots vides conservés, pour les mots-clés multi-mots)."""
+    return [stem(token) for token in words(text)]
+
+
+def shingles(tokens: Sequence[str], size: int = SHINGLE_SIZE) -> frozenset:
+    """n-grammes de mots consécutifs : sensibles à l'ordre et aux mots insérés."""
+    if len(tokens) < size:
+        return frozenset([tuple(tokens)]) if tokens else frozenset()
+    return frozenset(tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+
+
+def shingle_jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def term_vector(tokens: Sequence[str]) -> Tuple[Dict[str, float], float]:
+    """Vecteur TF log (unigrammes + bigrammes hors mots vides) et sa norme."""
+    content = [t for t in tokens if t not in STOPWORDS]
+    counts = Counter(content)
+    counts.update(f"{a} {b}" for a, b in zip(content, content[1:]))
+    vector = {term: 1.0 + math.log(count) for term, count in counts.items()}
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return vector, norm
+
+
+def cosine(a: Tuple[Dict[str, float], float], b: Tuple[Dict[str, float], float]) -> float:
+    (va, na), (vb, nb) = a, b
+    if not na or not nb:
+        return 0.0
+    if len(va) > len(vb):
+        va, vb = vb, va
+    return sum(w * vb.get(term, 0.0) for term, w in va.items()) / (na * nb)
+
+
+class KeywordMatcher:
+    """Automate Aho–Corasick sur séquences de tokens (mots-clés multi-mots)."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[set] = [set()]
+        for index, keyword in enumerate(self.keywords):
+            self._add(tokenize(keyword), index)
+        self._build()
+
+    def _add(self, tokens: List[str], index: int):
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            nxt = self._goto[node].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            node = nxt
+        self._out[node].add(index)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                self._out[child] |= self._out[self._fail[child]]
+
+    def find(self, tokens: Iterable[str]) -> set:
+        """Indices des mots-clés présents dans la séquence de tokens."""
+        found, node = set(), 0
+        for token in tokens:
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            if self._out[node]:
+                found |= self._out[node]
+        return found
+
+
+class QuestionProfile:
+    """Données précalculées d'une question : vecteur de la réponse modèle et mots-clés."""
+
+    __slots__ = ("sample_vector", "sample_shingles", "sample_negations", "matcher")
+
+    def __init__(self, sample_answer: str, keywords: Sequence[str]):
+        sample_words = words(sample_answer)
+        self.sample_vector = term_vector(tokenize(sample_answer))
+        self.sample_shingles = shingles(sample_words)
+        self.sample_negations = sum(1 for w in sample_words if w in NEGATIONS)
+        self.matcher = KeywordMatcher(keywords)
+
+    def compare(self, answer: str) -> Dict[str, object]:
+        """
+        Une passe sur la réponse : similarité (cosinus, sans ordre), recouvrement
+        ordonné avec la réponse modèle (order_similarity), nombre de négations
+        différent de celui de la réponse modèle (negation_mismatch : sens
+        possiblement inversé) et mots-clés trouvés / manquants.
+        """
+        raw = words(answer)
+        tokens = [stem(token) for token in raw]
+        found = self.matcher.find(tokens)
+        keywords = self.matcher.keywords
+        return {
+            "similarity": cosine(term_vector(tokens), self.sample_vector),
+            "order_similarity": shingle_jaccard(shingles(raw), self.sample_shingles),
+            "negation_mismatch": sum(1 for w in raw if w in NEGATIONS) != self.sample_negations,
+            "keywords_found": [kw for i, kw in enumerate(keywords) if i in found],
+            "missing_keywords": [kw for i, kw in enumerate(keywords) if i not in found],
+        }
+
+
+class ProfileCache:
+    """Profils de questions en LRU, indexés par (réponse modèle, mots-clés)."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[tuple, QuestionProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sample_answer: str, keywords: Sequence[str]) -> QuestionProfile:
+        key = (sample_answer or "", tuple(keywords or ()))
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None:
+                self._profiles.move_to_end(key)
+                return profile
+        profile = QuestionProfile(*key)
+        with self._lock:
+            self._profiles[key] = profile
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile
+
+
+question_profiles = ProfileCache()
@@ -0,0 +1,86 @@
+"""
+Contrôle du démarrage et du préchauffage (warm-up) des composants lourds.
+
+Modes de démarrage (variable d'environnement CLEO_STARTUP_MODE) :
+- eager      : l'orchestrateur est construit et préchauffé pendant le startup,
+               le serveur n'accepte du trafic qu'une fois tout chaud.
+- background : construction + warm-up dans un thread (comportement historique).
+- lazy       : rien n'est chargé au démarrage, la première requête déclenche l'init.
+"""
+import os
+import threading
+import time
+import logging
+from typing import Dict, Any, Iterable, Optional
+
+logger = logging.getLogger("cleo.warmup")
+
+STARTUP_MODES = ("eager", "background", "lazy")
+DEFAULT_STARTUP_MODE = "background"
+
+# Texte factice utilisé pour l'encode / la query de préchauffage
+WARMUP_TEXT = "warm-up query for the CLEO retrieval pipeline"
+
+# Composants dont l'état chaud est exigé par /ready
+REQUIRED_COMPONENTS = ("embedder", "vector_store", "orchestrator")
+
+
+def get_startup_mode() -> str:
+    """Lit CLEO_STARTUP_MODE, retombe sur 'background' si la valeur est inconnue."""
+    mode = os.getenv("CLEO_STARTUP_MODE", DEFAULT_STARTUP_MODE).strip().lower()
+    if mode not in STARTUP_MODES:
+        logger.warning("Unknown CLEO_STARTUP_MODE=%s, using %s", mode, DEFAULT_STARTUP_MODE)
+        return DEFAULT_STARTUP_MODE
+    return mode
+
+
+class WarmupTracker:
+    """
+    Suit l'état de chaque composant : chargé, préchauffé, durée et erreur éventuelle.
+    Thread-safe : mis à jour par le thread d'init, lu par les endpoints de santé.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict[str, Any]] = {}
+
+    def mark(self, name: str, warm: bool, seconds: Optional[float] = None, error: Optional[str] = None):
+        with self._lock:
+            self._components[name] = {
+                "warm": warm,
+                "seconds": round(seconds, 3) if seconds is not None else None,
+                "error": error,
+                "updated_at": time.time(),
+            }
+
+    def is_warm(self, name: str) -> bool:
+        with self._lock:
+            return bool(self._components.get(name, {}).get("warm"))
+
+    def all_warm(self, names: Iterable[str] = REQUIRED_COMPONENTS) -> bool:
+        return all(self.is_warm(n) for n in names)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(info) for name, info in self._components.items()}
+
+    def reset(self):
+        with self._lock:
+            self._components.clear()
+
+
+def warm_rag(rag, tracker: WarmupTracker) -> bool:
+    """
+    Préchauffe le RAG (encode + query factices) et enregistre l'état de
+    l'embedder et du vector store. Retourne True si tout est chaud.
+    """
+    try:
+        timings = rag.warmup(WARMUP_TEXT)
+        tracker.mark("embedder", True, timings.get("embedder"))
+        tracker.mark("vector_store", True, timings.get("vector_store"))
+        return True
+    except Exception as e:
+        logger.exception("RAG warm-up failed: %s", e)
+        tracker.mark("embedder", rag.embedding_model is not None, error=str(e))
+        tracker.mark("vector_store", False, error=str(e))
+        return False
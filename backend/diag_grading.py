@@ -0,0 +1,78 @@
+"""
+Contrôle de non-régression de la correction locale des réponses ouvertes.
+
+Chaque cas rejoue LocalAnswerScorer.score (similarité lexicale, sans modèle
+d'embeddings ni IA) et vérifie l'issue attendue :
+- "escalate" : la réponse ne doit pas être tranchée localement (bande incertaine
+  ou score sous le seuil de réussite) ; réponses fausses qui citent les mots-clés
+- "pass" : bonne réponse reformulée, validée localement sans appel IA
+
+Usage:
+    python -m backend.diag_grading            # rapport, code de sortie 1 si un cas échoue
+    python -m backend.diag_grading --verbose  # + composantes du score
+"""
+
+import argparse
+import sys
+
+from backend.core.answer_scorer import PASS_THRESHOLD, LocalAnswerScorer
+
+VARIABLES = {
+    "keywords": ["reference", "object"],
+    "sample_answer": "Variables in Python are references to objects and can be reassigned",
+    "min_words": 8,
+}
+TUPLES = {
+    "keywords": ["tuple", "immutable", "ordered"],
+    "sample_answer": "A tuple is an ordered collection that is immutable: once created its elements "
+                     "cannot be changed, unlike a list.",
+    "min_words": 10,
+}
+
+# (nom, question, réponse, issue attendue)
+REGRESSION_CASES = [
+    ("negated answer", VARIABLES,
+     "Variables in Python are not references to objects and cannot be reassigned.", "escalate"),
+    ("keyword stuffing", VARIABLES,
+     "reference object reference object reference object stuff things", "escalate"),
+    ("contradiction of the sample", TUPLES,
+     "A tuple is not immutable, so its elements can be changed after creation, like a list.", "escalate"),
+    ("paraphrase", TUPLES,
+     "A tuple is an ordered, immutable collection; after creation you cannot change its elements, "
+     "unlike lists.", "pass"),
+]
+
+
+def outcome(result) -> str:
+    if result["uncertain"] or result["final_score"] < PASS_THRESHOLD:
+        return "escalate"
+    return "pass"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Non-régression de la correction locale des réponses ouvertes")
+    parser.add_argument("--verbose", action="store_true", help="affiche les composantes du score")
+    args = parser.parse_args(argv)
+
+    scorer = LocalAnswerScorer()
+    scorer._model_unavailable = True   # similarité lexicale : résultat reproductible
+
+    failures = 0
+    for name, question, answer, expected in REGRESSION_CASES:
+        result = scorer.score({**question, "question_type": "open_ended"}, answer)
+        got = outcome(result)
+        ok = got == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}: expected {expected}, got {got} "
+              f"(score={result['final_score']:.2f}, uncertain={result['uncertain']})")
+        if args.verbose:
+            print(f"   keywords={result['keyword_score']:.2f} length={result['length_score']:.2f} "
+                  f"similarity={result['similarity']:.2f} shortcut={result['shortcut']}")
+
+    print("-" * 60)
+    print(f"{len(REGRESSION_CASES) - failures}/{len(REGRESSION_CASES)} cases OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
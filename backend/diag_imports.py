@@ -1,8 +1,24 @@
+"""
+Diagnostic des imports du backend.
+
+Usage:
+    python -m backend.diag_imports                      # temps d'import des modules principaux
+    python -m backend.diag_imports --importtime         # rapport détaillé (python -X importtime)
+    python -m backend.diag_imports --importtime --top 30 --budget 3.0
+"""
+
+import argparse
 import importlib, time, sys, traceback, os
+import subprocess
+
+DEFAULT_MODULES = [
+    "backend.core.rag",
+    "backend.core.emotion",
+    "backend.core.groq",
+    "backend.core.agents",
+    "backend.app",
+]
 
-print("cwd:", os.getcwd())
-print("Python:", sys.executable)
-print()
 
 def try_import(name):
     t0 = time.time()
@@ -16,13 +32,68 @@ def try_import(name):
         traceback.print_exc()
     print("-" * 60)
 
-modules = [
-    "backend.core.rag",
-    "backend.core.emotion",
-    "backend.core.groq",
-    "backend.core.agents",
-    "backend.app",
-]
 
-for mod in modules:
-    try_import(mod)
\ No newline at end of file
+def importtime_report(module: str, top: int = 20):
+    """
+    Importe `module` dans un interpréteur neuf avec -X importtime et retourne
+    (total_secondes, [(cumulative_us, self_us, package), ...] trié par cumul).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit(f"Import of {module} failed (exit {proc.returncode})")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, package = line[len("import time:"):].split("|", 2)
+            rows.append((int(cumulative_us), int(self_us), package.rstrip()))
+        except ValueError:
+            continue
+
+    # Le total = cumul des imports de premier niveau (indentation minimale)
+    top_level = [r for r in rows if not r[2].startswith("  ")]
+    total = sum(r[0] for r in top_level) / 1e6
+    rows.sort(reverse=True)
+    return total, rows[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diagnostic du temps d'import du backend")
+    parser.add_argument("--importtime", action="store_true", help="rapport détaillé via python -X importtime")
+    parser.add_argument("--module", default="backend.app", help="module à profiler (défaut: backend.app)")
+    parser.add_argument("--top", type=int, default=20, help="nombre d'imports les plus coûteux à afficher")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="budget en secondes ; code de sortie 1 si dépassé")
+    args = parser.parse_args(argv)
+
+    print("cwd:", os.getcwd())
+    print("Python:", sys.executable)
+    print()
+
+    if not args.importtime:
+        for mod in DEFAULT_MODULES:
+            try_import(mod)
+        return 0
+
+    total, rows = importtime_report(args.module, args.top)
+    print(f"Import of {args.module}: {total:.3f}s")
+    print(f"{'cumulative':>12} {'self':>10}  package")
+    for cumulative_us, self_us, package in rows:
+        print(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {package}")
+
+    if args.budget is not None and total > args.budget:
+        print(f"\n❌ Startup budget exceeded: {total:.3f}s > {args.budget:.3f}s")
+        return 1
+    if args.budget is not None:
+        print(f"\n✅ Within startup budget ({total:.3f}s <= {args.budget:.3f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
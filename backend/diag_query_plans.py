@@ -0,0 +1,194 @@
+"""
+Audit des plans d'exécution SQLite des requêtes chaudes de l'application.
+
+Chaque entrée du catalogue reproduit une requête réelle (route ou agent) avec
+le même ORM : le SQL est donc régénéré à partir des modèles à chaque exécution.
+On lance EXPLAIN QUERY PLAN et on signale :
+- FULL SCAN : "SCAN <table>" sans index (parcours complet de la table)
+- TEMP SORT : "USE TEMP B-TREE" (tri en mémoire faute d'index adapté)
+
+Usage:
+    python -m backend.diag_query_plans            # rapport
+    python -m backend.diag_query_plans --verbose  # + plan complet de chaque requête
+    python -m backend.diag_query_plans --strict   # code de sortie 1 si FULL SCAN
+
+Après avoir ajouté un index dans un modèle : python migrate_indexes.py, puis relancer.
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, tuple_
+
+from backend.models.database import SessionLocal, engine
+from backend.models.answer import Answer
+from backend.models.emotion_log import EmotionLog
+from backend.models.learner_progress import LearnerProgress
+from backend.models.llm_usage import LLMUsage
+from backend.models.question import Question
+from backend.models.review_item import ReviewItem
+from backend.models.quiz_session import QuizSession
+from backend.models.subject import Subject
+from backend.models.subscription import Subscription
+from backend.models.support_intervention import SupportIntervention
+from backend.models.user import User
+
+LEARNER = "user_1"
+NOW = datetime(2025, 1, 1)
+
+
+def _avg_score(db):
+    return db.query(
+        func.avg(case(
+            (QuizSession.total_questions > 0,
+             (QuizSession.correct_answers * 100.0) / QuizSession.total_questions),
+            else_=0
+        ))
+    )
+
+
+# (nom, origine, fabrique de requête ORM)
+QUERY_CATALOGUE = [
+    ("auth: user by id", "core/dependencies.authenticate_token",
+     lambda db: db.query(User).filter(User.id == 1)),
+    ("subscription by user", "core/dependencies.get_request_subscription",
+     lambda db: db.query(Subscription).filter(Subscription.user_id == 1)),
+    ("progress by learner+subject", "api/quiz.generate, api/quiz.complete",
+     lambda db: db.query(LearnerProgress).filter(
+         LearnerProgress.learner_id == LEARNER, LearnerProgress.subject_id == 1)),
+    ("session by session_id", "api/quiz.submit_answer, complete",
+     lambda db: db.query(QuizSession).filter(QuizSession.session_id == "quiz_x")),
+    ("question by question_id", "api/quiz.generate, submit_answer",
+     lambda db: db.query(Question).filter(Question.question_id == "q_x")),
+    ("question index refresh", "core/question_index.QuestionIndex._scope",
+     lambda db: db.query(Question.id, Question.question_id, Question.minhash).filter(
+         Question.subject_id == 1, Question.question_type == "mcq", Question.id > 0
+     ).order_by(Question.id)),
+    ("answers count by question", "api/quiz.submit_answer",
+     lambda db: db.query(Answer).filter(Answer.question_id == 1, Answer.is_correct == True)),
+    ("recent answers of session", "api/quiz.complete, api/emotion_support.check_intervention",
+     lambda db: db.query(Answer).filter(
+         Answer.learner_id == LEARNER, Answer.quiz_session_id == 1
+     ).order_by(Answer.answered_at.desc()).limit(5)),
+    ("quiz history", "api/quiz.get_quiz_history",
+     lambda db: db.query(QuizSession).filter(
+         QuizSession.learner_id == LEARNER
+     ).order_by(QuizSession.started_at.desc()).limit(10)),
+    ("dashboard history page", "api/dashboard.get_quiz_history",
+     lambda db: db.query(QuizSession).filter(
+         QuizSession.learner_id == LEARNER,
+         QuizSession.completed_at >= NOW - timedelta(days=7),
+         tuple_(QuizSession.completed_at, QuizSession.id) < (NOW, 100)
+     ).order_by(QuizSession.completed_at.desc(), QuizSession.id.desc()).limit(21)),
+    ("completed sessions by status", "agents/admin_agent.get_users_list",
+     lambda db: db.query(QuizSession).filter(
+         QuizSession.learner_id == LEARNER, QuizSession.status == "completed"
+     ).order_by(QuizSession.started_at.desc())),
+    ("subject sessions by status", "agents/subject_agent.get_subject_with_progress",
+     lambda db: db.query(QuizSession).filter(
+         QuizSession.learner_id == LEARNER,
+         QuizSession.subject_name == "Python",
+         QuizSession.status == "completed")),
+    ("subject average score", "agents/subject_agent.get_subject_with_progress",
+     lambda db: _avg_score(db).filter(
+         QuizSession.learner_id == LEARNER,
+         QuizSession.subject_name == "Python",
+         QuizSession.status == "completed",
+         QuizSession.total_questions > 0)),
+    ("analytics answers", "agents/analytics_agent.generate_learner_analytics",
+     lambda db: db.query(Answer).filter(Answer.learner_id == LEARNER)),
+    ("recent emotions", "api/emotion_support.check_intervention",
+     lambda db: db.query(EmotionLog).filter(
+         EmotionLog.learner_id == LEARNER,
+         EmotionLog.detected_at >= NOW - timedelta(minutes=5)
+     ).order_by(EmotionLog.detected_at.desc()).limit(10)),
+    ("emotion history page", "api/emotion_support.get_emotion_history",
+     lambda db: db.query(EmotionLog).filter(
+         EmotionLog.learner_id == LEARNER,
+         EmotionLog.detected_at >= NOW - timedelta(hours=24)
+     ).order_by(EmotionLog.detected_at.asc(), EmotionLog.id.asc()).limit(501)),
+    ("interventions history", "api/emotion_support.get_interventions_history",
+     lambda db: db.query(SupportIntervention).filter(
+         SupportIntervention.learner_id == LEARNER
+     ).order_by(SupportIntervention.triggered_at.desc()).limit(10)),
+    ("question bank candidates", "api/quiz._select_from_bank",
+     lambda db: db.query(Question).filter(
+         Question.subject_id == 1, Question.topic == "Loops",
+         Question.question_type == "mcq", Question.bloom_level == 2,
+         ~Question.id.in_(db.query(Answer.question_id).filter(Answer.learner_id == LEARNER)))),
+    ("due reviews", "core/agents.MemoryAgent.due_items",
+     lambda db: db.query(ReviewItem).filter(
+         ReviewItem.learner_id == LEARNER, ReviewItem.due_at <= NOW
+     ).order_by(ReviewItem.due_at).limit(20)),
+    ("subject catalog", "core/subject_catalog.SubjectCatalog._load",
+     lambda db: db.query(Subject).order_by(Subject.name)),
+    ("llm tokens this month", "core/llm_usage.LLMUsageRecorder.load_month_tokens",
+     lambda db: db.query(func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens)).filter(
+         LLMUsage.user_id == LEARNER, LLMUsage.period_start >= NOW.replace(day=1))),
+]
+
+
+def explain(conn, query):
+    """Retourne les lignes 'detail' de EXPLAIN QUERY PLAN pour une requête ORM."""
+    compiled = query.statement.compile(dialect=engine.dialect)
+    params = compiled.construct_params()
+    positional = tuple(params[name] for name in compiled.positiontup)
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", positional).fetchall()
+    return [row[-1] for row in rows]
+
+
+def classify(plan):
+    """Retourne la liste des problèmes détectés dans un plan."""
+    issues = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            issues.append(f"FULL SCAN: {detail}")
+        elif "USE TEMP B-TREE" in detail:
+            issues.append(f"TEMP SORT: {detail}")
+    return issues
+
+
+# Requêtes qui parcourent volontairement toute la table (petites tables de référence)
+EXPECTED_FULL_SCANS = {"subject catalog"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit EXPLAIN QUERY PLAN des requêtes chaudes")
+    parser.add_argument("--verbose", action="store_true", help="affiche le plan complet")
+    parser.add_argument("--strict", action="store_true", help="code de sortie 1 si une table est parcourue entièrement")
+    args = parser.parse_args(argv)
+
+    print("Database:", engine.url)
+    print()
+
+    full_scans = 0
+    db = SessionLocal()
+    try:
+        with engine.connect() as conn:
+            for name, origin, build in QUERY_CATALOGUE:
+                plan = explain(conn, build(db))
+                issues = classify(plan)
+                if name in EXPECTED_FULL_SCANS:
+                    issues = [i for i in issues if not i.startswith("FULL SCAN")]
+                status = "❌" if any(i.startswith("FULL SCAN") for i in issues) else ("⚠️" if issues else "✅")
+                full_scans += status == "❌"
+
+                print(f"{status} {name}  [{origin}]")
+                for issue in issues:
+                    print(f"     {issue}")
+                if args.verbose:
+                    for detail in plan:
+                        print(f"     | {detail}")
+    finally:
+        db.close()
+
+    print()
+    print(f"{len(QUERY_CATALOGUE)} queries audited, {full_scans} with full table scans")
+    if full_scans:
+        print("➡️  Declare the missing index in the model, then run: python migrate_indexes.py")
+    return 1 if args.strict and full_scans else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Middleware ASGI de logs d'accès structurés.
+
+Remplace l'ancien log_requests qui bufferisait tout le body : ici rien n'est lu
+en avance. On compte les octets au fil du flux (receive/send), on mesure la
+latence et on écrit une ligne JSON par requête via un QueueHandler.
+La capture du body est optionnelle, échantillonnée et tronquée.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+from typing import Iterable, Optional
+
+from backend.core.logging_config import attach_queue_handler
+
+logger = logging.getLogger("cleo.access")
+
+ACCESS_LOG_BODY_SAMPLE_RATE = float(os.getenv("CLEO_ACCESS_LOG_BODY_SAMPLE_RATE", "0.0"))
+ACCESS_LOG_BODY_MAX_BYTES = int(os.getenv("CLEO_ACCESS_LOG_BODY_MAX_BYTES", "2048"))
+
+# Headers jamais écrits en clair dans les logs
+REDACTED_HEADERS = frozenset({
+    "authorization",
+    "cookie",
+    "set-cookie",
+    "x-api-key",
+    "stripe-signature",
+    "proxy-authorization",
+})
+
+
+def redact_headers(raw_headers, redacted: Iterable[str] = REDACTED_HEADERS) -> dict:
+    """Convertit les headers ASGI (liste de bytes) en dict avec valeurs sensibles masquées."""
+    redacted = set(redacted)
+    headers = {}
+    for key, value in raw_headers:
+        name = key.decode("latin-1").lower()
+        headers[name] = "[REDACTED]" if name in redacted else value.decode("latin-1")
+    return headers
+
+
+class AccessLogMiddleware:
+    """
+    Logge méthode, chemin, statut, latence et octets reçus/envoyés sans lire le body.
+
+    Args:
+        path_prefixes: seuls les chemins commençant par ces préfixes sont loggés
+        body_sample_rate: proportion (0-1) des requêtes dont le body est capturé
+        body_max_bytes: taille max capturée du body (le reste est ignoré)
+    """
+
+    def __init__(
+        self,
+        app,
+        path_prefixes: Iterable[str] = ("/api",),
+        body_sample_rate: float = ACCESS_LOG_BODY_SAMPLE_RATE,
+        body_max_bytes: int = ACCESS_LOG_BODY_MAX_BYTES,
+        redacted_headers: Iterable[str] = REDACTED_HEADERS,
+    ):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+        self.body_sample_rate = body_sample_rate
+        self.body_max_bytes = body_max_bytes
+        self.redacted_headers = frozenset(h.lower() for h in redacted_headers)
+        attach_queue_handler(logger.name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        capture = self.body_sample_rate > 0 and random.random() < self.body_sample_rate
+        stats = {"status": 500, "req_bytes": 0, "resp_bytes": 0}
+        captured = bytearray()
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                stats["req_bytes"] += len(chunk)
+                if capture and len(captured) < self.body_max_bytes:
+                    captured.extend(chunk[: self.body_max_bytes - len(captured)])
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                stats["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                stats["resp_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self._log(scope, stats, time.perf_counter() - start, captured if capture else None)
+
+    def _log(self, scope, stats: dict, latency: float, body: Optional[bytearray]):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        client = scope.get("client")
+        record = {
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status": stats["status"],
+            "latency_ms": round(latency * 1000, 2),
+            "req_bytes": stats["req_bytes"],
+            "resp_bytes": stats["resp_bytes"],
+            "client": client[0] if client else None,
+        }
+        if body is not None:
+            record["headers"] = redact_headers(scope.get("headers", []), self.redacted_headers)
+            record["body"] = bytes(body).decode("utf-8", errors="replace")
+            record["body_truncated"] = stats["req_bytes"] > len(body)
+        logger.info(json.dumps(record, ensure_ascii=False))
@@ -2,20 +2,22 @@
 Middleware pour vérifier les quotas.
 """
 
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from sqlalchemy.orm import Session
 import logging
 
 try:
     from backend.models.database import get_db
     from backend.models.user import User
-    from backend.models.subscription import Subscription, SubscriptionTier, SubscriptionStatus
+    from backend.models.subscription import Subscription, SubscriptionTier
     from backend.api.auth import get_current_active_user
+    from backend.core.dependencies import get_request_subscription
 except ImportError:
     from models.database import get_db
     from models.user import User
-    from models.subscription import Subscription, SubscriptionTier, SubscriptionStatus
+    from models.subscription import Subscription, SubscriptionTier
     from api.auth import get_current_active_user
+    from core.dependencies import get_request_subscription
 
 logger = logging.getLogger("backend.app")
 
@@ -34,74 +36,75 @@ class QuotaExceeded(HTTPException):
         super().__init__(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
 
 def check_quiz_quota(
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Vérifie si l'utilisateur peut démarrer un nouveau quiz."""
-    logger.info(f"🔍 Checking quiz quota for: {current_user.username}")
+    """
+    Refus anticipé (lecture seule) si le quota quiz est déjà atteint, avant tout
+    appel LLM ; la consommation atomique se fait à la création de la session
+    (consume_quiz_quota).
+    """
+    logger.debug("Checking quiz quota for: %s", current_user.username)
     
-    subscription = db.query(Subscription).filter(
-        Subscription.user_id == current_user.id
-    ).first()
-    
-    if not subscription:
-        logger.warning(f"⚠️ No subscription found for {current_user.username}")
-        subscription = Subscription(
-            user_id=current_user.id,
-            tier=SubscriptionTier.FREE,
-            status=SubscriptionStatus.ACTIVE
-        )
-        db.add(subscription)
-        db.commit()
-        db.refresh(subscription)
+    # ⭐ Abonnement partagé avec le reste de la requête (une seule requête SQL)
+    subscription = get_request_subscription(request, current_user, db)
     
+    # ⭐ Lecture seule : plus de remise à zéro (écriture) pendant la vérification
     if not subscription.check_quota("quiz"):
-        limits = subscription.get_limits()
-        current_usage = subscription.quizzes_this_month
-        limit = limits["quizzes_per_month"]
+        current_usage = subscription.usage("quizzes")
+        limit = subscription.get_limits()["quizzes_per_month"]
         
         logger.warning(f"❌ Quota exceeded for {current_user.username}: {current_usage}/{limit}")
-        
-        tier_order = [
-            SubscriptionTier.FREE,
-            SubscriptionTier.BRONZE,
-            SubscriptionTier.SILVER,
-            SubscriptionTier.GOLD,
-            SubscriptionTier.PLATINUM
-        ]
-        
-        current_tier_index = tier_order.index(subscription.tier)
-        if current_tier_index < len(tier_order) - 1:
-            suggested_tier = tier_order[current_tier_index + 1].value
-        else:
-            suggested_tier = "platinum"
-        
-        raise QuotaExceeded("quizzes", current_usage, limit, suggested_tier)
+        raise QuotaExceeded("quizzes", current_usage, limit, _suggested_tier(subscription))
     
-    logger.info(f"✅ Quota check passed for {current_user.username}")
+    logger.debug("Quota check passed for %s", current_user.username)
     return subscription
 
-def increment_quiz_usage(subscription: Subscription, db: Session):
-    """Incrémente l'usage des quiz."""
-    logger.info(f"📈 Incrementing quiz usage for user_id: {subscription.user_id}")
-    logger.info(f"   Before: {subscription.quizzes_this_month}")
-    
-    # ⭐ SIMPLE INCREMENT (pas de JSON, pas de flag_modified)
-    subscription.increment_usage("quizzes")
+def _suggested_tier(subscription: Subscription) -> str:
+    tier_order = [
+        SubscriptionTier.FREE,
+        SubscriptionTier.BRONZE,
+        SubscriptionTier.SILVER,
+        SubscriptionTier.GOLD,
+        SubscriptionTier.PLATINUM
+    ]
     
-    db.commit()
-    db.refresh(subscription)
-    
-    logger.info(f"   After: {subscription.quizzes_this_month}")
-    logger.info(f"✅ Quiz usage updated: {subscription.quizzes_this_month}/{subscription.get_limits()['quizzes_per_month']}")
+    current_tier_index = tier_order.index(subscription.tier)
+    if current_tier_index < len(tier_order) - 1:
+        return tier_order[current_tier_index + 1].value
+    return "platinum"
 
-def increment_ai_hint_usage(subscription: Subscription, db: Session):
-    """Incrémente l'usage des AI hints."""
-    logger.info(f"📈 Incrementing AI hint usage for user_id: {subscription.user_id}")
+def consume_quiz_quota(subscription: Subscription, db: Session):
+    """
+    Vérifie et consomme un quiz en une seule instruction SQL (seul point de
+    contrôle du quota quiz ; check_quiz_quota n'est qu'un refus anticipé).
+    Ne committe pas : appelé dans la transaction qui crée la session, un quiz
+    n'est compté que si sa session est enregistrée. Lève QuotaExceeded si la
+    limite du tier est atteinte (aucun dépassement concurrent).
+    """
+    used = subscription.consume_usage(db, "quizzes")
     
-    subscription.increment_usage("ai_hints")
+    if used is None:
+        limit = subscription.get_limits()["quizzes_per_month"]
+        logger.warning("❌ Quiz quota exceeded for user_id=%s (limit %s)", subscription.user_id, limit)
+        raise QuotaExceeded("quizzes", subscription.usage("quizzes"), limit, _suggested_tier(subscription))
     
+    logger.debug("Quiz usage for user_id=%s: %s", subscription.user_id, used)
+    return used
+
+def consume_ai_hint_quota(subscription: Subscription, db: Session):
+    """
+    Vérifie et consomme un AI hint en une seule instruction SQL ; lève
+    QuotaExceeded si la limite du tier est atteinte (aucun dépassement concurrent).
+    """
+    used = subscription.consume_usage(db, "ai_hints")
     db.commit()
-    db.refresh(subscription)
     
-    logger.info(f"✅ AI hint usage updated: {subscription.ai_hints_this_month}/{subscription.get_limits()['ai_hints_per_month']}")
\ No newline at end of file
+    if used is None:
+        limit = subscription.get_limits()["ai_hints_per_month"]
+        logger.warning("❌ AI hint quota exceeded for user_id=%s (limit %s)", subscription.user_id, limit)
+        raise QuotaExceeded("AI hints", subscription.usage("ai_hints"), limit, _suggested_tier(subscription))
+    
+    logger.debug("AI hint usage for user_id=%s: %s", subscription.user_id, used)
+    return used
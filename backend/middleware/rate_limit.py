@@ -0,0 +1,154 @@
+"""
+Middleware ASGI de limitation de débit (voir backend/core/rate_limit.py).
+
+Le client est identifié par le JWT (utilisateur) ou, à défaut, par l'adresse
+IP. Le token décodé est laissé dans request.state pour que l'authentification
+ne le décode pas une seconde fois. Le tier d'abonnement vient d'un cache à TTL
+(une requête SQL par utilisateur et par CLEO_RATE_LIMIT_TIER_TTL_SECONDS).
+
+Une requête hors budget reçoit 429 avec Retry-After, sans atteindre la route.
+
+Le middleware pose aussi le contexte de comptabilité LLM (utilisateur, tier,
+route : backend/core/llm_usage.py), même si la limitation est désactivée, et
+refuse (403) les routes LLM d'un utilisateur dont le budget mensuel de tokens
+de son tier est épuisé.
+"""
+
+import logging
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from backend.core.llm_usage import bind_request, llm_usage
+from backend.core.rate_limit import RATE_LIMIT_ENABLED, RateLimiter, tier_cache
+
+logger = logging.getLogger("cleo.rate_limit")
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token and token not in ("undefined", "null"):
+                return token
+    return None
+
+
+class RateLimitMiddleware:
+    """
+    Applique les budgets « api » / « llm » par utilisateur ou IP.
+
+    Args:
+        limiter: RateLimiter (défaut : RATE_LIMIT_REQUESTS / RATE_LIMIT_PERIOD des settings)
+        path_prefixes: seuls les chemins commençant par ces préfixes sont limités
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: Optional[RateLimiter] = None,
+        path_prefixes: Iterable[str] = ("/api",),
+        enabled: bool = RATE_LIMIT_ENABLED,
+    ):
+        self.app = app
+        self.enabled = enabled
+        self.path_prefixes = tuple(path_prefixes)
+        if limiter is None and enabled:
+            from backend.core.config import settings
+            limiter = RateLimiter(settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_PERIOD)
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope.get("method") == "OPTIONS"
+                or not scope["path"].startswith(self.path_prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        client_key, user_id, tier = await self._identify(scope)
+        bind_request(scope, user_id, tier)
+
+        rejected = None
+        if self.enabled:
+            if self.limiter.backend.blocking:
+                rejected = await run_in_threadpool(self.limiter.check, client_key, tier, scope["path"])
+            else:
+                rejected = self.limiter.check(client_key, tier, scope["path"])
+
+        if rejected is None:
+            if user_id is not None and RateLimiter.is_llm_path(scope["path"]):
+                exhausted = await self._llm_budget_exhausted(user_id, tier)
+                if exhausted is not None:
+                    logger.warning("LLM token budget exhausted for user %s (%s/%s tokens, tier %s)",
+                                   user_id, exhausted["used"], exhausted["limit"], tier)
+                    response = JSONResponse(status_code=403, content={"detail": {
+                        "error": "llm_budget_exceeded",
+                        "message": "Monthly AI token budget reached for your plan",
+                        "tokens_used": exhausted["used"],
+                        "tokens_limit": exhausted["limit"],
+                        "current_tier": tier or "free",
+                    }})
+                    await response(scope, receive, send)
+                    return
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = max(1, math.ceil(rejected["retry_after"]))
+        logger.warning("Rate limited %s on %s (%s budget, %s/%ss)", client_key, scope["path"],
+                       rejected["budget"], rejected["limit"], self.limiter.period)
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": {
+                "error": "rate_limited",
+                "budget": rejected["budget"],
+                "message": "Too many requests, please retry later",
+                "retry_after": retry_after,
+            }},
+            headers={
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Limit": str(int(rejected["limit"])),
+                "X-RateLimit-Remaining": "0",
+            },
+        )
+        await response(scope, receive, send)
+
+    async def _llm_budget_exhausted(self, user_id: int, tier: Optional[str]) -> Optional[Dict[str, int]]:
+        """{used, limit} si le budget mensuel de tokens du tier est atteint, sinon None."""
+        limit = llm_usage.budget_for(tier)
+        if limit is None:
+            return None
+        used = llm_usage.month_tokens(user_id)
+        if used is None:
+            try:
+                used = await run_in_threadpool(llm_usage.load_month_tokens, user_id)
+            except Exception as e:
+                logger.warning("LLM token usage lookup failed for user %s: %s", user_id, e)
+                return None
+        return {"used": used, "limit": limit} if used >= limit else None
+
+    async def _identify(self, scope) -> Tuple[str, Optional[int], Optional[str]]:
+        """(clé client, user_id, tier) : utilisateur du JWT, sinon IP (anonyme)."""
+        token = _bearer_token(scope)
+        if token:
+            from backend.core.security import decode_access_token
+
+            payload = decode_access_token(token)
+            if payload is not None and payload.get("type") == "access":
+                scope.setdefault("state", {})["token_payload"] = (token, payload)
+                try:
+                    user_id = int(payload.get("sub"))
+                except (TypeError, ValueError):
+                    user_id = None
+                if user_id is not None:
+                    found, tier = tier_cache.get(user_id)
+                    if not found:
+                        try:
+                            tier = await run_in_threadpool(tier_cache.load, user_id)
+                        except Exception as e:
+                            logger.warning("Tier lookup failed for user %s: %s", user_id, e)
+                            tier = None
+                    return f"u:{user_id}", user_id, tier
+
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}", None, None
@@ -0,0 +1,83 @@
+"""
+Ajoute les colonnes déclarées dans les modèles qui manquent dans la base.
+
+create_all() n'ajoute pas de colonne à une table existante : ce script compare
+les colonnes des modèles à celles présentes dans SQLite et ajoute les
+manquantes (ALTER TABLE ... ADD COLUMN, avec le DEFAULT scalaire du modèle).
+Idempotent, à relancer dès qu'un modèle déclare une nouvelle colonne.
+
+Usage:
+    cd backend
+    python migrate_columns.py            # ajoute les colonnes manquantes
+    python migrate_columns.py --dry-run  # liste seulement
+"""
+
+import argparse
+import sys
+sys.path.insert(0, '.')
+
+from sqlalchemy import inspect, text
+
+import models  # noqa: F401  (enregistre les tables du package)
+import models.subscription  # noqa: F401
+import models.user_preferences  # noqa: F401
+from models.database import Base, engine
+
+
+def missing_columns():
+    """Retourne les (table, colonne) déclarées dans les modèles et absentes de la base."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue  # table créée par init_db() avec toutes ses colonnes
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                missing.append((table, column))
+    return missing
+
+
+def column_ddl(column):
+    """Définition SQL d'une colonne pour ALTER TABLE ADD COLUMN."""
+    ddl = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        ddl += f" DEFAULT {int(default) if isinstance(default, bool) else repr(default)}"
+    return ddl
+
+
+def migrate(dry_run: bool = False):
+    print("🔄 Checking model columns...")
+
+    try:
+        columns = missing_columns()
+        if not columns:
+            print("✅ All model columns already exist")
+            return
+
+        for table, column in columns:
+            print(f"  ➕ {table.name}.{column_ddl(column)}")
+
+        if dry_run:
+            print(f"\n📋 {len(columns)} column(s) would be added")
+            return
+
+        with engine.begin() as conn:
+            for table, column in columns:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl(column)}"))
+
+        print(f"\n✅ {len(columns)} column(s) added")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ajoute les colonnes des modèles manquantes dans la base")
+    parser.add_argument("--dry-run", action="store_true", help="liste les colonnes sans les ajouter")
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run)
@@ -0,0 +1,78 @@
+"""
+Crée les index déclarés dans les modèles qui manquent dans la base.
+
+create_all() n'ajoute pas d'index sur une table existante : ce script compare
+les index des modèles (Index(...) dans __table_args__ et index=True) à ceux
+présents dans SQLite et crée les manquants. Idempotent, à relancer dès qu'un
+modèle déclare un nouvel index.
+
+Usage:
+    cd backend
+    python migrate_indexes.py            # crée les index manquants
+    python migrate_indexes.py --dry-run  # liste seulement
+"""
+
+import argparse
+import sys
+sys.path.insert(0, '.')
+
+from sqlalchemy import inspect, text
+
+import models  # noqa: F401  (enregistre les tables du package)
+import models.subscription  # noqa: F401
+import models.user_preferences  # noqa: F401
+from models.database import Base, engine
+
+
+def missing_indexes():
+    """Retourne les index déclarés dans les modèles et absents de la base."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue  # table créée par init_db() avec tous ses index
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name not in existing:
+                missing.append(index)
+    return missing
+
+
+def migrate(dry_run: bool = False):
+    print("🔄 Checking model indexes...")
+
+    try:
+        indexes = missing_indexes()
+        if not indexes:
+            print("✅ All model indexes already exist")
+            return
+
+        for index in indexes:
+            columns = ", ".join(col.name for col in index.columns)
+            print(f"  ➕ {index.name} ON {index.table.name} ({columns})")
+            if not dry_run:
+                index.create(bind=engine, checkfirst=True)
+
+        if dry_run:
+            print(f"\n📋 {len(indexes)} index(es) would be created")
+            return
+
+        # Mettre à jour les statistiques du planner pour les nouveaux index
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+
+        print(f"\n✅ {len(indexes)} index(es) created")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crée les index manquants déclarés dans les modèles")
+    parser.add_argument("--dry-run", action="store_true", help="liste les index sans les créer")
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run)
@@ -8,6 +8,8 @@ from .answer import Answer
 from .learner_analytics import LearnerAnalytics
 from .emotion_log import EmotionLog
 from .support_intervention import SupportIntervention
+from .review_item import ReviewItem, ReviewQueue
+from .llm_usage import LLMUsage
 from .user import User, UserRole  # ⭐ NOUVEAU
 
 __all__ = [
@@ -16,5 +18,7 @@ __all__ = [
     'Question', 'QuizSession', 'Answer',
     'LearnerAnalytics',
     'EmotionLog', 'SupportIntervention',
+    'ReviewItem', 'ReviewQueue',
+    'LLMUsage',
     'User', 'UserRole'  # ⭐ NOUVEAU
 ]
\ No newline at end of file
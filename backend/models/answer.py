@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, JSON, Float, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -6,12 +6,16 @@ from .database import Base
 
 class Answer(Base):
     __tablename__ = "answers"
+    __table_args__ = (
+        # Dernières réponses d'une session (support, évaluation de fin de quiz)
+        Index("ix_answers_learner_session_answered", "learner_id", "quiz_session_id", "answered_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
     # Références
     quiz_session_id = Column(Integer, ForeignKey("quiz_sessions.id"), nullable=False)
-    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, index=True)
     learner_id = Column(String(100), index=True, nullable=False)
     
     # Réponse de l'apprenant
@@ -34,7 +38,7 @@ class Answer(Base):
     answered_at = Column(DateTime, default=datetime.utcnow)
     
     # Méthode d'évaluation
-    evaluation_method = Column(String(50))  # ai, keyword_matching, exact_match
+    evaluation_method = Column(String(50))  # ai, local_*, exact_match
     confidence = Column(Float)  # Confiance de l'évaluation (0-1)
     
     # Relations
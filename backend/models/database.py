@@ -1,4 +1,5 @@
 import os
+import logging
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -11,11 +12,9 @@ DATABASE_PATH = os.path.join(BACKEND_DIR, "cleo.db")
 DATABASE_PATH_NORMALIZED = DATABASE_PATH.replace("\\", "/")
 DATABASE_URL = f"sqlite:///{DATABASE_PATH_NORMALIZED}"
 
-print(f"🔧 Database configuration:")
-print(f"   File: {__file__}")
-print(f"   Backend dir: {BACKEND_DIR}")
-print(f"   Database path: {DATABASE_PATH}")
-print(f"   Database URL: {DATABASE_URL}")
+# ⭐ Diagnostics en DEBUG (plus de print à l'import)
+logger = logging.getLogger("cleo.database")
+logger.debug("Database configuration: path=%s url=%s", DATABASE_PATH, DATABASE_URL)
 
 engine = create_engine(
     DATABASE_URL,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey, Index
 from datetime import datetime
 from .database import Base
 
@@ -8,6 +8,10 @@ class EmotionLog(Base):
     Log des émotions détectées pendant les sessions d'apprentissage.
     """
     __tablename__ = "emotion_logs"
+    __table_args__ = (
+        # Historique paginé : WHERE learner_id = ? ORDER BY detected_at, id
+        Index("ix_emotion_logs_learner_detected", "learner_id", "detected_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     learner_id = Column(String(100), index=True, nullable=False)
@@ -54,7 +58,19 @@ class EmotionLog(Base):
             "detection_method": self.detection_method
         }
     
+    EMOTIONS = ("happy", "sad", "angry", "fear", "disgust", "surprise", "neutral")
+    
+    @staticmethod
+    def derived_metrics(scores: dict) -> tuple:
+        """(stress_level, confidence_level) à partir d'un dict de scores d'émotions."""
+        happy, sad = scores.get("happy", 0.0), scores.get("sad", 0.0)
+        angry, fear, disgust = scores.get("angry", 0.0), scores.get("fear", 0.0), scores.get("disgust", 0.0)
+        stress = min(1.0, (fear + angry + disgust) / 3)
+        confidence = max(0.0, min(1.0, happy - (sad + fear) / 2))
+        return stress, confidence
+    
     def calculate_derived_metrics(self):
         """Calcule stress et confidence à partir des émotions de base."""
-        self.stress_level = min(1.0, (self.fear + self.angry + self.disgust) / 3)
-        self.confidence_level = max(0.0, min(1.0, self.happy - (self.sad + self.fear) / 2))
\ No newline at end of file
+        self.stress_level, self.confidence_level = self.derived_metrics(
+            {name: getattr(self, name) or 0.0 for name in self.EMOTIONS}
+        )
\ No newline at end of file
@@ -1,16 +1,21 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
 class LearnerProgress(Base):
     __tablename__ = "learner_progress"
+    __table_args__ = (
+        Index("ix_learner_progress_learner_subject", "learner_id", "subject_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     learner_id = Column(String(100), index=True, nullable=False)
     subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
     
     current_bloom_level = Column(Integer, default=1)  # 1-6
+    ability = Column(Float, nullable=True)      # θ IRT (backend/core/irt.py), NULL avant la 1re réponse
+    ability_se = Column(Float, nullable=True)   # erreur standard de θ
     completion_percentage = Column(Float, default=0.0)
     total_time_spent_hours = Column(Float, default=0.0)
     
@@ -29,6 +34,8 @@ class LearnerProgress(Base):
             "learner_id": self.learner_id,
             "subject_id": self.subject_id,
             "current_bloom_level": self.current_bloom_level,
+            "ability": self.ability,
+            "ability_se": self.ability_se,
             "completion_percentage": self.completion_percentage,
             "total_time_spent_hours": self.total_time_spent_hours,
             "completed_modules": self.completed_modules,
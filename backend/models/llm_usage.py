@@ -0,0 +1,47 @@
+"""
+Consommation LLM agrégée (backend/core/llm_usage.py) : une ligne par
+(heure, agent, route, utilisateur, tier, modèle) et par flush ; les totaux
+s'obtiennent par SUM.
+"""
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from datetime import datetime
+from .database import Base
+
+
+class LLMUsage(Base):
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        # Budget mensuel : SUM(tokens) WHERE user_id = ? AND period_start >= début du mois
+        Index("ix_llm_usage_user_period", "user_id", "period_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    period_start = Column(DateTime, nullable=False, index=True)   # heure (UTC) des appels
+    agent = Column(String(50))
+    route = Column(String(200))
+    user_id = Column(Integer, nullable=True)
+    tier = Column(String(20))
+    model = Column(String(100))
+
+    calls = Column(Integer, default=0)
+    errors = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    latency_ms_total = Column(Float, default=0.0)
+    flushed_at = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "period_start": self.period_start.isoformat() if self.period_start else None,
+            "agent": self.agent,
+            "route": self.route,
+            "user_id": self.user_id,
+            "tier": self.tier,
+            "model": self.model,
+            "calls": self.calls,
+            "errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "avg_latency_ms": round(self.latency_ms_total / self.calls, 1) if self.calls else None
+        }
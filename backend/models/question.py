@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, JSON, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -6,9 +6,13 @@ from .database import Base
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        # Assemblage de quiz depuis la banque (api/quiz._select_from_bank)
+        Index("ix_questions_bank", "subject_id", "topic", "question_type", "bloom_level"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    question_id = Column(String(200), unique=True, index=True)  # Identifiant unique
+    question_id = Column(String(200), unique=True, index=True)  # Identifiant unique (q_<hash du contenu>)
     
     # Métadonnées
     subject_id = Column(Integer, ForeignKey("subjects.id"))
@@ -33,6 +37,15 @@ class Question(Base):
     times_used = Column(Integer, default=0)
     avg_success_rate = Column(Float, default=0.0)
     
+    # Signature MinHash du contenu (backend/core/question_index.py), pour les quasi-doublons
+    minhash = Column(JSON, nullable=True)
+    
+    # Paramètres IRT 2PL (backend/core/irt.py) ; NULL tant que non calibrée
+    irt_difficulty = Column(Float, nullable=True)          # b
+    irt_discrimination = Column(Float, default=1.0)        # a
+    irt_responses = Column(Integer, default=0)             # réponses utilisées par la dernière calibration
+    irt_calibrated_at = Column(DateTime, nullable=True)    # filigrane de la calibration incrémentale
+    
     # Relations
     subject = relationship("Subject", backref="questions")
     
@@ -50,5 +63,7 @@ class Question(Base):
             "question_text": self.question_text,
             "question_data": self.question_data,
             "times_used": self.times_used,
-            "avg_success_rate": self.avg_success_rate
+            "avg_success_rate": self.avg_success_rate,
+            "irt_difficulty": self.irt_difficulty,
+            "irt_discrimination": self.irt_discrimination
         }
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -6,6 +6,14 @@ from .database import Base
 
 class QuizSession(Base):
     __tablename__ = "quiz_sessions"
+    __table_args__ = (
+        # Historique paginé : WHERE learner_id = ? ORDER BY completed_at, id
+        Index("ix_quiz_sessions_learner_completed", "learner_id", "completed_at", "id"),
+        # Historique récent et stats par statut / par sujet
+        Index("ix_quiz_sessions_learner_started", "learner_id", "started_at"),
+        Index("ix_quiz_sessions_learner_status_started", "learner_id", "status", "started_at"),
+        Index("ix_quiz_sessions_learner_subject_status", "learner_id", "subject_name", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(200), unique=True, index=True)
@@ -51,7 +59,8 @@ class QuizSession(Base):
     subject = relationship("Subject")
     answers = relationship("Answer", back_populates="quiz_session", cascade="all, delete-orphan")
     
-    def to_dict(self):
+    def to_summary_dict(self):
+        """Projection légère pour les listes : tout sauf le blob questions_data."""
         return {
             "id": self.id,
             "session_id": self.session_id,
@@ -71,8 +80,12 @@ class QuizSession(Base):
             "started_at": self.started_at.isoformat() if self.started_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
             "time_spent_seconds": self.time_spent_seconds,
-            "questions_data": self.questions_data,
             "initial_bloom_level": self.initial_bloom_level,
             "final_bloom_level": self.final_bloom_level,
             "level_changed": self.level_changed
-        }
\ No newline at end of file
+        }
+    
+    def to_dict(self):
+        data = self.to_summary_dict()
+        data["questions_data"] = self.questions_data
+        return data
@@ -0,0 +1,66 @@
+"""
+Répétition espacée : état de révision par (apprenant, question) et files de
+révision quotidiennes (voir MemoryAgent dans backend/core/agents.py).
+"""
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, JSON, Index, UniqueConstraint
+from datetime import datetime
+from .database import Base
+
+
+class ReviewItem(Base):
+    """État SM-2 d'une question pour un apprenant."""
+    __tablename__ = "review_items"
+    __table_args__ = (
+        UniqueConstraint("learner_id", "question_id", name="uq_review_items_learner_question"),
+        # « À réviser maintenant » = range scan sur (learner_id, due_at <= now)
+        Index("ix_review_items_learner_due", "learner_id", "due_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    learner_id = Column(String(100), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"))
+
+    easiness = Column(Float, default=2.5)          # facteur de facilité SM-2 (>= 1.3)
+    interval_days = Column(Float, default=0.0)
+    repetitions = Column(Integer, default=0)       # révisions réussies consécutives
+    lapses = Column(Integer, default=0)            # oublis (qualité < 3)
+    last_quality = Column(Integer)                 # 0-5
+
+    due_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_reviewed_at = Column(DateTime)
+
+    def to_dict(self):
+        return {
+            "question_id": self.question_id,
+            "subject_id": self.subject_id,
+            "easiness": self.easiness,
+            "interval_days": self.interval_days,
+            "repetitions": self.repetitions,
+            "lapses": self.lapses,
+            "last_quality": self.last_quality,
+            "due_at": self.due_at.isoformat() if self.due_at else None,
+            "last_reviewed_at": self.last_reviewed_at.isoformat() if self.last_reviewed_at else None
+        }
+
+
+class ReviewQueue(Base):
+    """File de révision du jour d'un apprenant, calculée par le batch quotidien."""
+    __tablename__ = "review_queues"
+
+    id = Column(Integer, primary_key=True, index=True)
+    learner_id = Column(String(100), nullable=False, unique=True, index=True)
+    queue_date = Column(Date, nullable=False)
+    question_ids = Column(JSON, default=list)      # ids des questions, les plus en retard d'abord
+    due_count = Column(Integer, default=0)
+    generated_at = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "learner_id": self.learner_id,
+            "queue_date": self.queue_date.isoformat() if self.queue_date else None,
+            "question_ids": self.question_ids or [],
+            "due_count": self.due_count,
+            "generated_at": self.generated_at.isoformat() if self.generated_at else None
+        }
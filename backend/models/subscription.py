@@ -1,7 +1,8 @@
 import json
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum, Text, case, func, or_, update
 from sqlalchemy.orm import relationship
-from datetime import datetime, timedelta
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
 import enum
 from .database import Base
 
@@ -20,12 +21,90 @@ class SubscriptionStatus(enum.Enum):
     EXPIRED = "expired"
     PENDING = "pending"
 
+# Limites par tier (aussi utilisées dans la garde SQL de Subscription.consume_usage)
+TIER_LIMITS = {
+    SubscriptionTier.FREE: {
+        "quizzes_per_month": 5,
+        "questions_per_quiz": 5,
+        "subjects_access": 2,
+        "ai_hints_per_month": 0,
+        "analytics_history_days": 7,
+        "can_export_data": False,
+        "llm_tokens_per_month": 50000
+    },
+    SubscriptionTier.BRONZE: {
+        "quizzes_per_month": 20,
+        "questions_per_quiz": 10,
+        "subjects_access": 5,
+        "ai_hints_per_month": 10,
+        "analytics_history_days": 30,
+        "can_export_data": True,
+        "llm_tokens_per_month": 200000
+    },
+    SubscriptionTier.SILVER: {
+        "quizzes_per_month": 50,
+        "questions_per_quiz": 15,
+        "subjects_access": 999,
+        "ai_hints_per_month": 50,
+        "analytics_history_days": 90,
+        "can_export_data": True,
+        "llm_tokens_per_month": 500000
+    },
+    SubscriptionTier.GOLD: {
+        "quizzes_per_month": 150,
+        "questions_per_quiz": 20,
+        "subjects_access": 999,
+        "ai_hints_per_month": 200,
+        "analytics_history_days": 365,
+        "can_export_data": True,
+        "llm_tokens_per_month": 2000000
+    },
+    SubscriptionTier.PLATINUM: {
+        "quizzes_per_month": 999,
+        "questions_per_quiz": 30,
+        "subjects_access": 999,
+        "ai_hints_per_month": 999,
+        "analytics_history_days": 999,
+        "can_export_data": True,
+        "llm_tokens_per_month": 10000000
+    }
+}
+
+# type d'usage -> (colonne compteur, clé de limite dans TIER_LIMITS)
+USAGE_QUOTAS = {
+    "quizzes": ("quizzes_this_month", "quizzes_per_month"),
+    "questions": ("questions_this_month", None),
+    "ai_hints": ("ai_hints_this_month", "ai_hints_per_month"),
+}
+
+
+def usage_period_start(now=None):
+    """Début de la période de quota courante (1er du mois, 00:00 UTC)."""
+    return (now or datetime.utcnow()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def reset_usage_counters(db, now=None) -> int:
+    """
+    Remet à zéro, en un UPDATE, les compteurs des abonnements dont la période
+    de quota est échue (job planifié : backend/reset_usage_counters.py).
+    Retourne le nombre d'abonnements remis à zéro.
+    """
+    period_start = usage_period_start(now)
+    result = db.execute(
+        update(Subscription)
+        .where(or_(Subscription.usage_reset_date.is_(None), Subscription.usage_reset_date < period_start))
+        .values({**{column: 0 for column, _ in USAGE_QUOTAS.values()}, "usage_reset_date": period_start})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
 class Subscription(Base):
     """Modèle pour les abonnements utilisateurs."""
     __tablename__ = "subscriptions"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # Tier et statut
     tier = Column(SQLEnum(SubscriptionTier), default=SubscriptionTier.FREE, nullable=False)
@@ -97,49 +176,7 @@ class Subscription(Base):
     
     def get_limits(self):
         """Retourne les limites selon le tier."""
-        limits = {
-            SubscriptionTier.FREE: {
-                "quizzes_per_month": 5,
-                "questions_per_quiz": 5,
-                "subjects_access": 2,
-                "ai_hints_per_month": 0,
-                "analytics_history_days": 7,
-                "can_export_data": False
-            },
-            SubscriptionTier.BRONZE: {
-                "quizzes_per_month": 20,
-                "questions_per_quiz": 10,
-                "subjects_access": 5,
-                "ai_hints_per_month": 10,
-                "analytics_history_days": 30,
-                "can_export_data": True
-            },
-            SubscriptionTier.SILVER: {
-                "quizzes_per_month": 50,
-                "questions_per_quiz": 15,
-                "subjects_access": 999,
-                "ai_hints_per_month": 50,
-                "analytics_history_days": 90,
-                "can_export_data": True
-            },
-            SubscriptionTier.GOLD: {
-                "quizzes_per_month": 150,
-                "questions_per_quiz": 20,
-                "subjects_access": 999,
-                "ai_hints_per_month": 200,
-                "analytics_history_days": 365,
-                "can_export_data": True
-            },
-            SubscriptionTier.PLATINUM: {
-                "quizzes_per_month": 999,
-                "questions_per_quiz": 30,
-                "subjects_access": 999,
-                "ai_hints_per_month": 999,
-                "analytics_history_days": 999,
-                "can_export_data": True
-            }
-        }
-        return limits.get(self.tier, limits[SubscriptionTier.FREE])
+        return dict(TIER_LIMITS.get(self.tier, TIER_LIMITS[SubscriptionTier.FREE]))
     
     def get_features(self):
         """Retourne les features selon le tier."""
@@ -193,32 +230,69 @@ class Subscription(Base):
         }
         return features.get(self.tier, features[SubscriptionTier.FREE])
     
+    def usage(self, usage_type: str) -> int:
+        """Compteur de la période courante (0 si la période est échue et pas encore remise à zéro)."""
+        if self.usage_reset_date is None or self.usage_reset_date < usage_period_start():
+            return 0
+        return getattr(self, USAGE_QUOTAS[usage_type][0]) or 0
+    
     def check_quota(self, quota_type: str):
-        """Vérifie si l'utilisateur a dépassé son quota."""
+        """
+        Vérifie si l'utilisateur a dépassé son quota (lecture seule : la remise à
+        zéro mensuelle est faite par le job planifié ou par consume_usage).
+        """
         limits = self.get_limits()
         
-        # Reset mensuel si nécessaire
-        if datetime.utcnow() > self.usage_reset_date + timedelta(days=30):
-            self.quizzes_this_month = 0
-            self.questions_this_month = 0
-            self.ai_hints_this_month = 0
-            self.usage_reset_date = datetime.utcnow().replace(day=1)
-        
         if quota_type == "quiz":
-            return self.quizzes_this_month < limits["quizzes_per_month"]
+            return self.usage("quizzes") < limits["quizzes_per_month"]
         elif quota_type == "ai_hint":
-            return self.ai_hints_this_month < limits["ai_hints_per_month"]
+            return self.usage("ai_hints") < limits["ai_hints_per_month"]
         
         return True
     
-    def increment_usage(self, usage_type: str):
-        """Incrémente l'utilisation."""
-        if usage_type == "quizzes":
-            self.quizzes_this_month += 1
-        elif usage_type == "questions":
-            self.questions_this_month += 1
-        elif usage_type == "ai_hints":
-            self.ai_hints_this_month += 1
+    def consume_usage(self, db, usage_type: str, amount: int = 1, enforce_limit: bool = True):
+        """
+        Vérifie et consomme le quota en une seule instruction atomique :
+        
+            UPDATE subscriptions SET <compteur> = <compteur> + :amount
+            WHERE id = :id AND <compteur> + :amount <= <limite du tier> RETURNING ...
+        
+        Une période échue est remise à zéro dans la même instruction, si le job de
+        remise à zéro n'est pas encore passé. Les incréments concurrents ne se perdent
+        pas. Ne committe pas.
+        
+        Returns:
+            le nouveau compteur, ou None si le quota est atteint
+        """
+        column_name, limit_key = USAGE_QUOTAS[usage_type]
+        period_start = usage_period_start()
+        stale = or_(Subscription.usage_reset_date.is_(None), Subscription.usage_reset_date < period_start)
+        consumed = case((stale, amount), else_=func.coalesce(getattr(Subscription, column_name), 0) + amount)
+        
+        values = {column_name: consumed, "usage_reset_date": case((stale, period_start), else_=Subscription.usage_reset_date)}
+        for other, _ in USAGE_QUOTAS.values():
+            if other != column_name:
+                values[other] = case((stale, 0), else_=getattr(Subscription, other))
+        
+        stmt = update(Subscription).where(Subscription.id == self.id)
+        if enforce_limit and limit_key:
+            limit = case(
+                *[(Subscription.tier == tier, limits[limit_key]) for tier, limits in TIER_LIMITS.items()],
+                else_=TIER_LIMITS[SubscriptionTier.FREE][limit_key]
+            )
+            stmt = stmt.where(consumed <= limit)
+        
+        columns = list(values)
+        row = db.execute(
+            stmt.values(values)
+            .returning(*[getattr(Subscription, column) for column in columns])
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None:
+            return None
+        for column, value in zip(columns, row):
+            set_committed_value(self, column, value)
+        return getattr(self, column_name)
 
 
 class SubscriptionPlan(Base):
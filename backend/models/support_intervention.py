@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Boolean, Index
 from datetime import datetime
 from .database import Base
 
@@ -8,6 +8,9 @@ class SupportIntervention(Base):
     Log des interventions de support effectuées.
     """
     __tablename__ = "support_interventions"
+    __table_args__ = (
+        Index("ix_support_interventions_learner_triggered", "learner_id", "triggered_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     learner_id = Column(String(100), index=True, nullable=False)
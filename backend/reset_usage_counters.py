@@ -0,0 +1,57 @@
+"""
+Remise à zéro mensuelle des compteurs de quota (quiz, questions, AI hints).
+
+Un seul UPDATE sur les abonnements dont la période est échue
+(usage_reset_date antérieur au 1er du mois courant). À planifier au début de
+chaque période (ex. cron « 5 0 1 * * ») ; la vérification des quotas ne
+remet plus les compteurs à zéro en lecture, et Subscription.consume_usage
+remet à zéro dans sa propre instruction un abonnement que le job n'a pas
+encore traité.
+
+Usage:
+    python -m backend.reset_usage_counters            # remet à zéro les périodes échues
+    python -m backend.reset_usage_counters --dry-run  # compte seulement
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import or_
+
+from backend.models.database import SessionLocal
+from backend.models.subscription import Subscription, reset_usage_counters, usage_period_start
+
+
+def run(dry_run=False):
+    period_start = usage_period_start()
+    db = SessionLocal()
+    try:
+        if dry_run:
+            stale = db.query(Subscription.id).filter(
+                or_(Subscription.usage_reset_date.is_(None), Subscription.usage_reset_date < period_start)
+            ).count()
+            print(f"📋 Dry run: {stale} subscription(s) would be reset for the period starting {period_start:%Y-%m-%d}")
+            return 0
+
+        count = reset_usage_counters(db)
+        db.commit()
+        print(f"✅ {count} subscription(s) reset for the period starting {period_start:%Y-%m-%d}")
+        return 0
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remise à zéro des compteurs de quota des périodes échues")
+    parser.add_argument("--dry-run", action="store_true", help="compte les abonnements sans les modifier")
+    args = parser.parse_args(argv)
+    return run(dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    sys.exit(main())